@@ -0,0 +1,379 @@
+"""Admission control for user writes: per-client rate limits and a bounded write queue.
+
+SQLite commits one transaction at a time, so a burst of registrations only
+queues up behind the writer lock until requests time out inside the
+repository. ``AdmissionMiddleware`` turns that into a fast, explicit answer
+before the request body is read:
+
+- every client gets a token bucket of ``RATE_LIMIT_WRITES_PER_SEC`` writes
+  per second (bursts up to ``RATE_LIMIT_BURST``); past it the request gets
+  ``429`` with the seconds until the next token in ``Retry-After``.
+- at most ``WRITE_CONCURRENCY`` writes run at once and ``WRITE_QUEUE_DEPTH``
+  more may wait, each for up to ``WRITE_QUEUE_TIMEOUT`` seconds; anything
+  past that is shed with ``503`` and a ``Retry-After`` estimated from the
+  queue length and recent write latency.
+
+A client is the signed-in user when the bearer token is one the auth
+service has already verified (so one user is one client on every address)
+and the peer address otherwise: an unknown or forged token cannot be rotated
+to get a fresh bucket. Behind a reverse proxy or load balancer every peer
+address is the proxy's, so listing it in ``TRUSTED_PROXIES`` makes the
+address the one it forwarded (``Forwarded`` or ``X-Forwarded-For``) instead.
+Reads are never limited. Everything is kept in process, per worker;
+``ADMISSION_CONTROL=0`` turns it off.
+"""
+
+import asyncio
+import ipaddress
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from app.metrics import Histogram
+
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "1").lower() in ("1", "true", "yes")
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+RATE_LIMIT_WRITES_PER_SEC = float(os.getenv("RATE_LIMIT_WRITES_PER_SEC", "20"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "40"))
+# Clients tracked at once; the least recently seen bucket is dropped past this
+RATE_LIMIT_CLIENTS = int(os.getenv("RATE_LIMIT_CLIENTS", "100000"))
+
+WRITE_CONCURRENCY = int(os.getenv("WRITE_CONCURRENCY", "4"))
+WRITE_QUEUE_DEPTH = int(os.getenv("WRITE_QUEUE_DEPTH", "64"))
+WRITE_QUEUE_TIMEOUT = float(os.getenv("WRITE_QUEUE_TIMEOUT", "2"))
+
+WRITE_METHODS = frozenset(("POST", "PUT", "PATCH", "DELETE"))
+WRITE_PREFIX = "/users"
+# POST routes under WRITE_PREFIX that only read
+READ_ONLY_PATHS = frozenset(("/users/lookup",))
+
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+RATE_LIMITED = "rate_limited"
+QUEUE_FULL = "queue_full"
+QUEUE_TIMEOUT = "queue_timeout"
+
+
+def is_write(method: str, path: str) -> bool:
+    """Whether a request writes users and so goes through admission control."""
+    return method in WRITE_METHODS and path.startswith(WRITE_PREFIX) and path not in READ_ONLY_PATHS
+
+
+def parse_networks(value: str) -> Tuple[Network, ...]:
+    """Parse comma separated addresses and networks; a bare address is a one-address network."""
+    return tuple(ipaddress.ip_network(part.strip(), strict=False) for part in value.split(",") if part.strip())
+
+
+# Proxies whose Forwarded / X-Forwarded-For headers are believed: addresses or
+# networks, comma separated (e.g. "10.0.0.0/8,::1"); none by default
+TRUSTED_PROXIES = parse_networks(os.getenv("TRUSTED_PROXIES", ""))
+
+
+def _is_trusted(address: str, proxies: Tuple[Network, ...]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False  # "unknown", an obfuscated identifier or garbage
+    return any(ip in network for network in proxies)
+
+
+def _node_address(node: str) -> str:
+    """The address in a ``Forwarded`` node, without quotes, brackets or port."""
+    node = node.strip().strip('"')
+    if node.startswith("["):
+        return node[1:].partition("]")[0]
+    return node.partition(":")[0] if node.count(":") == 1 else node
+
+
+def _forwarded_for(headers) -> List[str]:
+    """Client addresses the request's proxies recorded, farthest first.
+
+    ``Forwarded`` (RFC 7239) wins over ``X-Forwarded-For`` when both are
+    present; a hop without an address is ``""``.
+    """
+    forwarded, x_forwarded_for = [], []
+    for name, value in headers:
+        if name == b"forwarded":
+            for element in value.decode("latin-1").split(","):
+                pairs = (pair.partition("=") for pair in element.split(";"))
+                nodes = [node for key, _, node in pairs if key.strip().lower() == "for"]
+                forwarded.append(_node_address(nodes[0]) if nodes else "")
+        elif name == b"x-forwarded-for":
+            x_forwarded_for += [part.strip() for part in value.decode("latin-1").split(",")]
+    return forwarded or x_forwarded_for
+
+
+def client_key(
+    scope,
+    identify: Optional[Callable[[str], Optional[str]]] = None,
+    trusted_proxies: Tuple[Network, ...] = (),
+) -> str:
+    """Rate limit key: the uid ``identify`` finds for the bearer token, else the client address.
+
+    ``identify`` must only look up tokens verified earlier (it runs on every
+    write, before the body is read); tokens it does not know count as absent.
+    The client address is the peer's unless the peer is in ``trusted_proxies``:
+    then the forwarded hops are walked from the nearest one, and the first
+    address that is not a trusted proxy is the client. Hops a client adds
+    itself sit farther out, so they cannot pick its bucket.
+    """
+    if identify is not None:
+        for name, value in scope.get("headers", ()):
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                uid = identify(token.strip()) if scheme.lower() == "bearer" else None
+                if uid:
+                    return "user:" + uid
+                break
+    client = scope.get("client")
+    if not client:
+        return "addr:unknown"
+    address = client[0]
+    if trusted_proxies and _is_trusted(address, trusted_proxies):
+        for hop in reversed(_forwarded_for(scope.get("headers", ()))):
+            address = hop or "unknown"
+            if not _is_trusted(hop, trusted_proxies):
+                break
+    return "addr:" + address
+
+
+class RateLimiter:
+    """Token buckets per client key, refilled lazily on each check."""
+
+    def __init__(
+        self,
+        rate: float = RATE_LIMIT_WRITES_PER_SEC,
+        burst: float = RATE_LIMIT_BURST,
+        max_clients: int = RATE_LIMIT_CLIENTS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self._max_clients = max_clients
+        self._clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str) -> float:
+        """Take one token for ``key``; returns 0 when allowed, else seconds until one is available."""
+        if self.rate <= 0:
+            return 0.0
+        now = self._clock()
+        with self._lock:
+            tokens, stamp = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - stamp) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self._max_clients:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class WriteGate:
+    """Concurrency limit with a bounded FIFO of waiters, used from the event loop.
+
+    A released slot is handed straight to the oldest waiter, so queued
+    requests are served in arrival order and new arrivals cannot jump ahead.
+    """
+
+    def __init__(
+        self,
+        limit: int = WRITE_CONCURRENCY,
+        max_queue: int = WRITE_QUEUE_DEPTH,
+        timeout: float = WRITE_QUEUE_TIMEOUT,
+    ):
+        self.limit = max(limit, 1)
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> Optional[str]:
+        """Take a slot, waiting if needed; returns None once admitted, else the reason for shedding."""
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return None
+        if len(self._waiters) >= self.max_queue:
+            return QUEUE_FULL
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.timeout)
+            return None
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                return None  # the slot was handed over as the wait ran out
+            waiter.cancel()
+            return QUEUE_TIMEOUT
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            waiter.cancel()
+            raise
+        finally:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+
+    def release(self) -> None:
+        """Hand the slot to the oldest live waiter, or free it."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+
+class AdmissionController:
+    """Rate limiter, write gate and the counters behind them."""
+
+    def __init__(self, limiter: Optional[RateLimiter] = None, gate: Optional[WriteGate] = None):
+        self.limiter = limiter if limiter is not None else RateLimiter()
+        self.gate = gate if gate is not None else WriteGate()
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {RATE_LIMITED: 0, QUEUE_FULL: 0, QUEUE_TIMEOUT: 0}
+        self.queue_wait = Histogram(WAIT_BUCKETS)
+        # moving average of admitted write latency, for Retry-After on 503
+        self.service_time = 0.05
+        self._lock = threading.Lock()
+
+    async def admit(self, key: str) -> Tuple[Optional[str], float]:
+        """Admit a write from ``key``; returns (rejection reason or None, seconds to retry after)."""
+        wait = self.limiter.acquire(key)
+        if wait > 0:
+            self._rejected(RATE_LIMITED)
+            return RATE_LIMITED, wait
+        started = time.perf_counter()
+        reason = await self.gate.acquire()
+        if reason is not None:
+            self._rejected(reason)
+            return reason, self.retry_after()
+        with self._lock:
+            self.admitted += 1
+            self.queue_wait.observe(time.perf_counter() - started)
+        return None, 0.0
+
+    def release(self, duration: float) -> None:
+        self.gate.release()
+        with self._lock:
+            self.service_time += 0.1 * (duration - self.service_time)
+
+    def _rejected(self, reason: str) -> None:
+        with self._lock:
+            self.rejected[reason] += 1
+
+    def retry_after(self) -> float:
+        """Rough time to drain the current queue at the recent write latency."""
+        return (self.gate.queued + 1) * self.service_time / self.gate.limit
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "admitted": self.admitted,
+                "rejected": dict(self.rejected),
+                "in_flight": self.gate.in_flight,
+                "queued": self.gate.queued,
+                "clients": len(self.limiter),
+            }
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        stats = self.stats()
+        lines = [
+            "# HELP admission_admitted_total Writes admitted past rate limits and the write queue.",
+            "# TYPE admission_admitted_total counter",
+            f"admission_admitted_total {stats['admitted']}",
+            "# HELP admission_rejected_total Writes shed, by reason.",
+            "# TYPE admission_rejected_total counter",
+        ]
+        lines += [f'admission_rejected_total{{reason="{r}"}} {n}' for r, n in sorted(stats["rejected"].items())]
+        lines += [
+            "# HELP admission_writes_in_flight Admitted writes being handled.",
+            "# TYPE admission_writes_in_flight gauge",
+            f"admission_writes_in_flight {stats['in_flight']}",
+            "# HELP admission_writes_queued Writes waiting for a slot.",
+            "# TYPE admission_writes_queued gauge",
+            f"admission_writes_queued {stats['queued']}",
+            "# HELP admission_queue_wait_seconds Time admitted writes waited for a slot.",
+            "# TYPE admission_queue_wait_seconds histogram",
+        ]
+        with self._lock:
+            lines += [f'admission_queue_wait_seconds_bucket{{le="{le}"}} {n}' for le, n in self.queue_wait.cumulative()]
+            lines.append(f"admission_queue_wait_seconds_sum {self.queue_wait.sum}")
+            lines.append(f"admission_queue_wait_seconds_count {self.queue_wait.count}")
+        return "\n".join(lines) + "\n"
+
+
+_STATUS = {RATE_LIMITED: 429, QUEUE_FULL: 503, QUEUE_TIMEOUT: 503}
+_DETAIL = {
+    RATE_LIMITED: "Too many writes from this client",
+    QUEUE_FULL: "Server is busy",
+    QUEUE_TIMEOUT: "Server is busy",
+}
+
+
+class AdmissionMiddleware:
+    """ASGI middleware that admits or sheds user writes before their body is read."""
+
+    def __init__(
+        self,
+        app,
+        controller: AdmissionController,
+        identify: Optional[Callable[[str], Optional[str]]] = None,
+        trusted_proxies: Tuple[Network, ...] = TRUSTED_PROXIES,
+    ):
+        self.app = app
+        self.controller = controller
+        self.identify = identify
+        self.trusted_proxies = trusted_proxies
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not is_write(scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        reason, retry_after = await self.controller.admit(client_key(scope, self.identify, self.trusted_proxies))
+        if reason is not None:
+            await self._reject(send, reason, retry_after)
+            return
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(time.perf_counter() - started)
+
+    @staticmethod
+    async def _reject(send, reason: str, retry_after: float) -> None:
+        body = json.dumps({"detail": _DETAIL[reason]}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": _STATUS[reason],
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+# Process-wide controller used by the API
+admission = AdmissionController()
@@ -0,0 +1,180 @@
+"""Async CRUD routes, mounted instead of the sync ones when ``DB_MODE=async``.
+
+Handlers run on the event loop and use ``AsyncDatabaseUserRepository``, so
+concurrent requests are not capped by the thread pool size.
+"""
+
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .conditional import collection_etag, etag_matches, is_fresh, not_modified, parse_if_match, set_validators, user_etag
+from .encoding import encode_lookup, encode_user, encode_users, raw_json
+from .db.async_repository import AsyncDatabaseUserRepository
+from .db.cache import user_cache
+from .db.cached_repository import AsyncCachedUserRepository
+from .db.config import READ_PATH, get_async_db
+from .db.hot_repository import READ_BACKEND, AsyncHotTierUserRepository, async_hot_store_lock, hot_store, hot_store_tracker
+from .db.pagination import decode_cursor, encode_cursor
+from .db.repository import PersonFactory, VersionConflict
+from .schemas import UserCreate, UserLookupRequest, UserLookupResult, UserOut
+
+router = APIRouter()
+
+LEAN_READS = READ_PATH == "lean"
+
+
+def _user_repository(db: AsyncSession):
+    """Repository for request handlers, behind the hot tier or shared read cache when enabled."""
+    repo = AsyncDatabaseUserRepository(db)
+    if READ_BACKEND == "memory":
+        return AsyncHotTierUserRepository(repo, hot_store, async_hot_store_lock, hot_store_tracker)
+    return AsyncCachedUserRepository(repo, user_cache) if user_cache.enabled else repo
+
+
+def _users_body(users, response: Response):
+    """List response body: pre-encoded on the lean read path, validated dicts otherwise."""
+    if LEAN_READS:
+        return raw_json(encode_users(users), response)
+    return [{"uid": u.uid, "name": u.name, "email": u.email, "role": u.role} for u in users]
+
+
+def _lookup_body(lookup, response: Response):
+    """Lookup response body: pre-encoded on the lean read path, validated dicts otherwise."""
+    if LEAN_READS:
+        return raw_json(encode_lookup(lookup), response)
+
+    def as_dict(u):
+        return {"uid": u.uid, "name": u.name, "email": u.email, "role": u.role} if u is not None else None
+
+    return {
+        "users": {uid: as_dict(u) for uid, u in lookup.by_uid.items()},
+        "emails": {email: as_dict(u) for email, u in lookup.by_email.items()},
+    }
+
+
+@router.post("/users", response_model=UserOut)
+async def create_user(payload: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    """Create a new user in the database."""
+    repo = _user_repository(db)
+    person = PersonFactory.create(payload.role, uid=payload.uid, name=payload.name, email=payload.email)
+    try:
+        db_model = await repo.add_user(person)
+        return {"uid": db_model.uid, "name": db_model.name, "email": db_model.email, "role": db_model.role}
+    except KeyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.post("/users/lookup", response_model=UserLookupResult)
+async def lookup_users(payload: UserLookupRequest, response: Response, db: AsyncSession = Depends(get_async_db)):
+    """Resolve many users by uid (and optionally email) in one request.
+
+    Keys are looked up with chunked IN queries; unknown keys map to null.
+    """
+    lookup = await _user_repository(db).get_users_many(payload.uids, payload.emails)
+    return _lookup_body(lookup, response)
+
+
+@router.get("/users", response_model=List[UserOut])
+async def list_users(
+    response: Response,
+    role: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=1000),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """List users, optionally filtered by role (keyset pages, see X-Next-Cursor)."""
+    repo = _user_repository(db)
+    etag = collection_etag(await repo.collection_version())
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    if skip and not cursor:
+        list_page = repo.list_user_rows_paginated if LEAN_READS else repo.list_users_paginated
+        return _users_body(await list_page(skip=skip, limit=limit, role=role), response)
+    try:
+        after = decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    list_page = repo.list_user_rows_keyset if LEAN_READS else repo.list_users_keyset
+    users = await list_page(limit=limit + 1, role=role, after=after)
+    if len(users) > limit:
+        users = users[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(users[-1])
+    return _users_body(users, response)
+
+
+@router.get("/users/{uid}", response_model=UserOut)
+async def get_user(
+    uid: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Retrieve a single user by UID.
+
+    Responses carry an ETag and Last-Modified; a matching If-None-Match or
+    If-Modified-Since is answered with 304 after a version-only lookup.
+    """
+    repo = _user_repository(db)
+    if if_none_match or if_modified_since:
+        version = await repo.get_user_version(uid)
+        if version is not None and is_fresh(if_none_match, if_modified_since, version):
+            return not_modified(user_etag(version), version)
+    user = await (repo.get_user_row(uid) if LEAN_READS else repo.get_user(uid))
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    set_validators(response, user.updated_at)
+    if LEAN_READS:
+        return raw_json(encode_user(user), response)
+    return {"uid": user.uid, "name": user.name, "email": user.email, "role": user.role}
+
+
+@router.put("/users/{uid}", response_model=UserOut)
+async def upsert_user(
+    uid: str,
+    payload: UserCreate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Create the user (201) or update its name and email (200) in one statement.
+
+    With If-Match only an existing user whose ETag matches is updated (412
+    otherwise). A taken email is a 409.
+    """
+    repo = _user_repository(db)
+    try:
+        if if_match:
+            user = await repo.update_user(uid, name=payload.name, email=payload.email, if_updated_at=parse_if_match(if_match))
+            if not user:
+                raise HTTPException(status_code=412, detail="User not found")
+        else:
+            user, created = await repo.upsert_user(
+                PersonFactory.create(payload.role, uid=uid, name=payload.name, email=payload.email)
+            )
+            if created:
+                response.status_code = 201
+    except VersionConflict:
+        raise HTTPException(status_code=412, detail="User was modified")
+    except KeyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    set_validators(response, user.updated_at)
+    return {"uid": user.uid, "name": user.name, "email": user.email, "role": user.role}
+
+
+@router.delete("/users/{uid}")
+async def delete_user(uid: str, if_match: Optional[str] = Header(None), db: AsyncSession = Depends(get_async_db)):
+    """Delete a user by UID (412 when If-Match does not match its ETag)."""
+    repo = _user_repository(db)
+    try:
+        ok = await repo.delete_user(uid, if_updated_at=parse_if_match(if_match))
+    except VersionConflict:
+        raise HTTPException(status_code=412, detail="User was modified")
+    if not ok:
+        raise HTTPException(status_code=412 if if_match else 404, detail="User not found")
+    return {"detail": "User deleted successfully"}
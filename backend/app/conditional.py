@@ -0,0 +1,103 @@
+"""Conditional request helpers: ETags and Last-Modified from ``updated_at``.
+
+A user's ETag encodes its ``updated_at`` exactly (microseconds since the
+epoch), so ``If-Match`` values can be turned back into the timestamps the
+repository compares against. List responses use the collection version
+returned by ``collection_version``, which changes on every write.
+"""
+
+import calendar
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Set, Tuple
+
+from fastapi import Response
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _micros(value: datetime) -> int:
+    return calendar.timegm(value.utctimetuple()) * 1_000_000 + value.microsecond
+
+
+def user_etag(updated_at: datetime) -> str:
+    return f'"{_micros(updated_at):x}"'
+
+
+def collection_etag(version: Tuple[Optional[datetime], int]) -> str:
+    latest, total = version
+    return f'"c{_micros(latest) if latest else 0:x}-{total:x}"'
+
+
+def _etags(header: str) -> Set[str]:
+    """Parse an If-Match/If-None-Match list, dropping weak prefixes."""
+    return {tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()}
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """Weak comparison of ``etag`` against an If-None-Match header."""
+    if not header:
+        return False
+    tags = _etags(header)
+    return "*" in tags or etag in tags
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(value.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def not_modified_since(header: Optional[str], updated_at: datetime) -> bool:
+    """True when ``updated_at`` is no later than an If-Modified-Since date."""
+    if not header:
+        return False
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    # HTTP dates have one-second resolution
+    return updated_at.replace(microsecond=0) <= since
+
+
+def is_fresh(if_none_match: Optional[str], if_modified_since: Optional[str], updated_at: datetime) -> bool:
+    """Whether a GET can be answered with 304; If-None-Match takes precedence."""
+    if if_none_match:
+        return etag_matches(if_none_match, user_etag(updated_at))
+    return not_modified_since(if_modified_since, updated_at)
+
+
+def set_validators(response: Response, updated_at: Optional[datetime]) -> None:
+    """Add ETag and Last-Modified for a user to ``response``."""
+    if updated_at is not None:
+        response.headers["ETag"] = user_etag(updated_at)
+        response.headers["Last-Modified"] = http_date(updated_at)
+
+
+def not_modified(etag: str, updated_at: Optional[datetime] = None) -> Response:
+    response = Response(status_code=304, headers={"ETag": etag})
+    if updated_at is not None:
+        response.headers["Last-Modified"] = http_date(updated_at)
+    return response
+
+
+def parse_if_match(header: Optional[str]) -> Optional[Set[datetime]]:
+    """``updated_at`` values allowed by an If-Match header.
+
+    Returns None when there is no precondition beyond existence (no header or
+    ``*``), and an empty set when no listed ETag can match a user.
+    """
+    if not header:
+        return None
+    # If-Match uses strong comparison, so weak ETags never match
+    tags = {tag.strip() for tag in header.split(",")}
+    if "*" in tags:
+        return None
+    versions = set()
+    for tag in tags:
+        if tag.startswith('"') and tag.endswith('"'):
+            try:
+                versions.add(_EPOCH + timedelta(microseconds=int(tag[1:-1], 16)))
+            except ValueError:
+                continue
+    return versions
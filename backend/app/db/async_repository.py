@@ -0,0 +1,116 @@
+"""Async repository for the event-loop request path.
+
+Each method runs the corresponding ``DatabaseUserRepository`` method through
+``AsyncSession.run_sync``: the query logic (counters, keyset pagination,
+batching) stays in one place, while I/O goes through the async driver and
+never blocks the event loop or occupies a worker thread.
+"""
+
+from datetime import datetime
+from typing import Container, Iterable, List, Optional, Tuple
+
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import PersonModel
+from app.db.repository import DatabaseUserRepository, UpsertResult, UserLookup
+from app.models.person import Person
+
+
+class AsyncDatabaseUserRepository:
+    """Async counterpart of ``DatabaseUserRepository`` with the same methods."""
+
+    def __init__(self, db: AsyncSession):
+        """Initialize with an SQLAlchemy async session."""
+        self._db = db
+
+    async def _run(self, method: str, *args, **kwargs):
+        def call(session):
+            return getattr(DatabaseUserRepository(session), method)(*args, **kwargs)
+
+        return await self._db.run_sync(call)
+
+    async def add_user(self, person: Person) -> Row:
+        """Create and persist a user; raises ``UserConflict`` on uid/email conflicts."""
+        return await self._run("add_user", person)
+
+    async def upsert_user(self, person: Person) -> UpsertResult:
+        """Create the user or update its name and email."""
+        return await self._run("upsert_user", person)
+
+    async def add_users(self, persons: Iterable[Person], batch_size: int = 1000) -> List[dict]:
+        """Create many users using one transaction per batch."""
+        return await self._run("add_users", list(persons), batch_size)
+
+    async def get_user(self, uid: str) -> Optional[PersonModel]:
+        """Retrieve a user by UID."""
+        return await self._run("get_user", uid)
+
+    async def get_user_by_email(self, email: str) -> Optional[PersonModel]:
+        """Retrieve a user by email."""
+        return await self._run("get_user_by_email", email)
+
+    async def get_user_row(self, uid: str) -> Optional[Row]:
+        """Retrieve a user as a plain row (no ORM object)."""
+        return await self._run("get_user_row", uid)
+
+    async def get_user_rows(self, uids: Iterable[str], chunk_size: int = 500) -> List[Row]:
+        """Retrieve many users as plain rows."""
+        return await self._run("get_user_rows", list(uids), chunk_size)
+
+    async def get_users_many(self, uids: Iterable[str] = (), emails: Iterable[str] = (), chunk_size: int = 500) -> UserLookup:
+        """Resolve many users by uid and by email with chunked IN queries."""
+        return await self._run("get_users_many", list(uids), list(emails), chunk_size)
+
+    async def list_user_rows_paginated(self, skip: int = 0, limit: int = 10, role: Optional[str] = None) -> List[Row]:
+        """List users as plain rows with OFFSET pagination."""
+        return await self._run("list_user_rows_paginated", skip=skip, limit=limit, role=role)
+
+    async def list_user_rows_keyset(
+        self,
+        limit: int = 10,
+        role: Optional[str] = None,
+        after: Optional[Tuple[datetime, str]] = None,
+    ) -> List[Row]:
+        """List users as plain rows ordered by (created_at, uid)."""
+        return await self._run("list_user_rows_keyset", limit=limit, role=role, after=after)
+
+    async def get_user_version(self, uid: str) -> Optional[datetime]:
+        """Return a user's ``updated_at`` without loading the row."""
+        return await self._run("get_user_version", uid)
+
+    async def collection_version(self) -> Tuple[Optional[datetime], int]:
+        """Return a version of the whole table that changes on every write."""
+        return await self._run("collection_version")
+
+    async def update_user(
+        self,
+        uid: str,
+        name: Optional[str] = None,
+        email: Optional[str] = None,
+        role: Optional[str] = None,
+        if_updated_at: Optional[Container[datetime]] = None,
+    ) -> Optional[Row]:
+        """Update a user's attributes."""
+        return await self._run("update_user", uid, name=name, email=email, role=role, if_updated_at=if_updated_at)
+
+    async def delete_user(self, uid: str, if_updated_at: Optional[Container[datetime]] = None) -> bool:
+        """Delete a user by UID."""
+        return await self._run("delete_user", uid, if_updated_at=if_updated_at)
+
+    async def list_users(self, role: Optional[str] = None) -> List[PersonModel]:
+        """List all users or filter by role."""
+        return await self._run("list_users", role=role)
+
+    async def list_users_paginated(self, skip: int = 0, limit: int = 10, role: Optional[str] = None) -> List[PersonModel]:
+        """List users with OFFSET pagination."""
+        return await self._run("list_users_paginated", skip=skip, limit=limit, role=role)
+
+    async def list_users_keyset(
+        self,
+        limit: int = 10,
+        role: Optional[str] = None,
+        after: Optional[Tuple[datetime, str]] = None,
+    ) -> List[PersonModel]:
+        """List users ordered by (created_at, uid), starting after a cursor."""
+        return await self._run("list_users_keyset", limit=limit, role=role, after=after)
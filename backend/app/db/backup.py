@@ -0,0 +1,375 @@
+"""Online snapshots of the SQLite database with SQLite's backup API.
+
+Copying ``charity.db`` while the service runs can tear the copy (pages from
+either side of a commit, or a WAL that was not copied with it), and stopping
+the service to copy it is downtime. ``BackupManager`` instead copies the
+database page by page through a connection of its own:
+
+- ``BACKUP_PAGES_PER_STEP`` pages are copied per step, with a
+  ``BACKUP_STEP_PAUSE`` sleep between steps, so the copy leaves disk, CPU
+  and the GIL to live requests.
+- In WAL mode the whole copy runs in one read transaction on the source. It
+  is a consistent snapshot of the moment the backup started, and since WAL
+  readers never block the writer, writes go on throughout (the WAL cannot
+  be checkpointed past the snapshot, so it grows until the copy ends).
+  Without that read transaction any commit by another connection would
+  restart the copy from the first page.
+- In rollback-journal mode (``DB_PROFILE=legacy``) a reader does block
+  commits, so each step only holds the read lock for its own duration. A
+  commit between steps restarts the copy, at most ``BACKUP_MAX_RESTARTS``
+  times before the backup gives up.
+
+The copy is written next to its final name, switched to a rollback journal
+(one self-contained file) and checked with ``PRAGMA integrity_check``
+(``BACKUP_INTEGRITY=quick`` for ``quick_check``, ``off`` to skip). Only a
+copy that passes is renamed to ``<database>-<UTC time>.db`` in
+``BACKUP_DIR``, and the newest ``BACKUP_KEEP`` snapshots are kept.
+
+Every ``BACKUP_INTERVAL`` seconds (0, the default, turns the schedule off)
+each worker checks whether the newest snapshot is older than the interval.
+A lock file in ``BACKUP_DIR`` lets one process copy at a time, and the check
+is repeated under it, so several workers share one schedule.
+"""
+
+import glob
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Iterator, List, Optional
+
+from sqlalchemy.engine import make_url
+
+from app.db.config import DATABASE_URL
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+BACKUP_DIR = os.getenv("BACKUP_DIR")  # default: "backups" next to the database
+BACKUP_INTERVAL = float(os.getenv("BACKUP_INTERVAL", "0"))
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "7"))
+BACKUP_PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", "1024"))
+BACKUP_STEP_PAUSE = float(os.getenv("BACKUP_STEP_PAUSE", "0.005"))
+BACKUP_INTEGRITY = os.getenv("BACKUP_INTEGRITY", "full").lower()
+BACKUP_MAX_RESTARTS = int(os.getenv("BACKUP_MAX_RESTARTS", "3"))
+
+_INTEGRITY_PRAGMAS = {"full": "integrity_check", "quick": "quick_check"}
+
+
+class BackupError(Exception):
+    """A backup failed; no snapshot was written."""
+
+
+class BackupInProgress(BackupError):
+    """Another backup is running, in this process or another one."""
+
+
+@dataclass
+class BackupResult:
+    """What one backup copied and what it cost the live database."""
+
+    path: str
+    size: int  # bytes
+    pages: int
+    steps: int
+    restarts: int
+    started_at: datetime
+    elapsed: float  # seconds, copy and integrity check
+    check_time: float  # seconds of ``elapsed`` spent in the integrity check
+    longest_step: float  # seconds
+    # seconds during which the backup kept writers from committing (0 in WAL mode)
+    write_lock: float
+    integrity: str
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "started_at": self.started_at.isoformat() + "Z"}
+
+
+@contextmanager
+def _try_lock(path: str) -> Iterator[bool]:
+    """Hold an exclusive lock on ``path`` for the block if nobody else does; yields whether it did."""
+    with open(path, "a+b") as f:
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class _Steps:
+    """Backup progress callback: times the steps, counts restarts and pauses between steps."""
+
+    def __init__(self, pause: float, max_restarts: int, wal: bool):
+        self.pause = pause
+        self.max_restarts = max_restarts
+        self.wal = wal
+        self.steps = 0
+        self.restarts = 0
+        self.longest = 0.0
+        self.locked = 0.0
+        self.pages = 0
+        self.remaining: Optional[int] = None
+        self._step_started = time.perf_counter()
+
+    def __call__(self, status: int, remaining: int, pages: int) -> None:
+        step = time.perf_counter() - self._step_started
+        self.steps += 1
+        self.longest = max(self.longest, step)
+        if not self.wal:
+            self.locked += step
+        if self.remaining is not None and remaining > self.remaining:
+            self.restarts += 1
+            if self.restarts > self.max_restarts:
+                raise BackupError(f"the database changed during the copy {self.restarts} times")
+        self.remaining, self.pages = remaining, pages
+        if remaining and self.pause > 0:
+            time.sleep(self.pause)
+        self._step_started = time.perf_counter()
+
+
+class BackupManager:
+    """Takes, checks, lists and rotates snapshots of one SQLite database file."""
+
+    def __init__(
+        self,
+        database: str,
+        directory: Optional[str] = None,
+        keep: int = BACKUP_KEEP,
+        interval: float = BACKUP_INTERVAL,
+        pages_per_step: int = BACKUP_PAGES_PER_STEP,
+        step_pause: float = BACKUP_STEP_PAUSE,
+        integrity: str = BACKUP_INTEGRITY,
+        max_restarts: int = BACKUP_MAX_RESTARTS,
+    ):
+        self.database = os.path.abspath(database)
+        self.directory = os.path.abspath(directory or os.path.join(os.path.dirname(self.database), "backups"))
+        self.keep = max(keep, 1)
+        self.interval = interval
+        self.pages_per_step = pages_per_step if pages_per_step > 0 else -1
+        self.step_pause = step_pause
+        self.integrity = integrity
+        self.max_restarts = max_restarts
+        self._stem = os.path.splitext(os.path.basename(self.database))[0]
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._steps: Optional[_Steps] = None
+        self.last_result: Optional[BackupResult] = None
+        self.last_error: Optional[str] = None
+        self.completed = 0
+        self.failures = 0
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def snapshots(self) -> List[dict]:
+        """Snapshots in ``directory``, newest first."""
+        paths = sorted(glob.glob(os.path.join(glob.escape(self.directory), f"{glob.escape(self._stem)}-*.db")), reverse=True)
+        return [
+            {
+                "name": os.path.basename(path),
+                "size": os.path.getsize(path),
+                "created_at": datetime.utcfromtimestamp(os.path.getmtime(path)).isoformat() + "Z",
+            }
+            for path in paths
+        ]
+
+    def due(self) -> bool:
+        """Whether the schedule calls for a snapshot: the newest one is older than ``interval``."""
+        if self.interval <= 0:
+            return False
+        snapshots = glob.glob(os.path.join(glob.escape(self.directory), f"{glob.escape(self._stem)}-*.db"))
+        return not snapshots or time.time() - max(map(os.path.getmtime, snapshots)) >= self.interval
+
+    def start(self, scheduled: bool = False) -> bool:
+        """Run a backup on a background thread; False when one is already running here."""
+        if not self._lock.acquire(blocking=False):
+            return False
+        self._thread = threading.Thread(target=self._run_quietly, args=(scheduled,), name="backup", daemon=True)
+        self._thread.start()
+        return True
+
+    def _run_quietly(self, scheduled: bool) -> None:
+        try:
+            self._run_locked(scheduled)
+        except BackupError:
+            pass  # recorded in last_error
+
+    def run(self, scheduled: bool = False) -> Optional[BackupResult]:
+        """Take a snapshot now and rotate old ones.
+
+        With ``scheduled`` the snapshot is skipped (returning None) when
+        another process took one since ``due`` was checked. Raises
+        ``BackupInProgress`` when a backup is already running and
+        ``BackupError`` when the copy or its integrity check fails.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise BackupInProgress("a backup is already running")
+        return self._run_locked(scheduled)
+
+    def _run_locked(self, scheduled: bool) -> Optional[BackupResult]:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with _try_lock(os.path.join(self.directory, ".lock")) as locked:
+                if not locked:
+                    raise BackupInProgress("another process is taking a backup")
+                if scheduled and not self.due():
+                    return None
+                result = self._copy()
+                self._rotate()
+            self.last_result, self.last_error = result, None
+            self.completed += 1
+            return result
+        except BackupInProgress:
+            raise
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            if isinstance(e, BackupError):
+                raise
+            raise BackupError(str(e)) from e
+        finally:
+            self._steps = None
+            self._lock.release()
+
+    def _copy(self) -> BackupResult:
+        started_at = datetime.utcnow()
+        path = os.path.join(self.directory, f"{self._stem}-{started_at:%Y%m%d-%H%M%S-%f}.db")
+        partial = path + ".partial"
+        started = time.perf_counter()
+        source = sqlite3.connect(self.database, isolation_level=None, check_same_thread=False)
+        target = sqlite3.connect(partial, isolation_level=None)
+        try:
+            try:
+                source.execute("PRAGMA busy_timeout = 5000")
+                wal = source.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal"
+                if wal:
+                    # one read snapshot for the whole copy: consistent, never restarted, never blocks writers
+                    source.execute("BEGIN")
+                    source.execute("SELECT count(*) FROM sqlite_master").fetchone()
+                self._steps = steps = _Steps(self.step_pause, self.max_restarts, wal)
+                source.backup(target, pages=self.pages_per_step, progress=steps)
+                if wal:
+                    source.execute("COMMIT")
+            finally:
+                source.close()
+            target.execute("PRAGMA journal_mode = DELETE")
+            checking = time.perf_counter()
+            integrity = self._check(target)
+            check_time = time.perf_counter() - checking
+        except BaseException:
+            target.close()
+            self._remove(partial)
+            raise
+        target.close()
+        if integrity != "ok":
+            self._remove(partial)
+            raise BackupError(f"the snapshot failed its integrity check: {integrity}")
+        os.replace(partial, path)
+        return BackupResult(
+            path=path,
+            size=os.path.getsize(path),
+            pages=steps.pages,
+            steps=steps.steps,
+            restarts=steps.restarts,
+            started_at=started_at,
+            elapsed=time.perf_counter() - started,
+            check_time=check_time,
+            longest_step=steps.longest,
+            write_lock=steps.locked,
+            integrity=integrity if self.integrity in _INTEGRITY_PRAGMAS else "skipped",
+        )
+
+    def _check(self, target: sqlite3.Connection) -> str:
+        pragma = _INTEGRITY_PRAGMAS.get(self.integrity)
+        if pragma is None:
+            return "ok"
+        rows = [row[0] for row in target.execute(f"PRAGMA {pragma}(20)")]
+        return "ok" if rows == ["ok"] else "; ".join(rows)
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        for leftover in (path, path + "-journal", path + "-wal", path + "-shm"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    def _rotate(self) -> None:
+        for snapshot in self.snapshots()[self.keep:]:
+            os.remove(os.path.join(self.directory, snapshot["name"]))
+
+    def stats(self) -> dict:
+        steps = self._steps
+        progress = None
+        if steps is not None and steps.pages:
+            progress = {"pages_done": steps.pages - steps.remaining, "pages_total": steps.pages, "restarts": steps.restarts}
+        return {
+            "running": self.running,
+            "progress": progress,
+            "completed": self.completed,
+            "failures": self.failures,
+            "last_result": self.last_result.as_dict() if self.last_result else None,
+            "last_error": self.last_error,
+            "interval": self.interval,
+            "keep": self.keep,
+            "directory": self.directory,
+        }
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        result = self.last_result
+        lines = [
+            "# HELP backup_completed_total Snapshots written since this process started.",
+            "# TYPE backup_completed_total counter",
+            f"backup_completed_total {self.completed}",
+            "# HELP backup_failures_total Backups that failed since this process started.",
+            "# TYPE backup_failures_total counter",
+            f"backup_failures_total {self.failures}",
+            "# HELP backup_running Whether this process is taking a backup.",
+            "# TYPE backup_running gauge",
+            f"backup_running {int(self.running)}",
+        ]
+        if result is not None:
+            lines += [
+                "# HELP backup_last_duration_seconds Time the last snapshot of this process took.",
+                "# TYPE backup_last_duration_seconds gauge",
+                f"backup_last_duration_seconds {result.elapsed}",
+                "# HELP backup_last_write_lock_seconds Time the last snapshot kept writers from committing.",
+                "# TYPE backup_last_write_lock_seconds gauge",
+                f"backup_last_write_lock_seconds {result.write_lock}",
+                "# HELP backup_last_size_bytes Size of the last snapshot.",
+                "# TYPE backup_last_size_bytes gauge",
+                f"backup_last_size_bytes {result.size}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+def backup_manager(url: str) -> Optional[BackupManager]:
+    """Backups for the database at ``url``, if it is a SQLite file (other databases have their own tools)."""
+    if not url.startswith("sqlite"):
+        return None
+    database = make_url(url).database
+    if database in (None, "", ":memory:"):
+        return None
+    return BackupManager(database, BACKUP_DIR)
+
+
+# Process-wide backups of the API's database (None unless it is a SQLite file)
+backups = backup_manager(DATABASE_URL)
@@ -0,0 +1,323 @@
+"""In-process read cache for user lookups and list pages.
+
+Values are immutable ``UserRecord`` snapshots rather than ORM instances, so
+they can be shared across sessions and threads. Concurrent misses for the
+same key are coalesced (single-flight) so a hot key costs one query, and a
+generation counter stops a load that raced with a write from caching stale
+data. Writes made by other worker processes are detected through the shared
+counters in ``app.db.generations``.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.db.config import DATABASE_URL
+from app.db.generations import GenerationTable, generation_table
+
+_MISSING = object()
+
+
+class UserRecord(NamedTuple):
+    """Immutable snapshot of a ``PersonModel`` row."""
+
+    uid: str
+    name: str
+    email: str
+    role: str
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+    @classmethod
+    def from_model(cls, model) -> Optional["UserRecord"]:
+        if model is None:
+            return None
+        return cls(model.uid, model.name, model.email, model.role, model.created_at, model.updated_at)
+
+
+class LRUCache:
+    """Thread-safe bounded LRU with a per-entry time to live."""
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value or ``_MISSING``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if self._clock() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return _MISSING
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one (thread-based)."""
+
+    class _Call:
+        def __init__(self):
+            self.event = threading.Event()
+            self.value: Any = None
+            self.error: Optional[BaseException] = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, "SingleFlight._Call"] = {}
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = SingleFlight._Call()
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+        try:
+            call.value = fn()
+            return call.value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+
+class AsyncSingleFlight:
+    """Coalesces concurrent coroutine calls for the same key on one event loop."""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            value = await fn()
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            del self._calls[key]
+
+
+class UserCache:
+    """Caches single users and list pages; any write invalidates the lists.
+
+    With ``generations`` every entry also records the cross-process counter
+    (the user's slot, or the table for list pages) it was loaded under and is
+    dropped on read once another process's write has moved it on.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        ttl: float = 30.0,
+        list_maxsize: int = 1000,
+        list_ttl: float = 5.0,
+        generations: Optional[GenerationTable] = None,
+    ):
+        self.users = LRUCache(maxsize, ttl)
+        self.lists = LRUCache(list_maxsize, list_ttl)
+        self.generations = generations
+        self._flight = SingleFlight()
+        self._async_flight = AsyncSingleFlight()
+        self._generation = 0
+        self.invalidations = 0
+        self.stale = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.users.maxsize > 0 or self.lists.maxsize > 0
+
+    def _store(self, key: Hashable) -> LRUCache:
+        return self.lists if key[0] == "list" else self.users
+
+    def _stamp(self, key: Hashable) -> Optional[int]:
+        if self.generations is None:
+            return None
+        return self.generations.table() if key[0] == "list" else self.generations.user(key[1])
+
+    def _get(self, store: LRUCache, key: Hashable) -> Any:
+        entry = store.get(key)
+        if entry is _MISSING:
+            return _MISSING
+        stamp, value = entry
+        if stamp != self._stamp(key):
+            # written by another process since it was loaded
+            self.stale += 1
+            store.pop(key)
+            return _MISSING
+        return value
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Return the cached value for ``key`` or load it once for all waiters."""
+        store = self._store(key)
+        value = self._get(store, key)
+        if value is not _MISSING:
+            return value
+
+        def load():
+            generation, stamp = self._generation, self._stamp(key)
+            loaded = loader()
+            if generation == self._generation:
+                store.put(key, (stamp, loaded))
+            return loaded
+
+        return self._flight.do(key, load)
+
+    async def aget_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Async variant of ``get_or_load`` for the event-loop request path."""
+        store = self._store(key)
+        value = self._get(store, key)
+        if value is not _MISSING:
+            return value
+
+        async def load():
+            generation, stamp = self._generation, self._stamp(key)
+            loaded = await loader()
+            if generation == self._generation:
+                store.put(key, (stamp, loaded))
+            return loaded
+
+        return await self._async_flight.do(key, load)
+
+    def get_many_or_load(self, keys: Iterable[Hashable], loader: Callable[[List[Hashable]], Dict[Hashable, Any]]) -> Dict[Hashable, Any]:
+        """Return values for ``keys``, loading every miss with one ``loader(missing)`` call.
+
+        Batch loads are not coalesced with concurrent loads of the same keys.
+        """
+        values, missing = self._cached_many(keys)
+        if missing:
+            generation, stamps = self._generation, {key: self._stamp(key) for key in missing}
+            loaded = loader(missing)
+            self._put_many(generation, stamps, loaded)
+            values.update(loaded)
+        return values
+
+    async def aget_many_or_load(
+        self, keys: Iterable[Hashable], loader: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]
+    ) -> Dict[Hashable, Any]:
+        """Async variant of ``get_many_or_load``."""
+        values, missing = self._cached_many(keys)
+        if missing:
+            generation, stamps = self._generation, {key: self._stamp(key) for key in missing}
+            loaded = await loader(missing)
+            self._put_many(generation, stamps, loaded)
+            values.update(loaded)
+        return values
+
+    def _cached_many(self, keys: Iterable[Hashable]) -> Tuple[Dict[Hashable, Any], List[Hashable]]:
+        values, missing = {}, []
+        for key in keys:
+            value = self._get(self._store(key), key)
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                values[key] = value
+        return values, missing
+
+    def _put_many(self, generation: int, stamps: Dict[Hashable, Optional[int]], loaded: Dict[Hashable, Any]) -> None:
+        if generation == self._generation:
+            for key, value in loaded.items():
+                self._store(key).put(key, (stamps[key], value))
+
+    def invalidate_user(self, uid: str) -> None:
+        """Drop one user and every cached list page."""
+        self.invalidate_users([uid])
+
+    def invalidate_users(self, uids: Iterable[str]) -> None:
+        """Drop the given users and every cached list page."""
+        self._generation += 1
+        self.invalidations += 1
+        for uid in uids:
+            self.users.pop(("user", uid))
+        self.lists.clear()
+
+    def clear(self) -> None:
+        self._generation += 1
+        self.users.clear()
+        self.lists.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "users": self.users.stats(),
+            "lists": self.lists.stats(),
+            "coalesced": self._flight.coalesced + self._async_flight.coalesced,
+            "invalidations": self.invalidations,
+            "stale": self.stale,
+        }
+
+
+# "shared" checks entries against the counters every process bumps on write;
+# "off" trusts entries until their TTL (only safe with a single process)
+CACHE_COHERENCE = os.getenv("CACHE_COHERENCE", "shared").lower()
+
+# Process-wide cache used by the API routes (size 0 disables it)
+user_cache = UserCache(
+    generations=generation_table(DATABASE_URL) if CACHE_COHERENCE == "shared" else None,
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("USER_CACHE_TTL", "30")),
+    list_maxsize=int(os.getenv("LIST_CACHE_SIZE", "1000")),
+    list_ttl=float(os.getenv("LIST_CACHE_TTL", "5")),
+)
@@ -0,0 +1,263 @@
+"""Read-through caching decorators for the user repositories.
+
+Reads go through ``UserCache``; writes go straight to the wrapped repository
+and then invalidate the affected user and all cached list pages. Reads return
+``UserRecord`` snapshots, which expose the same attributes the routes use on
+``PersonModel``. The lean ``*_row*`` readers share cache entries with their
+ORM counterparts, since both produce the same records.
+"""
+
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy.engine import Row
+
+from app.db.async_repository import AsyncDatabaseUserRepository
+from app.db.cache import UserCache, UserRecord
+from app.db.repository import DatabaseUserRepository, UpsertResult, UserLookup
+from app.models.person import Person
+
+
+class CachedUserRepository:
+    """Decorates ``DatabaseUserRepository`` with a shared read-through cache.
+
+    Methods that are not cached are delegated unchanged.
+    """
+
+    def __init__(self, repository: DatabaseUserRepository, cache: UserCache):
+        self._repository = repository
+        self._cache = cache
+
+    def __getattr__(self, name):
+        return getattr(self._repository, name)
+
+    def get_user(self, uid: str) -> Optional[UserRecord]:
+        """Retrieve a user by UID (cached, including misses)."""
+        return self._cache.get_or_load(
+            ("user", uid), lambda: UserRecord.from_model(self._repository.get_user(uid))
+        )
+
+    def list_users_keyset(
+        self,
+        limit: int = 10,
+        role: Optional[str] = None,
+        after: Optional[Tuple[datetime, str]] = None,
+    ) -> List[UserRecord]:
+        """List users ordered by (created_at, uid) (cached per page)."""
+        key = ("list", "keyset", role.lower() if role else None, limit, after)
+        return self._cache.get_or_load(
+            key,
+            lambda: [UserRecord.from_model(u) for u in self._repository.list_users_keyset(limit=limit, role=role, after=after)],
+        )
+
+    def list_users_paginated(self, skip: int = 0, limit: int = 10, role: Optional[str] = None) -> List[UserRecord]:
+        """List users with OFFSET pagination (cached per page)."""
+        key = ("list", "offset", role.lower() if role else None, skip, limit)
+        return self._cache.get_or_load(
+            key,
+            lambda: [UserRecord.from_model(u) for u in self._repository.list_users_paginated(skip=skip, limit=limit, role=role)],
+        )
+
+    def get_user_row(self, uid: str) -> Optional[UserRecord]:
+        """Retrieve a user by UID, loading it as a plain row on a miss."""
+
+        def load():
+            row = self._repository.get_user_row(uid)
+            return UserRecord._make(row) if row else None
+
+        return self._cache.get_or_load(("user", uid), load)
+
+    def list_user_rows_keyset(
+        self,
+        limit: int = 10,
+        role: Optional[str] = None,
+        after: Optional[Tuple[datetime, str]] = None,
+    ) -> List[UserRecord]:
+        """``list_users_keyset`` loading plain rows on a miss."""
+        key = ("list", "keyset", role.lower() if role else None, limit, after)
+        return self._cache.get_or_load(
+            key,
+            lambda: [UserRecord._make(r) for r in self._repository.list_user_rows_keyset(limit=limit, role=role, after=after)],
+        )
+
+    def list_user_rows_paginated(self, skip: int = 0, limit: int = 10, role: Optional[str] = None) -> List[UserRecord]:
+        """``list_users_paginated`` loading plain rows on a miss."""
+        key = ("list", "offset", role.lower() if role else None, skip, limit)
+        return self._cache.get_or_load(
+            key,
+            lambda: [UserRecord._make(r) for r in self._repository.list_user_rows_paginated(skip=skip, limit=limit, role=role)],
+        )
+
+    def get_users_many(self, uids: Iterable[str] = (), emails: Iterable[str] = (), chunk_size: int = 500) -> UserLookup:
+        """Resolve uids from the cache, loading all misses in one batch; emails are not cached."""
+        uids = list(dict.fromkeys(uids))
+
+        def load(keys):
+            lookup = self._repository.get_users_many([key[1] for key in keys], chunk_size=chunk_size)
+            return {("user", uid): UserRecord._make(row) if row else None for uid, row in lookup.by_uid.items()}
+
+        users = self._cache.get_many_or_load([("user", uid) for uid in uids], load)
+        by_email = self._repository.get_users_many(emails=emails, chunk_size=chunk_size).by_email
+        return UserLookup({uid: users[("user", uid)] for uid in uids}, by_email)
+
+    def get_user_version(self, uid: str) -> Optional[datetime]:
+        """Return a user's ``updated_at`` from the cached user."""
+        user = self.get_user(uid)
+        return user.updated_at if user else None
+
+    def collection_version(self) -> Tuple[Optional[datetime], int]:
+        """Return the table version (cached like a list page)."""
+        return self._cache.get_or_load(("list", "version"), self._repository.collection_version)
+
+    def add_user(self, person: Person) -> Row:
+        try:
+            return self._repository.add_user(person)
+        finally:
+            self._cache.invalidate_user(person.uid)
+
+    def upsert_user(self, person: Person) -> UpsertResult:
+        try:
+            return self._repository.upsert_user(person)
+        finally:
+            self._cache.invalidate_user(person.uid)
+
+    def add_users(self, persons: Iterable[Person], batch_size: int = 1000) -> List[dict]:
+        results = self._repository.add_users(persons, batch_size)
+        self._cache.invalidate_users(r["uid"] for r in results if r["status"] == "created")
+        return results
+
+    def update_user(self, uid: str, *args, **kwargs) -> Optional[Row]:
+        try:
+            return self._repository.update_user(uid, *args, **kwargs)
+        finally:
+            self._cache.invalidate_user(uid)
+
+    def delete_user(self, uid: str, *args, **kwargs) -> bool:
+        try:
+            return self._repository.delete_user(uid, *args, **kwargs)
+        finally:
+            self._cache.invalidate_user(uid)
+
+
+class AsyncCachedUserRepository:
+    """Decorates ``AsyncDatabaseUserRepository`` with the same shared cache."""
+
+    def __init__(self, repository: AsyncDatabaseUserRepository, cache: UserCache):
+        self._repository = repository
+        self._cache = cache
+
+    def __getattr__(self, name):
+        return getattr(self._repository, name)
+
+    async def get_user(self, uid: str) -> Optional[UserRecord]:
+        """Retrieve a user by UID (cached, including misses)."""
+
+        async def load():
+            return UserRecord.from_model(await self._repository.get_user(uid))
+
+        return await self._cache.aget_or_load(("user", uid), load)
+
+    async def list_users_keyset(
+        self,
+        limit: int = 10,
+        role: Optional[str] = None,
+        after: Optional[Tuple[datetime, str]] = None,
+    ) -> List[UserRecord]:
+        """List users ordered by (created_at, uid) (cached per page)."""
+
+        async def load():
+            users = await self._repository.list_users_keyset(limit=limit, role=role, after=after)
+            return [UserRecord.from_model(u) for u in users]
+
+        return await self._cache.aget_or_load(("list", "keyset", role.lower() if role else None, limit, after), load)
+
+    async def list_users_paginated(self, skip: int = 0, limit: int = 10, role: Optional[str] = None) -> List[UserRecord]:
+        """List users with OFFSET pagination (cached per page)."""
+
+        async def load():
+            users = await self._repository.list_users_paginated(skip=skip, limit=limit, role=role)
+            return [UserRecord.from_model(u) for u in users]
+
+        return await self._cache.aget_or_load(("list", "offset", role.lower() if role else None, skip, limit), load)
+
+    async def get_user_row(self, uid: str) -> Optional[UserRecord]:
+        """Retrieve a user by UID, loading it as a plain row on a miss."""
+
+        async def load():
+            row = await self._repository.get_user_row(uid)
+            return UserRecord._make(row) if row else None
+
+        return await self._cache.aget_or_load(("user", uid), load)
+
+    async def list_user_rows_keyset(
+        self,
+        limit: int = 10,
+        role: Optional[str] = None,
+        after: Optional[Tuple[datetime, str]] = None,
+    ) -> List[UserRecord]:
+        """``list_users_keyset`` loading plain rows on a miss."""
+
+        async def load():
+            rows = await self._repository.list_user_rows_keyset(limit=limit, role=role, after=after)
+            return [UserRecord._make(r) for r in rows]
+
+        return await self._cache.aget_or_load(("list", "keyset", role.lower() if role else None, limit, after), load)
+
+    async def list_user_rows_paginated(self, skip: int = 0, limit: int = 10, role: Optional[str] = None) -> List[UserRecord]:
+        """``list_users_paginated`` loading plain rows on a miss."""
+
+        async def load():
+            rows = await self._repository.list_user_rows_paginated(skip=skip, limit=limit, role=role)
+            return [UserRecord._make(r) for r in rows]
+
+        return await self._cache.aget_or_load(("list", "offset", role.lower() if role else None, skip, limit), load)
+
+    async def get_users_many(self, uids: Iterable[str] = (), emails: Iterable[str] = (), chunk_size: int = 500) -> UserLookup:
+        """Resolve uids from the cache, loading all misses in one batch; emails are not cached."""
+        uids = list(dict.fromkeys(uids))
+
+        async def load(keys):
+            lookup = await self._repository.get_users_many([key[1] for key in keys], chunk_size=chunk_size)
+            return {("user", uid): UserRecord._make(row) if row else None for uid, row in lookup.by_uid.items()}
+
+        users = await self._cache.aget_many_or_load([("user", uid) for uid in uids], load)
+        by_email = (await self._repository.get_users_many(emails=emails, chunk_size=chunk_size)).by_email
+        return UserLookup({uid: users[("user", uid)] for uid in uids}, by_email)
+
+    async def get_user_version(self, uid: str) -> Optional[datetime]:
+        """Return a user's ``updated_at`` from the cached user."""
+        user = await self.get_user(uid)
+        return user.updated_at if user else None
+
+    async def collection_version(self) -> Tuple[Optional[datetime], int]:
+        """Return the table version (cached like a list page)."""
+        return await self._cache.aget_or_load(("list", "version"), self._repository.collection_version)
+
+    async def add_user(self, person: Person) -> Row:
+        try:
+            return await self._repository.add_user(person)
+        finally:
+            self._cache.invalidate_user(person.uid)
+
+    async def upsert_user(self, person: Person) -> UpsertResult:
+        try:
+            return await self._repository.upsert_user(person)
+        finally:
+            self._cache.invalidate_user(person.uid)
+
+    async def add_users(self, persons: Iterable[Person], batch_size: int = 1000) -> List[dict]:
+        results = await self._repository.add_users(persons, batch_size)
+        self._cache.invalidate_users(r["uid"] for r in results if r["status"] == "created")
+        return results
+
+    async def update_user(self, uid: str, *args, **kwargs) -> Optional[Row]:
+        try:
+            return await self._repository.update_user(uid, *args, **kwargs)
+        finally:
+            self._cache.invalidate_user(uid)
+
+    async def delete_user(self, uid: str, *args, **kwargs) -> bool:
+        try:
+            return await self._repository.delete_user(uid, *args, **kwargs)
+        finally:
+            self._cache.invalidate_user(uid)
@@ -0,0 +1,141 @@
+"""Append-only change log of user writes for incremental sync.
+
+``DatabaseUserRepository`` appends one entry per insert, update and delete
+in the same transaction as the write, so the log never shows an uncommitted
+change and never misses a committed one. SQLite runs one write transaction
+at a time, so sequence numbers appear in commit order and a reader can
+resume from the last ``seq`` it saw.
+
+Entries carry the user's state after the change, so a client applies them
+as upserts and deletes. Compaction therefore only has to keep the newest
+entry per user. Delete entries (tombstones) are dropped once they are older
+than the retention period. The highest dropped ``seq`` becomes the horizon,
+and cursors below it must reload the full listing.
+
+Compaction takes the write lock before it reads the bookkeeping row, so
+overlapping runs queue instead of interleaving. Every worker runs it on the
+same schedule, and the row records when it last ran, so only the first
+worker to find a run due does the work.
+"""
+
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, case, delete, exists, func, insert, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session, aliased
+
+from app.db.models import ChangeLogStateModel, UserChangeModel
+
+CHANGE_OPS = ("insert", "update", "delete")
+
+# Seconds between compactions (shared by all API workers), and how long
+# delete entries are kept before cursors older than them must reload
+CHANGES_COMPACT_INTERVAL = float(os.getenv("CHANGES_COMPACT_INTERVAL", "600"))
+CHANGES_TOMBSTONE_TTL = timedelta(seconds=float(os.getenv("CHANGES_TOMBSTONE_TTL", str(7 * 24 * 3600))))
+
+CHANGE_COLUMNS = (
+    UserChangeModel.seq,
+    UserChangeModel.op,
+    UserChangeModel.uid,
+    UserChangeModel.name,
+    UserChangeModel.email,
+    UserChangeModel.role,
+    UserChangeModel.changed_at,
+)
+
+
+class ChangeLogRepository:
+    """Appends to, reads and compacts the ``user_changes`` table."""
+
+    def __init__(self, db: Session):
+        self._db = db
+
+    def record(self, op: str, users: Iterable) -> None:
+        """Append one ``op`` entry per user without committing.
+
+        ``users`` are objects or dicts with ``uid`` (plus ``name``, ``email``
+        and ``role`` unless ``op`` is ``"delete"``). Callers commit together
+        with the change itself.
+        """
+        now = datetime.utcnow()
+        rows = []
+        for user in users:
+            get = user.get if isinstance(user, dict) else lambda field, user=user: getattr(user, field)
+            state = (None, None, None) if op == "delete" else (get("name"), get("email"), get("role"))
+            rows.append({"uid": get("uid"), "op": op, "name": state[0], "email": state[1], "role": state[2], "changed_at": now})
+        if rows:
+            self._db.execute(insert(UserChangeModel), rows)
+
+    def since(self, seq: int, limit: int = 500) -> List[Row]:
+        """Up to ``limit`` entries after ``seq``, oldest first."""
+        stmt = select(*CHANGE_COLUMNS).where(UserChangeModel.seq > seq).order_by(UserChangeModel.seq).limit(limit)
+        return self._db.execute(stmt).all()
+
+    def latest_seq(self) -> int:
+        """Sequence number of the newest entry ever written (0 for an empty log)."""
+        latest = self._db.execute(select(func.max(UserChangeModel.seq))).scalar()
+        return max(latest or 0, self.state()["horizon"])
+
+    def state(self, lock: bool = False) -> Dict:
+        """Compaction bookkeeping; with ``lock`` read under the write lock (``SELECT ... FOR UPDATE``)."""
+        stmt = select(ChangeLogStateModel.horizon, ChangeLogStateModel.compacted_seq, ChangeLogStateModel.compacted_at)
+        row = self._db.execute(stmt.with_for_update() if lock else stmt).first()
+        if row is None:
+            return {"horizon": 0, "compacted_seq": 0, "compacted_at": None}
+        return {"horizon": row.horizon, "compacted_seq": row.compacted_seq, "compacted_at": row.compacted_at}
+
+    def horizon(self) -> int:
+        """Cursors below this ``seq`` may have missed compacted deletes."""
+        return self.state()["horizon"]
+
+    def compact(
+        self,
+        tombstone_ttl: timedelta = CHANGES_TOMBSTONE_TTL,
+        now: Optional[datetime] = None,
+        min_interval: float = 0,
+        commit: bool = True,
+    ) -> Optional[Dict[str, int]]:
+        """Drop superseded entries and expired tombstones in one transaction.
+
+        Only users written since the previous compaction are examined, so a
+        run costs in proportion to the recent writes, not to the log size.
+        With ``min_interval`` (seconds) nothing is done, and None returned,
+        when the previous compaction ran less than that long ago. With
+        ``commit=False`` the changes are only flushed, leaving the
+        transaction to the caller.
+        """
+        now = now or datetime.utcnow()
+        # lock first: the state, max(seq) and the deletes all see one state of the log
+        state = self.state(lock=True)
+        if min_interval and state["compacted_at"] is not None and now - state["compacted_at"] < timedelta(seconds=min_interval):
+            if commit:
+                self._db.rollback()
+            return None
+        upto = self._db.execute(select(func.max(UserChangeModel.seq))).scalar() or 0
+        later = aliased(UserChangeModel)
+        recent_uids = select(UserChangeModel.uid).where(UserChangeModel.seq > state["compacted_seq"])
+        superseded = self._db.execute(
+            delete(UserChangeModel)
+            .where(UserChangeModel.uid.in_(recent_uids))
+            .where(exists().where(and_(later.uid == UserChangeModel.uid, later.seq > UserChangeModel.seq)))
+        ).rowcount
+
+        cutoff = now - tombstone_ttl
+        expired = and_(UserChangeModel.op == "delete", UserChangeModel.changed_at < cutoff)
+        # RETURNING instead of a max(seq) query, which walks the whole log backwards by seq
+        dropped = self._db.scalars(delete(UserChangeModel).where(expired).returning(UserChangeModel.seq)).all()
+        highest = max(dropped, default=0)
+
+        # the horizon only ever moves forward
+        horizon = case((ChangeLogStateModel.horizon < highest, highest), else_=ChangeLogStateModel.horizon)
+        values = {"compacted_seq": upto, "compacted_at": now}
+        if self._db.execute(update(ChangeLogStateModel).values(horizon=horizon, **values)).rowcount == 0:
+            self._db.execute(insert(ChangeLogStateModel).values(id=1, horizon=highest, **values))
+        horizon = self.state()["horizon"]
+        if commit:
+            self._db.commit()
+        else:
+            self._db.flush()
+        return {"superseded": superseded, "tombstones": len(dropped), "horizon": horizon}
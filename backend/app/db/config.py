@@ -1,21 +1,212 @@
 """Database configuration and session management."""
 
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from dataclasses import dataclass, replace
+from typing import Optional
+
+from sqlalchemy import create_engine, event, Select, TextualSelect
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 
 # Database URL - using SQLite for simplicity
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./charity.db")
 
-# Create engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
-    echo=False,  # Set to True for SQL logging
-)
+# Request path: "sync" (thread pool + Session) or "async" (event loop + AsyncSession)
+DB_MODE = os.getenv("DB_MODE", "sync").lower()
+
+# Read path for user lookups and lists: "lean" (column rows encoded straight
+# to JSON) or "orm" (ORM models validated against the response model)
+READ_PATH = os.getenv("READ_PATH", "lean").lower()
+
+
+def to_async_url(url: str) -> str:
+    """Map a sync database URL to its async driver equivalent."""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    if url.startswith("postgresql:"):
+        return "postgresql+asyncpg:" + url[len("postgresql:"):]
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
+
+
+@dataclass(frozen=True)
+class ConnectionProfile:
+    """SQLite pragmas applied on connect, plus pool sizing for each engine.
+
+    ``None`` leaves the driver default in place. With ``split_readers`` a
+    second, read-only engine serves plain SELECTs so readers never queue
+    behind the writer pool.
+    """
+
+    journal_mode: Optional[str] = None
+    synchronous: Optional[str] = None
+    cache_size: Optional[int] = None  # pages, or KiB when negative
+    mmap_size: Optional[int] = None  # bytes
+    busy_timeout: Optional[int] = None  # milliseconds
+    pool_size: int = 5
+    max_overflow: int = 10
+    split_readers: bool = False
+    reader_pool_size: int = 8
+    reader_max_overflow: int = 8
+
+    @classmethod
+    def from_env(cls, base: "ConnectionProfile") -> "ConnectionProfile":
+        """Apply ``SQLITE_*`` / ``DB_*`` environment overrides to ``base``."""
+        overrides = {}
+        for field, env, cast in (
+            ("journal_mode", "SQLITE_JOURNAL_MODE", str),
+            ("synchronous", "SQLITE_SYNCHRONOUS", str),
+            ("cache_size", "SQLITE_CACHE_SIZE", int),
+            ("mmap_size", "SQLITE_MMAP_SIZE", int),
+            ("busy_timeout", "SQLITE_BUSY_TIMEOUT", int),
+            ("pool_size", "DB_POOL_SIZE", int),
+            ("max_overflow", "DB_MAX_OVERFLOW", int),
+            ("reader_pool_size", "DB_READER_POOL_SIZE", int),
+            ("reader_max_overflow", "DB_READER_MAX_OVERFLOW", int),
+        ):
+            if os.getenv(env):
+                overrides[field] = cast(os.environ[env])
+        return replace(base, **overrides)
+
+
+PROFILES = {
+    # Driver defaults: rollback journal, one engine for reads and writes
+    "legacy": ConnectionProfile(),
+    # WAL lets readers run alongside the single writer; one pooled writer
+    # connection serializes writes in the pool instead of in busy-wait loops
+    "production": ConnectionProfile(
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        cache_size=-65536,
+        mmap_size=268435456,
+        busy_timeout=5000,
+        pool_size=1,
+        max_overflow=0,
+        split_readers=True,
+    ),
+}
+
+DB_PROFILE = os.getenv("DB_PROFILE", "production").lower()
+PROFILE = ConnectionProfile.from_env(PROFILES[DB_PROFILE])
+
+
+def _is_file_sqlite(url: str) -> bool:
+    return url.startswith("sqlite") and make_url(url).database not in (None, "", ":memory:")
+
+
+def apply_pragmas(engine: Engine, profile: ConnectionProfile, read_only: bool = False) -> None:
+    """Register a connect hook that applies ``profile``'s pragmas."""
+    pragmas = [
+        ("journal_mode", profile.journal_mode),
+        ("synchronous", profile.synchronous),
+        ("cache_size", profile.cache_size),
+        ("mmap_size", profile.mmap_size),
+        ("busy_timeout", profile.busy_timeout),
+        ("query_only", "ON" if read_only else None),
+    ]
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas:
+            if value is not None:
+                cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def enable_transaction_control(engine: Engine, begin: str = "BEGIN") -> None:
+    """Emit BEGIN ourselves instead of relying on pysqlite's implicit one.
+
+    pysqlite only opens a transaction before DML, so a SAVEPOINT issued first
+    becomes the outermost transaction and its RELEASE commits. This is
+    SQLAlchemy's documented workaround, which makes ``begin_nested()`` safe.
+    """
+
+    @event.listens_for(engine, "connect")
+    def _disable_driver_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql(begin)
+
+
+def create_engines(url: str, profile: ConnectionProfile):
+    """Create the writer engine and the reader engine (the same one without a split)."""
+    if not url.startswith("sqlite"):
+        engine = create_engine(url, echo=False)
+        return engine, engine
+    connect_args = {"check_same_thread": False}
+    if not _is_file_sqlite(url):
+        engine = create_engine(url, connect_args=connect_args, echo=False)
+        enable_transaction_control(engine)
+        return engine, engine
+    writer = create_engine(
+        url,
+        connect_args=connect_args,
+        pool_size=profile.pool_size,
+        max_overflow=profile.max_overflow,
+        echo=False,  # Set to True for SQL logging
+    )
+    apply_pragmas(writer, profile)
+    if not profile.split_readers:
+        enable_transaction_control(writer)
+        return writer, writer
+    # the writer only sees write transactions, so take the write lock up front
+    enable_transaction_control(writer, "BEGIN IMMEDIATE")
+    reader = create_engine(
+        url,
+        connect_args=connect_args,
+        pool_size=profile.reader_pool_size,
+        max_overflow=profile.reader_max_overflow,
+        echo=False,
+    )
+    apply_pragmas(reader, profile, read_only=True)
+    return writer, reader
+
+
+class RoutingSession(Session):
+    """Session that sends plain (or textual) SELECTs to the reader engine.
+
+    Flushes, DML, ``SELECT ... FOR UPDATE`` and any statement after the first
+    write in a transaction go to the writer, so a transaction always reads its
+    own writes and a locking read happens under the write lock.
+    """
+
+    @staticmethod
+    def _is_read(clause) -> bool:
+        if isinstance(clause, TextualSelect):
+            return True
+        return isinstance(clause, Select) and clause._for_update_arg is None
+
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        reader = self.info.get("reader")
+        if reader is not None and not self.info.get("wrote"):
+            if not self._flushing and self._is_read(clause):
+                return reader
+            self.info["wrote"] = True
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _reset_routing(session, transaction):
+    if transaction.parent is None:
+        session.info["wrote"] = False
+
+
+def make_sessionmaker(writer: Engine, reader: Engine) -> sessionmaker:
+    """Session factory bound to ``writer`` that routes reads to ``reader``."""
+    info = {"reader": reader} if reader is not writer else {}
+    return sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=writer, info=info)
+
+
+# Create engines (writer, and a read-only reader pool under the production profile)
+engine, reader_engine = create_engines(DATABASE_URL, PROFILE)
 
 # Session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = make_sessionmaker(engine, reader_engine)
 
 # Base class for models
 Base = declarative_base()
@@ -28,3 +219,29 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+_async_engine = None
+_AsyncSessionLocal = None
+
+
+def get_async_sessionmaker():
+    """Return the async session factory, creating the async engine on first use.
+
+    Created lazily so the sync mode does not require the async driver.
+    """
+    global _async_engine, _AsyncSessionLocal
+    if _AsyncSessionLocal is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        _async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=False)
+        if _is_file_sqlite(ASYNC_DATABASE_URL):
+            apply_pragmas(_async_engine.sync_engine, PROFILE)
+        _AsyncSessionLocal = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _AsyncSessionLocal
+
+
+async def get_async_db():
+    """Dependency for FastAPI to provide an async DB session."""
+    async with get_async_sessionmaker()() as db:
+        yield db
@@ -0,0 +1,153 @@
+"""Cross-process generation counters that keep per-worker caches coherent.
+
+Several worker processes can serve one SQLite file, each with its own
+``UserCache``. A write committed by one worker must not leave the others
+serving the old user or list page, and there is no shared service to
+broadcast invalidations through. Instead every write bumps counters in a
+small file next to the database (``<database>-gen``): one per hashed uid
+slot and one for the whole table. Cache entries remember the counter they
+were loaded under and count as misses once it has moved on, so checking an
+entry is a read from a memory-mapped page.
+
+Counters are bumped after the transaction commits, by a ``Session``
+``after_commit`` hook fed by ``DatabaseUserRepository``, under an exclusive
+file lock so increments from different processes are never lost. Readers
+sample the counter before loading: a load that overlaps a commit carries the
+pre-bump value and is discarded on its next read.
+"""
+
+import mmap
+import os
+import struct
+import zlib
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Hashed uid slots; collisions only cost an extra reload
+SLOTS = 4096
+TABLE_SLOT = 0
+_U64 = struct.Struct("<Q")
+_SIZE = (SLOTS + 1) * _U64.size
+_PENDING = "changed_uids"
+
+
+def slot_of(uid: str) -> int:
+    """Counter slot of ``uid``; the same in every process (unlike ``hash``)."""
+    return 1 + zlib.crc32(uid.encode()) % SLOTS
+
+
+@lru_cache(maxsize=64)
+def generations_path(url: str) -> Optional[str]:
+    """Counter file for a file-backed SQLite ``url`` (any driver), else None."""
+    if not url.startswith("sqlite"):
+        return None
+    database = make_url(url).database
+    if database in (None, "", ":memory:"):
+        return None
+    return os.path.abspath(database) + "-gen"
+
+
+@contextmanager
+def _locked(f: BinaryIO) -> Iterator[None]:
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        return
+    f.seek(0)
+    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+    try:
+        yield
+    finally:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def _open(path: str) -> Iterator[BinaryIO]:
+    """Open the counter file, creating it zero-filled at full size if needed."""
+    with os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o644), "r+b") as f:
+        if os.fstat(f.fileno()).st_size < _SIZE:
+            with _locked(f):
+                if os.fstat(f.fileno()).st_size < _SIZE:
+                    f.truncate(_SIZE)
+        yield f
+
+
+def bump(path: str, uids: Iterable[str]) -> None:
+    """Advance the table counter and the counters of ``uids``."""
+    slots = sorted({TABLE_SLOT} | {slot_of(uid) for uid in uids})
+    with _open(path) as f, _locked(f):
+        for slot in slots:
+            f.seek(slot * _U64.size)
+            (value,) = _U64.unpack(f.read(_U64.size))
+            f.seek(slot * _U64.size)
+            f.write(_U64.pack(value + 1))
+        f.flush()
+
+
+class GenerationTable:
+    """Read side of a counter file, memory-mapped (on first read) for lock-free reads."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._map: Optional[mmap.mmap] = None
+
+    def _mapped(self) -> mmap.mmap:
+        if self._map is None:
+            with _open(self.path) as f:
+                self._map = mmap.mmap(f.fileno(), _SIZE, access=mmap.ACCESS_READ)
+        return self._map
+
+    def user(self, uid: str) -> int:
+        return _U64.unpack_from(self._map or self._mapped(), slot_of(uid) * _U64.size)[0]
+
+    def table(self) -> int:
+        return _U64.unpack_from(self._map or self._mapped(), TABLE_SLOT * _U64.size)[0]
+
+    def bump(self, uids: Iterable[str]) -> None:
+        bump(self.path, uids)
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+def generation_table(url: str) -> Optional[GenerationTable]:
+    """Counters shared by every process using the database at ``url``, if it is a SQLite file."""
+    path = generations_path(url)
+    return GenerationTable(path) if path else None
+
+
+def mark_changed(session: Session, uids: Iterable[str]) -> None:
+    """Record users written in ``session``'s transaction; bumped once it commits."""
+    session.info.setdefault(_PENDING, set()).update(uids)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_after_commit(session: Session) -> None:
+    uids = session.info.pop(_PENDING, None)
+    if uids is None or session.bind is None:
+        return
+    path = generations_path(str(session.bind.engine.url))
+    if path:
+        bump(path, uids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING, None)
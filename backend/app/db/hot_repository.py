@@ -0,0 +1,310 @@
+"""In-memory hot tier serving user reads from an indexed ``UserRepository``.
+
+With ``READ_BACKEND=memory`` the ``persons`` table is loaded into the store
+at startup and the lookups and pages the routes make are answered from it.
+Writes still go to the database first. Afterwards the affected rows are
+re-read and applied to the store under a lock, so the store converges on
+the committed state even when writes from several threads interleave.
+
+Each process holds its own copy. Writes made by other processes are picked
+up through the generation counters (``app.db.generations``): a read that
+finds the table counter moved past the one the store was caught up at first
+re-reads the users named in the newer change log entries (see
+``HotStoreTracker``).
+"""
+
+import asyncio
+import os
+import threading
+from datetime import datetime
+from itertools import chain
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import sessionmaker
+
+from app.db.async_repository import AsyncDatabaseUserRepository
+from app.db.changes import ChangeLogRepository
+from app.db.config import DATABASE_URL, SessionLocal
+from app.db.generations import GenerationTable, generation_table
+from app.db.repository import DatabaseUserRepository, UserLookup
+from app.models.person import Person
+from app.models.user_repo import StoredUser, UserRepository
+
+# "sqlite" reads from the database (behind the LRU cache), "memory" from the hot tier
+READ_BACKEND = os.getenv("READ_BACKEND", "sqlite").lower()
+
+
+def apply_rows(store: UserRepository, uids: Iterable[str], rows) -> None:
+    """Make ``store`` match ``rows`` for ``uids``; uids without a row are removed."""
+    present = set()
+    for row in rows:
+        store.put(StoredUser.from_row(row))
+        present.add(row.uid)
+    for uid in uids:
+        if uid not in present:
+            store.delete_user(uid)
+
+
+class HotStoreTracker:
+    """Catches a hot store up with writes committed by other processes.
+
+    Every committed write bumps the table counter in ``generations``. The
+    tracker remembers the counter and the change log ``seq`` the store was
+    last loaded or caught up at. Once the counter has moved on, the users in
+    the change log entries after that ``seq`` are re-read and applied. If
+    compaction has dropped entries past it, the whole table is reloaded
+    instead. Both marks are taken before reading, so a write that commits
+    meanwhile leaves the store stale and is picked up on the next read.
+    Without ``generations`` (in-memory databases) the store is never
+    considered stale.
+    """
+
+    def __init__(self, session_factory: sessionmaker, generations: Optional[GenerationTable], chunk_size: int = 500):
+        self._session_factory = session_factory
+        self.generations = generations
+        self.chunk_size = chunk_size
+        self.generation = 0
+        self.seq = 0
+        self._lock = threading.Lock()
+
+    def stale(self) -> bool:
+        return self.generations is not None and self.generations.table() != self.generation
+
+    def load(self, store: UserRepository, chunk_size: int = 10000) -> int:
+        """Load ``store`` from the database and remember where it was loaded."""
+        generation = self.generations.table() if self.generations is not None else 0
+        with self._session_factory() as db:
+            seq = ChangeLogRepository(db).latest_seq()
+        count = load_hot_store(self._session_factory, store, chunk_size)
+        self.generation, self.seq = generation, seq
+        return count
+
+    def catch_up(self, store: UserRepository) -> None:
+        """Apply to ``store`` the writes committed since it was last caught up."""
+        with self._lock:
+            if not self.stale():
+                return
+            generation = self.generations.table()
+            with self._session_factory() as db:
+                changes = ChangeLogRepository(db)
+                seq, uids = self.seq, set()
+                while True:
+                    entries = changes.since(seq, limit=self.chunk_size)
+                    uids.update(entry.uid for entry in entries)
+                    if entries:
+                        seq = entries[-1].seq
+                    if len(entries) < self.chunk_size:
+                        break
+                # read last: a compaction that ran meanwhile may have dropped entries we needed
+                if changes.horizon() > self.seq:
+                    self.load(store)
+                    return
+                apply_rows(store, uids, DatabaseUserRepository(db).get_user_rows(uids, self.chunk_size))
+            self.generation, self.seq = generation, seq
+
+
+def _lookup(store: UserRepository, uids: Iterable[str], emails: Iterable[str]) -> UserLookup:
+    return UserLookup(
+        {uid: store.get_user(uid) for uid in uids},
+        {email: store.get_user_by_email(email) for email in emails},
+    )
+
+
+class HotTierUserRepository:
+    """Serves reads from ``store`` and writes through ``repository``.
+
+    Methods that are not served from memory are delegated unchanged. With a
+    ``tracker`` each read first catches the store up with writes committed by
+    other processes.
+    """
+
+    def __init__(
+        self,
+        repository: DatabaseUserRepository,
+        store: UserRepository,
+        apply_lock: threading.Lock,
+        tracker: Optional[HotStoreTracker] = None,
+    ):
+        self._repository = repository
+        self._store = store
+        self._apply_lock = apply_lock
+        self._tracker = tracker
+
+    def __getattr__(self, name):
+        return getattr(self._repository, name)
+
+    def _fresh(self) -> UserRepository:
+        if self._tracker is not None and self._tracker.stale():
+            self._tracker.catch_up(self._store)
+        return self._store
+
+    def get_user(self, uid: str) -> Optional[StoredUser]:
+        return self._fresh().get_user(uid)
+
+    get_user_row = get_user
+
+    def get_user_by_email(self, email: str) -> Optional[StoredUser]:
+        return self._fresh().get_user_by_email(email)
+
+    def get_users_many(self, uids: Iterable[str] = (), emails: Iterable[str] = (), chunk_size: int = 500) -> UserLookup:
+        return _lookup(self._fresh(), uids, emails)
+
+    def get_user_version(self, uid: str) -> Optional[datetime]:
+        user = self._fresh().get_user(uid)
+        return user.updated_at if user else None
+
+    def list_users(self, role: Optional[str] = None) -> List[StoredUser]:
+        return self._fresh().list_users(role)
+
+    def list_users_keyset(
+        self,
+        limit: int = 10,
+        role: Optional[str] = None,
+        after: Optional[Tuple[datetime, str]] = None,
+    ) -> List[StoredUser]:
+        return self._fresh().list_users_keyset(limit=limit, role=role, after=after)
+
+    list_user_rows_keyset = list_users_keyset
+
+    def list_users_paginated(self, skip: int = 0, limit: int = 10, role: Optional[str] = None) -> List[StoredUser]:
+        return self._fresh().list_users_paginated(skip=skip, limit=limit, role=role)
+
+    list_user_rows_paginated = list_users_paginated
+
+    def _sync(self, uids: List[str]) -> None:
+        # re-read under the lock: whoever applies last read the latest commit
+        with self._apply_lock:
+            apply_rows(self._store, uids, self._repository.get_user_rows(uids))
+
+    def add_user(self, person: Person):
+        try:
+            return self._repository.add_user(person)
+        finally:
+            self._sync([person.uid])
+
+    def add_users(self, persons: Iterable[Person], batch_size: int = 1000) -> List[dict]:
+        results = self._repository.add_users(persons, batch_size)
+        self._sync([r["uid"] for r in results if r["status"] == "created"])
+        return results
+
+    def upsert_user(self, person: Person):
+        try:
+            return self._repository.upsert_user(person)
+        finally:
+            self._sync([person.uid])
+
+    def update_user(self, uid: str, *args, **kwargs):
+        try:
+            return self._repository.update_user(uid, *args, **kwargs)
+        finally:
+            self._sync([uid])
+
+    def delete_user(self, uid: str, *args, **kwargs) -> bool:
+        try:
+            return self._repository.delete_user(uid, *args, **kwargs)
+        finally:
+            self._sync([uid])
+
+
+class AsyncHotTierUserRepository:
+    """Async counterpart of ``HotTierUserRepository`` for ``DB_MODE=async``."""
+
+    def __init__(
+        self,
+        repository: AsyncDatabaseUserRepository,
+        store: UserRepository,
+        apply_lock: asyncio.Lock,
+        tracker: Optional[HotStoreTracker] = None,
+    ):
+        self._repository = repository
+        self._store = store
+        self._apply_lock = apply_lock
+        self._tracker = tracker
+
+    def __getattr__(self, name):
+        return getattr(self._repository, name)
+
+    async def _fresh(self) -> UserRepository:
+        if self._tracker is not None and self._tracker.stale():
+            await asyncio.to_thread(self._tracker.catch_up, self._store)
+        return self._store
+
+    async def get_user(self, uid: str) -> Optional[StoredUser]:
+        return (await self._fresh()).get_user(uid)
+
+    get_user_row = get_user
+
+    async def get_user_by_email(self, email: str) -> Optional[StoredUser]:
+        return (await self._fresh()).get_user_by_email(email)
+
+    async def get_users_many(self, uids: Iterable[str] = (), emails: Iterable[str] = (), chunk_size: int = 500) -> UserLookup:
+        return _lookup(await self._fresh(), uids, emails)
+
+    async def get_user_version(self, uid: str) -> Optional[datetime]:
+        user = (await self._fresh()).get_user(uid)
+        return user.updated_at if user else None
+
+    async def list_users(self, role: Optional[str] = None) -> List[StoredUser]:
+        return (await self._fresh()).list_users(role)
+
+    async def list_users_keyset(
+        self,
+        limit: int = 10,
+        role: Optional[str] = None,
+        after: Optional[Tuple[datetime, str]] = None,
+    ) -> List[StoredUser]:
+        return (await self._fresh()).list_users_keyset(limit=limit, role=role, after=after)
+
+    list_user_rows_keyset = list_users_keyset
+
+    async def list_users_paginated(self, skip: int = 0, limit: int = 10, role: Optional[str] = None) -> List[StoredUser]:
+        return (await self._fresh()).list_users_paginated(skip=skip, limit=limit, role=role)
+
+    list_user_rows_paginated = list_users_paginated
+
+    async def _sync(self, uids: List[str]) -> None:
+        async with self._apply_lock:
+            apply_rows(self._store, uids, await self._repository.get_user_rows(uids))
+
+    async def add_user(self, person: Person):
+        try:
+            return await self._repository.add_user(person)
+        finally:
+            await self._sync([person.uid])
+
+    async def add_users(self, persons: Iterable[Person], batch_size: int = 1000) -> List[dict]:
+        results = await self._repository.add_users(persons, batch_size)
+        await self._sync([r["uid"] for r in results if r["status"] == "created"])
+        return results
+
+    async def upsert_user(self, person: Person):
+        try:
+            return await self._repository.upsert_user(person)
+        finally:
+            await self._sync([person.uid])
+
+    async def update_user(self, uid: str, *args, **kwargs):
+        try:
+            return await self._repository.update_user(uid, *args, **kwargs)
+        finally:
+            await self._sync([uid])
+
+    async def delete_user(self, uid: str, *args, **kwargs) -> bool:
+        try:
+            return await self._repository.delete_user(uid, *args, **kwargs)
+        finally:
+            await self._sync([uid])
+
+
+def load_hot_store(session_factory: sessionmaker, store: UserRepository, chunk_size: int = 10000) -> int:
+    """Load ``store`` from one consistent read of ``persons``; returns the user count."""
+    with session_factory() as db:
+        chunks = DatabaseUserRepository(db).iter_user_chunks(chunk_size=chunk_size)
+        return store.load(chain.from_iterable(chunks))
+
+
+# Process-wide hot tier used by the API routes when READ_BACKEND=memory
+hot_store = UserRepository()
+hot_store_lock = threading.Lock()
+async_hot_store_lock = asyncio.Lock()
+hot_store_tracker = HotStoreTracker(SessionLocal, generation_table(DATABASE_URL))
@@ -1,6 +1,6 @@
 """SQLAlchemy ORM models demonstrating inheritance and abstraction."""
 
-from sqlalchemy import Column, String, DateTime, func
+from sqlalchemy import Column, String, DateTime, Index, Integer, func
 from datetime import datetime
 from app.db.config import Base
 
@@ -17,5 +17,69 @@ class PersonModel(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # Keyset pagination orders by (created_at, uid), optionally within a role
+        Index("ix_persons_created_at_uid", "created_at", "uid"),
+        Index("ix_persons_role_created_at_uid", "role", "created_at", "uid"),
+        # Incremental exports filter and order by updated_at
+        Index("ix_persons_updated_at_uid", "updated_at", "uid"),
+    )
+
     def __repr__(self):
         return f"<Person(uid={self.uid}, name={self.name}, role={self.role})>"
+
+
+class RoleCountModel(Base):
+    """Per-role user counters, maintained in the same transaction as person writes."""
+
+    __tablename__ = "role_counts"
+
+    role = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<RoleCount(role={self.role}, count={self.count})>"
+
+
+class UserChangeModel(Base):
+    """Append-only change log of person writes, in commit order.
+
+    Written in the same transaction as the change. ``seq`` is AUTOINCREMENT
+    so compaction never lets a sequence number be handed out twice.
+    """
+
+    __tablename__ = "user_changes"
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    uid = Column(String, nullable=False)
+    op = Column(String, nullable=False)  # insert, update, delete
+    # state after the change; null for deletes
+    name = Column(String)
+    email = Column(String)
+    role = Column(String)
+    changed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        # compaction finds older entries for the same user
+        Index("ix_user_changes_uid_seq", "uid", "seq"),
+        # and expired tombstones, without scanning the whole log
+        Index("ix_user_changes_tombstones", "changed_at", sqlite_where=op == "delete", postgresql_where=op == "delete"),
+        {"sqlite_autoincrement": True},
+    )
+
+    def __repr__(self):
+        return f"<UserChange(seq={self.seq}, op={self.op}, uid={self.uid})>"
+
+
+class ChangeLogStateModel(Base):
+    """Single row of change log bookkeeping maintained by compaction."""
+
+    __tablename__ = "user_changes_state"
+
+    id = Column(Integer, primary_key=True)
+    # changes at or below this seq may be missing; older cursors must reload
+    horizon = Column(Integer, nullable=False, default=0)
+    # entries at or below this seq have already been compacted
+    compacted_seq = Column(Integer, nullable=False, default=0)
+    # when the last compaction ran; workers on one schedule skip a run that is not yet due
+    compacted_at = Column(DateTime, nullable=True)
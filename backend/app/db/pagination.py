@@ -0,0 +1,31 @@
+"""Opaque cursor tokens for keyset pagination over (created_at, uid)."""
+
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from app.db.models import PersonModel
+
+Cursor = Tuple[datetime, str]
+
+
+def encode_cursor(user: PersonModel) -> str:
+    """Build an opaque token pointing just past ``user`` in (created_at, uid) order."""
+    raw = json.dumps([user.created_at.isoformat(), user.uid], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: Optional[str]) -> Optional[Cursor]:
+    """Decode a token produced by ``encode_cursor``.
+
+    Raises ValueError if the token is malformed.
+    """
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        created_at, uid = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), str(uid)
+    except Exception:
+        raise ValueError("Invalid cursor")
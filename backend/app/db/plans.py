@@ -0,0 +1,193 @@
+"""``EXPLAIN QUERY PLAN`` checks for the statements the repositories send.
+
+Rather than keeping a second, hand-written copy of the SQL, the check calls
+the repositories the way the API does, captures every statement they send
+(with its parameters) and then asks SQLite how it would run each one
+against the same database. A plan step that reads a table without an index
+(``SCAN persons``) is a full scan: fast on a test database, a regression at
+a million users. Index scans (``SCAN persons USING INDEX ...``) are ordered
+walks that stop at the page limit and are fine.
+
+``SMALL_TABLES`` hold a handful of rows whatever the user count, so scanning
+them is not reported. Queries that are not ``hot`` (the ``LIKE`` search
+fallback, counter checks) scan by design; their plans
+are reported but never fail the check. Write calls, compaction included,
+only flush, and their transaction is rolled back, so the check never
+changes the database.
+"""
+
+import re
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.db.changes import ChangeLogRepository
+from app.db.models import PersonModel
+from app.db.repository import USER_COLUMNS, DatabaseUserRepository
+from app.db.search import UserSearchRepository
+from app.db.stats import RoleStatsRepository
+from app.models.person import Donor
+
+SMALL_TABLES = frozenset(("role_counts", "user_changes_state"))
+
+# "SCAN persons" (SQLite 3.36+) or "SCAN TABLE persons"; index and virtual table scans say more
+_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+_TRANSACTION_CONTROL = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE", "PRAGMA")
+
+
+class RepositoryQuery(NamedTuple):
+    """A repository call to explain; only ``hot`` ones fail the check when they scan."""
+
+    name: str
+    call: Callable[[Session], object]
+    hot: bool = True
+
+
+class QueryPlan(NamedTuple):
+    """The plan of one statement sent by a repository call."""
+
+    query: str
+    hot: bool
+    sql: str
+    steps: List[str]
+
+    @property
+    def full_scans(self) -> List[str]:
+        """Tables (or aliases) this plan reads without an index."""
+        return full_scans(self.steps)
+
+    @property
+    def failed(self) -> bool:
+        return self.hot and bool(self.full_scans)
+
+
+def full_scans(steps: Iterable[str]) -> List[str]:
+    """Tables read without an index in ``steps`` (``EXPLAIN QUERY PLAN`` details), small tables aside."""
+    tables = []
+    for step in steps:
+        match = _FULL_SCAN.match(step)
+        if match and match.group(1) not in SMALL_TABLES:
+            tables.append(match.group(1))
+    return tables
+
+
+@contextmanager
+def capture_statements(engines: Iterable[Engine]) -> Iterator[List[Tuple[str, tuple]]]:
+    """Collect ``(statement, parameters)`` sent to ``engines``, transaction control aside.
+
+    For an executemany only the first parameter set is kept: they share a plan.
+    """
+    statements: List[Tuple[str, tuple]] = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith(_TRANSACTION_CONTROL):
+            statements.append((statement, parameters[0] if executemany else parameters))
+
+    engines = list(engines)
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", listener)
+    try:
+        yield statements
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", listener)
+
+
+def _sample_user(Session: sessionmaker) -> tuple:
+    """(uid, email, name, role, created_at, updated_at) of an existing user, or made-up values on an empty table."""
+    with Session() as db:
+        user = db.execute(select(*USER_COLUMNS).order_by(PersonModel.uid).limit(1)).first()
+    if user is None:
+        now = datetime.utcnow()
+        return "plan-check", "plan-check@example.com", "Plan Check", "donor", now, now
+    return user.uid, user.email, user.name, user.role, user.created_at, user.updated_at
+
+
+def repository_queries(
+    uid: str, email: str, name: str, role: str, created_at: datetime, updated_at: datetime
+) -> List[RepositoryQuery]:
+    """Every repository query the API and the background tasks run, aimed at an existing user."""
+    repo = lambda db: DatabaseUserRepository(db, autocommit=False)  # noqa: E731
+    word = name.split()[0] if name.split() else "a"
+    other_role = "vendor" if role != "vendor" else "donor"
+    cursor = (created_at, uid)
+    newcomer = Donor(uid="plan-check-new", name="Plan Check", email="plan-check-new@example.com")
+
+    def first_chunk(**kwargs):
+        def call(db):
+            chunks = repo(db).iter_user_chunks(**kwargs)
+            try:
+                return next(chunks, None)
+            finally:
+                chunks.close()
+        return call
+
+    return [
+        RepositoryQuery("get_user", lambda db: repo(db).get_user(uid)),
+        RepositoryQuery("get_user_row", lambda db: repo(db).get_user_row(uid)),
+        RepositoryQuery("get_user_by_email", lambda db: repo(db).get_user_by_email(email)),
+        RepositoryQuery("get_user_version", lambda db: repo(db).get_user_version(uid)),
+        RepositoryQuery("get_users_many", lambda db: repo(db).get_users_many([uid, "missing"], [email, "missing@example.com"])),
+        RepositoryQuery("collection_version", lambda db: repo(db).collection_version()),
+        RepositoryQuery("list_user_rows_paginated", lambda db: repo(db).list_user_rows_paginated(skip=20, limit=10)),
+        RepositoryQuery("list_user_rows_paginated(role)", lambda db: repo(db).list_user_rows_paginated(skip=20, limit=10, role=role)),
+        RepositoryQuery("list_users_paginated(role)", lambda db: repo(db).list_users_paginated(skip=20, limit=10, role=role)),
+        RepositoryQuery("list_user_rows_keyset", lambda db: repo(db).list_user_rows_keyset(after=cursor)),
+        RepositoryQuery("list_user_rows_keyset(role)", lambda db: repo(db).list_user_rows_keyset(role=role, after=cursor)),
+        RepositoryQuery("list_users_keyset(role)", lambda db: repo(db).list_users_keyset(role=role, after=cursor)),
+        RepositoryQuery("iter_user_chunks(role)", first_chunk(role=role)),
+        RepositoryQuery("iter_user_chunks(updated_since)", first_chunk(updated_since=updated_at)),
+        RepositoryQuery("search", lambda db: UserSearchRepository(db).search(word)),
+        RepositoryQuery("search(role)", lambda db: UserSearchRepository(db).search(word, role=role)),
+        RepositoryQuery("changes.since", lambda db: ChangeLogRepository(db).since(0)),
+        RepositoryQuery("changes.latest_seq", lambda db: ChangeLogRepository(db).latest_seq()),
+        RepositoryQuery("stats.counts", lambda db: RoleStatsRepository(db).counts()),
+        RepositoryQuery("add_user", lambda db: repo(db).add_user(newcomer)),
+        RepositoryQuery("upsert_user", lambda db: repo(db).upsert_user(Donor(uid=uid, name=f"{name} 2", email=email))),
+        RepositoryQuery("update_user", lambda db: repo(db).update_user(uid, name=f"{name} 2", if_updated_at=[updated_at])),
+        RepositoryQuery("update_user(role)", lambda db: repo(db).update_user(uid, role=other_role)),
+        RepositoryQuery("delete_user", lambda db: repo(db).delete_user(uid, if_updated_at=[updated_at])),
+        RepositoryQuery("changes.compact", lambda db: ChangeLogRepository(db).compact(commit=False)),
+        # full scans by design: the LIKE fallback and counter checks. list_users is
+        # left out: it returns every row, so just running it loads the whole table
+        RepositoryQuery("search_like", lambda db: UserSearchRepository(db).search_like(word), hot=False),
+        RepositoryQuery("stats.check", lambda db: RoleStatsRepository(db).check(), hot=False),
+    ]
+
+
+def explain_queries(Session: sessionmaker, queries: Iterable[RepositoryQuery] = None) -> List[QueryPlan]:
+    """Run each query (``repository_queries`` by default), then explain every statement it sent.
+
+    Returns one ``QueryPlan`` per distinct statement of each query, in call order.
+    """
+    writer = Session.kw["bind"]
+    engines = {writer, Session.kw.get("info", {}).get("reader", writer)}
+    if queries is None:
+        queries = repository_queries(*_sample_user(Session))
+
+    captured = []
+    for query in queries:
+        with Session() as db, capture_statements(engines) as statements:
+            try:
+                query.call(db)
+            finally:
+                db.rollback()
+        first: dict = {}
+        for sql, parameters in statements:
+            first.setdefault(sql, parameters)
+        captured += [(query, sql, parameters) for sql, parameters in first.items()]
+
+    raw = writer.raw_connection()
+    try:
+        cursor = raw.cursor()
+        plans = []
+        for query, sql, parameters in captured:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", parameters)
+            plans.append(QueryPlan(query.name, query.hot, sql, [row[3] for row in cursor.fetchall()]))
+        return plans
+    finally:
+        raw.close()
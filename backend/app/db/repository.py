@@ -1,28 +1,80 @@
 """Database repository layer demonstrating encapsulation and abstraction."""
 
-from typing import Optional, List
+from typing import Container, Dict, Optional, List, Iterable, Iterator, NamedTuple, Tuple
+from datetime import datetime
+from sqlalchemy import delete, func, or_, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
-from app.db.models import PersonModel
+from app.db.changes import ChangeLogRepository
+from app.db.generations import mark_changed
+from app.db.models import PersonModel, RoleCountModel
+from app.db.stats import RoleStatsRepository
 from app.models.person import Person, Donor, Vendor, Victim
 
 
+# Columns of the lean read path, in ``UserRecord`` order
+USER_COLUMNS = (
+    PersonModel.uid,
+    PersonModel.name,
+    PersonModel.email,
+    PersonModel.role,
+    PersonModel.created_at,
+    PersonModel.updated_at,
+)
+
+
+class VersionConflict(Exception):
+    """The user changed since the version the caller expected."""
+
+
+class UserConflict(KeyError):
+    """A write collided with another user's uid or email; ``constraint`` says which."""
+
+    MESSAGES = {"uid": "User with this UID already exists", "email": "User with this email already exists"}
+
+    def __init__(self, constraint: str):
+        super().__init__(self.MESSAGES[constraint])
+        self.constraint = constraint
+
+    def __str__(self) -> str:
+        return self.args[0]
+
+
+class UpsertResult(NamedTuple):
+    """Outcome of ``upsert_user``: the stored user and whether this call created it."""
+
+    user: Row
+    created: bool
+
+
+class UserLookup(NamedTuple):
+    """Users resolved by ``get_users_many``, in request order; ``None`` marks a miss."""
+
+    by_uid: Dict[str, Optional[Row]]
+    by_email: Dict[str, Optional[Row]]
+
+
 class PersonFactory:
     """Factory pattern for creating Person objects from database records."""
 
     @staticmethod
     def create_from_db_model(db_model: PersonModel) -> Person:
         """Convert database model to domain Person object."""
-        role = db_model.role.lower()
-        if role == "donor":
-            return Donor(uid=db_model.uid, name=db_model.name, email=db_model.email)
-        elif role == "vendor":
-            return Vendor(uid=db_model.uid, name=db_model.name, email=db_model.email)
+        return PersonFactory.create(db_model.role, uid=db_model.uid, name=db_model.name, email=db_model.email)
+
+    @staticmethod
+    def create(role: Optional[str], uid: str, name: str, email: str) -> Person:
+        """Create the Person subclass for ``role`` (donor when unknown)."""
+        role = (role or "donor").lower()
+        if role == "vendor":
+            return Vendor(uid=uid, name=name, email=email)
         elif role == "victim":
-            return Victim(uid=db_model.uid, name=db_model.name, email=db_model.email)
+            return Victim(uid=uid, name=name, email=email)
         else:
-            return Donor(uid=db_model.uid, name=db_model.name, email=db_model.email)
+            return Donor(uid=uid, name=name, email=email)
 
 
 class DatabaseUserRepository:
@@ -34,28 +86,158 @@ class DatabaseUserRepository:
     - Single Responsibility: handles all user persistence
     """
 
-    def __init__(self, db: Session):
-        """Initialize with SQLAlchemy session."""
+    def __init__(self, db: Session, autocommit: bool = True):
+        """Initialize with SQLAlchemy session.
+
+        With ``autocommit=False`` the single-row writes only flush, leaving
+        the transaction to the caller (e.g. the group-commit coalescer).
+        """
         self._db = db
+        self._autocommit = autocommit
+        self._stats = RoleStatsRepository(db)
+        self._changes = ChangeLogRepository(db)
 
-    def add_user(self, person: Person) -> PersonModel:
-        """Create and persist a user from a Person object."""
-        try:
-            db_model = PersonModel(
-                uid=person.uid,
-                name=person.name,
-                email=person.email,
-                role=person.get_role(),
-            )
-            self._db.add(db_model)
+    def _commit(self) -> None:
+        if self._autocommit:
             self._db.commit()
-            self._db.refresh(db_model)
-            return db_model
-        except IntegrityError as e:
+        else:
+            self._db.flush()
+
+    def _rollback(self) -> None:
+        if self._autocommit:
             self._db.rollback()
-            if "UNIQUE constraint failed" in str(e):
-                raise KeyError("User with this UID or email already exists")
-            raise
+
+    def _insert(self):
+        """INSERT into ``persons`` supporting the dialect's ON CONFLICT clauses."""
+        dialect = self._db.get_bind().dialect.name
+        return (postgresql.insert if dialect == "postgresql" else sqlite.insert)(PersonModel)
+
+    def _taken_uids(self, uids: Iterable[str]) -> set:
+        """Which of ``uids`` exist; after a write this reads inside the write transaction."""
+        return set(self._db.scalars(select(PersonModel.uid).where(PersonModel.uid.in_(list(uids)))))
+
+    def add_user(self, person: Person) -> Row:
+        """Create a user with a single INSERT ... ON CONFLICT DO NOTHING RETURNING.
+
+        Raises ``UserConflict`` (a ``KeyError``) naming the uid or email
+        constraint when either is already taken.
+        """
+        stmt = (
+            self._insert()
+            .values(uid=person.uid, name=person.name, email=person.email, role=person.get_role())
+            .on_conflict_do_nothing()
+            .returning(*USER_COLUMNS)
+        )
+        user = self._db.execute(stmt).first()
+        if user is None:
+            conflict = UserConflict("uid" if self._taken_uids([person.uid]) else "email")
+            self._rollback()
+            raise conflict
+        self._stats.apply_deltas({user.role: 1})
+        self._changes.record("insert", [user])
+        mark_changed(self._db, [user.uid])
+        self._commit()
+        return user
+
+    def upsert_user(self, person: Person) -> UpsertResult:
+        """Create the user, or update its name and email when the uid exists, in one statement.
+
+        The role is only set on creation. Writing the values the user already
+        has changes nothing (``updated_at`` included), so retries are free.
+        Raises ``UserConflict`` when the email belongs to another user.
+        """
+        now = datetime.utcnow()
+        stmt = self._insert().values(
+            uid=person.uid, name=person.name, email=person.email, role=person.get_role(),
+            created_at=now, updated_at=now,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PersonModel.uid],
+            set_={"name": stmt.excluded.name, "email": stmt.excluded.email, "updated_at": now},
+            where=or_(PersonModel.name != stmt.excluded.name, PersonModel.email != stmt.excluded.email),
+        ).returning(*USER_COLUMNS)
+        try:
+            user = self._db.execute(stmt).first()
+        except IntegrityError:
+            # the uid conflict is handled above, so only the email can collide
+            self._rollback()
+            raise UserConflict("email")
+        if user is None:
+            user = self._db.execute(select(*USER_COLUMNS).where(PersonModel.uid == person.uid)).first()
+            self._rollback()
+            return UpsertResult(user, False)
+        # an update keeps the original created_at, so only an insert returns ``now``
+        created = user.created_at == now
+        if created:
+            self._stats.apply_deltas({user.role: 1})
+        self._changes.record("insert" if created else "update", [user])
+        mark_changed(self._db, [user.uid])
+        self._commit()
+        return UpsertResult(user, created)
+
+    def add_users(self, persons: Iterable[Person], batch_size: int = 1000) -> List[dict]:
+        """Create many users using one transaction per batch.
+
+        Returns one result dict per input row, in input order, with a
+        ``status`` of ``"created"`` or ``"conflict"``. Conflicting rows
+        (existing uid/email, or duplicates within the input) are skipped
+        without failing the rest of the batch.
+        """
+        results: List[dict] = []
+        batch: List[Person] = []
+        for person in persons:
+            batch.append(person)
+            if len(batch) >= batch_size:
+                results.extend(self._add_batch(batch, offset=len(results)))
+                batch = []
+        if batch:
+            results.extend(self._add_batch(batch, offset=len(results)))
+        return results
+
+    def _add_batch(self, persons: List[Person], offset: int = 0) -> List[dict]:
+        """Insert one batch with INSERT ... ON CONFLICT DO NOTHING and report per-row status."""
+        results: List[dict] = []
+        rows: List[dict] = []
+        batch_uids: set = set()
+        batch_emails: set = set()
+        for i, person in enumerate(persons):
+            result = {"index": offset + i, "uid": person.uid, "status": "created", "detail": None}
+            if person.uid in batch_uids:
+                result.update(status="conflict", detail=UserConflict.MESSAGES["uid"])
+            elif person.email in batch_emails:
+                result.update(status="conflict", detail=UserConflict.MESSAGES["email"])
+            else:
+                batch_uids.add(person.uid)
+                batch_emails.add(person.email)
+                rows.append({"uid": person.uid, "name": person.name, "email": person.email, "role": person.get_role()})
+            results.append(result)
+
+        if not rows:
+            return results
+        stmt = self._insert().on_conflict_do_nothing().returning(PersonModel.uid)
+        inserted = set(self._db.scalars(stmt, rows))
+        skipped = [row["uid"] for row in rows if row["uid"] not in inserted]
+        if skipped:
+            taken = self._taken_uids(skipped)
+            for result in results:
+                if result["status"] == "created" and result["uid"] not in inserted:
+                    constraint = "uid" if result["uid"] in taken else "email"
+                    result.update(status="conflict", detail=UserConflict.MESSAGES[constraint])
+        created = [row for row in rows if row["uid"] in inserted]
+        if created:
+            self._stats.apply_deltas(self._role_deltas(created))
+            self._changes.record("insert", created)
+            mark_changed(self._db, [row["uid"] for row in created])
+        self._db.commit()
+        return results
+
+    @staticmethod
+    def _role_deltas(rows: List[dict]) -> dict:
+        """Count inserted rows per role for the counters table."""
+        deltas: dict = {}
+        for row in rows:
+            deltas[row["role"]] = deltas.get(row["role"], 0) + 1
+        return deltas
 
     def get_user(self, uid: str) -> Optional[PersonModel]:
         """Retrieve a user by UID."""
@@ -65,26 +247,87 @@ class DatabaseUserRepository:
         """Retrieve a user by email."""
         return self._db.query(PersonModel).filter(PersonModel.email == email).first()
 
-    def update_user(self, uid: str, name: Optional[str] = None, email: Optional[str] = None) -> Optional[PersonModel]:
-        """Update a user's attributes."""
-        user = self.get_user(uid)
-        if not user:
-            return None
+    def get_user_version(self, uid: str) -> Optional[datetime]:
+        """Return a user's ``updated_at`` without loading the row."""
+        return self._db.execute(select(PersonModel.updated_at).where(PersonModel.uid == uid)).scalar_one_or_none()
+
+    def collection_version(self) -> Tuple[Optional[datetime], int]:
+        """Return (latest ``updated_at``, user count), which changes on every write.
+
+        Inserts and updates move the latest ``updated_at`` forward and deletes
+        lower the count, so no two states of the table share a version. Both
+        parts come from an index and the role counters.
+        """
+        latest = select(func.max(PersonModel.updated_at)).scalar_subquery()
+        total = select(func.coalesce(func.sum(RoleCountModel.count), 0)).scalar_subquery()
+        return tuple(self._db.execute(select(latest, total)).one())
+
+    def _missed(self, uid: str, if_updated_at: Optional[Container[datetime]]) -> None:
+        """End a write that matched no row, raising ``VersionConflict`` if the user exists."""
+        exists = if_updated_at is not None and self._taken_uids([uid])
+        self._rollback()
+        if exists:
+            raise VersionConflict(uid)
+
+    def update_user(
+        self,
+        uid: str,
+        name: Optional[str] = None,
+        email: Optional[str] = None,
+        role: Optional[str] = None,
+        if_updated_at: Optional[Container[datetime]] = None,
+    ) -> Optional[Row]:
+        """Update a user's attributes with a single UPDATE ... RETURNING.
+
+        With ``if_updated_at``, raises ``VersionConflict`` unless the user's
+        current ``updated_at`` is one of those values; the version check is
+        part of the UPDATE, so it is atomic. Raises ``UserConflict`` when the
+        new email belongs to another user.
+        """
+        values = {"updated_at": datetime.utcnow()}
         if name:
-            user.name = name
+            values["name"] = name
         if email:
-            user.email = email
-        self._db.commit()
-        self._db.refresh(user)
+            values["email"] = email
+        old_role = None
+        if role:
+            # the counters need the role being replaced, which RETURNING cannot report
+            old_role = self._db.execute(
+                select(PersonModel.role).where(PersonModel.uid == uid).with_for_update()
+            ).scalar_one_or_none()
+            values["role"] = role.lower()
+        stmt = update(PersonModel).where(PersonModel.uid == uid)
+        if if_updated_at is not None:
+            stmt = stmt.where(PersonModel.updated_at.in_(list(if_updated_at)))
+        try:
+            user = self._db.execute(stmt.values(**values).returning(*USER_COLUMNS)).first()
+        except IntegrityError:
+            # the uid is not changed, so only the email can collide
+            self._rollback()
+            raise UserConflict("email")
+        if user is None:
+            self._missed(uid, if_updated_at)
+            return None
+        if old_role is not None and old_role != user.role:
+            self._stats.apply_deltas({old_role: -1, user.role: 1})
+        self._changes.record("update", [user])
+        mark_changed(self._db, [uid])
+        self._commit()
         return user
 
-    def delete_user(self, uid: str) -> bool:
-        """Delete a user by UID."""
-        user = self.get_user(uid)
-        if not user:
+    def delete_user(self, uid: str, if_updated_at: Optional[Container[datetime]] = None) -> bool:
+        """Delete a user with a single DELETE ... RETURNING (``if_updated_at`` as in ``update_user``)."""
+        stmt = delete(PersonModel).where(PersonModel.uid == uid)
+        if if_updated_at is not None:
+            stmt = stmt.where(PersonModel.updated_at.in_(list(if_updated_at)))
+        user = self._db.execute(stmt.returning(PersonModel.uid, PersonModel.role)).first()
+        if user is None:
+            self._missed(uid, if_updated_at)
             return False
-        self._db.delete(user)
-        self._db.commit()
+        self._stats.apply_deltas({user.role: -1})
+        self._changes.record("delete", [user])
+        mark_changed(self._db, [uid])
+        self._commit()
         return True
 
     def list_users(self, role: Optional[str] = None) -> List[PersonModel]:
@@ -94,6 +337,109 @@ class DatabaseUserRepository:
             query = query.filter(PersonModel.role == role.lower())
         return query.all()
 
-    def list_users_paginated(self, skip: int = 0, limit: int = 10) -> List[PersonModel]:
-        """List users with pagination."""
-        return self._db.query(PersonModel).offset(skip).limit(limit).all()
+    def list_users_paginated(self, skip: int = 0, limit: int = 10, role: Optional[str] = None) -> List[PersonModel]:
+        """List users with OFFSET pagination (cost grows with ``skip``)."""
+        query = self._db.query(PersonModel)
+        if role:
+            query = query.filter(PersonModel.role == role.lower())
+        return query.order_by(PersonModel.created_at, PersonModel.uid).offset(skip).limit(limit).all()
+
+    def get_user_row(self, uid: str) -> Optional[Row]:
+        """Retrieve a user as a plain ``USER_COLUMNS`` row (no ORM object)."""
+        return self._db.execute(select(*USER_COLUMNS).where(PersonModel.uid == uid)).first()
+
+    def get_user_rows(self, uids: Iterable[str], chunk_size: int = 500) -> List[Row]:
+        """Retrieve many users as plain rows, ``chunk_size`` uids per IN query.
+
+        Rows come back in no particular order; unknown uids are skipped.
+        """
+        return self._rows_in(PersonModel.uid, uids, chunk_size)
+
+    def _rows_in(self, column, values: Iterable[str], chunk_size: int) -> List[Row]:
+        values = list(dict.fromkeys(values))
+        rows: List[Row] = []
+        for start in range(0, len(values), chunk_size):
+            chunk = values[start:start + chunk_size]
+            rows.extend(self._db.execute(select(*USER_COLUMNS).where(column.in_(chunk))).all())
+        return rows
+
+    def get_users_many(self, uids: Iterable[str] = (), emails: Iterable[str] = (), chunk_size: int = 500) -> UserLookup:
+        """Resolve many users by uid and by email, ``chunk_size`` keys per IN query.
+
+        Every requested key is present in the result (duplicates once), mapped
+        to its ``USER_COLUMNS`` row or to ``None`` when no user matches.
+        """
+        by_uid: Dict[str, Optional[Row]] = dict.fromkeys(uids)
+        for row in self._rows_in(PersonModel.uid, by_uid, chunk_size):
+            by_uid[row.uid] = row
+        by_email: Dict[str, Optional[Row]] = dict.fromkeys(emails)
+        for row in self._rows_in(PersonModel.email, by_email, chunk_size):
+            by_email[row.email] = row
+        return UserLookup(by_uid, by_email)
+
+    def list_user_rows_paginated(self, skip: int = 0, limit: int = 10, role: Optional[str] = None) -> List[Row]:
+        """``list_users_paginated`` returning plain ``USER_COLUMNS`` rows."""
+        stmt = select(*USER_COLUMNS)
+        if role:
+            stmt = stmt.where(PersonModel.role == role.lower())
+        stmt = stmt.order_by(PersonModel.created_at, PersonModel.uid).offset(skip).limit(limit)
+        return self._db.execute(stmt).all()
+
+    def list_user_rows_keyset(
+        self,
+        limit: int = 10,
+        role: Optional[str] = None,
+        after: Optional[Tuple[datetime, str]] = None,
+    ) -> List[Row]:
+        """``list_users_keyset`` returning plain ``USER_COLUMNS`` rows."""
+        stmt = select(*USER_COLUMNS)
+        if role:
+            stmt = stmt.where(PersonModel.role == role.lower())
+        if after:
+            stmt = stmt.where(tuple_(PersonModel.created_at, PersonModel.uid) > tuple_(*after))
+        return self._db.execute(stmt.order_by(PersonModel.created_at, PersonModel.uid).limit(limit)).all()
+
+    def list_users_keyset(
+        self,
+        limit: int = 10,
+        role: Optional[str] = None,
+        after: Optional[Tuple[datetime, str]] = None,
+    ) -> List[PersonModel]:
+        """List users ordered by (created_at, uid), starting after a cursor.
+
+        Seeks directly into the (role, created_at, uid) index, so every page
+        costs the same regardless of how deep it is.
+        """
+        query = self._db.query(PersonModel)
+        if role:
+            query = query.filter(PersonModel.role == role.lower())
+        if after:
+            query = query.filter(tuple_(PersonModel.created_at, PersonModel.uid) > tuple_(*after))
+        return query.order_by(PersonModel.created_at, PersonModel.uid).limit(limit).all()
+
+    def iter_user_chunks(
+        self,
+        role: Optional[str] = None,
+        updated_since: Optional[datetime] = None,
+        chunk_size: int = 1000,
+    ) -> Iterator[List[Row]]:
+        """Stream user rows in chunks of ``chunk_size`` using a server-side cursor.
+
+        Only plain column tuples are fetched (no ORM objects), so memory stays
+        flat regardless of table size. With ``updated_since`` rows come in
+        (updated_at, uid) order, otherwise in (created_at, uid) order.
+        """
+        stmt = select(*USER_COLUMNS)
+        if role:
+            stmt = stmt.where(PersonModel.role == role.lower())
+        if updated_since:
+            stmt = stmt.where(PersonModel.updated_at >= updated_since)
+            stmt = stmt.order_by(PersonModel.updated_at, PersonModel.uid)
+        else:
+            stmt = stmt.order_by(PersonModel.created_at, PersonModel.uid)
+        result = self._db.execute(stmt.execution_options(yield_per=chunk_size))
+        try:
+            for chunk in result.partitions():
+                yield chunk
+        finally:
+            result.close()
@@ -0,0 +1,84 @@
+"""Versioned schema check run at startup.
+
+Creating the schema means reflecting every table, the FTS index and the
+role counters, which is too slow to repeat in every worker on every start.
+Instead the schema version is kept in SQLite's ``PRAGMA user_version``: when
+it matches ``SCHEMA_VERSION`` startup costs a single pragma read. Otherwise
+the idempotent setup steps run under the write lock, so concurrent workers
+upgrade the database once, and the version is stamped in the same
+transaction.
+
+Bump ``SCHEMA_VERSION`` whenever a change to the models or to the setup
+steps below has to reach existing databases. Databases other than SQLite
+have no version slot and always run the (idempotent) setup.
+"""
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.db import models  # noqa: F401  (registers the tables on Base.metadata)
+from app.db.config import Base
+from app.db.search import install_search_index
+from app.db.stats import RoleStatsRepository
+
+# 1: persons, role_counts, persons_fts
+# 2: user_changes, user_changes_state
+# 3: ix_user_changes_tombstones
+# 4: user_changes_state.compacted_at
+SCHEMA_VERSION = 4
+
+
+def schema_version(conn: Connection) -> int:
+    """Version stamped on the database, 0 when it was never stamped."""
+    return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def _stamped_version(engine: Engine) -> int:
+    # straight on the DBAPI connection: no BEGIN (IMMEDIATE) for a pragma read
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute("PRAGMA user_version")
+        return cursor.fetchone()[0]
+    finally:
+        raw.close()
+
+
+def _upgrade(conn: Connection) -> None:
+    Base.metadata.create_all(bind=conn)
+    # create_all skips tables that exist, so columns (nullable ones only) and
+    # indexes added to them later are created here
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(conn.dialect)}"))
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+    install_search_index(conn)
+    # seed role counters for databases created before they existed
+    with Session(bind=conn) as db:
+        RoleStatsRepository(db).ensure_initialized()
+
+
+def ensure_schema(engine: Engine) -> bool:
+    """Bring the database up to ``SCHEMA_VERSION``; returns True when it had to change."""
+    if engine.dialect.name != "sqlite":
+        with engine.begin() as conn:
+            _upgrade(conn)
+        return True
+    if _stamped_version(engine) == SCHEMA_VERSION:
+        return False
+    with engine.begin() as conn:
+        # re-check in the write transaction (BEGIN IMMEDIATE on the production
+        # writer): another worker may have just upgraded
+        current = schema_version(conn)
+        if current == SCHEMA_VERSION:
+            return False
+        if current > SCHEMA_VERSION:
+            raise RuntimeError(f"database schema version {current} is newer than this code ({SCHEMA_VERSION})")
+        _upgrade(conn)
+        conn.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return True
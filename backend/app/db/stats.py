@@ -0,0 +1,94 @@
+"""Role statistics backed by incrementally maintained counters.
+
+``DatabaseUserRepository`` applies counter deltas inside the same transaction
+as the person write, so reading the statistics is a lookup of a few rows
+instead of a scan. A ``GROUP BY`` aggregate over ``persons`` is kept as the
+fallback and as the source of truth for consistency checks.
+"""
+
+from typing import Dict
+
+from sqlalchemy import delete, func, insert, literal, select, union_all, update
+from sqlalchemy.orm import Session
+
+from app.db.models import PersonModel, RoleCountModel
+
+DEFAULT_ROLES = ("donor", "vendor", "victim")
+
+
+class RoleStatsRepository:
+    """Reads and maintains the ``role_counts`` table."""
+
+    def __init__(self, db: Session):
+        self._db = db
+
+    def apply_deltas(self, deltas: Dict[str, int]) -> None:
+        """Add ``deltas`` to the counters without committing.
+
+        Callers commit together with the person rows they changed.
+        """
+        for role, delta in deltas.items():
+            if not delta:
+                continue
+            result = self._db.execute(
+                update(RoleCountModel)
+                .where(RoleCountModel.role == role)
+                .values(count=RoleCountModel.count + delta)
+            )
+            if result.rowcount == 0:
+                self._db.execute(insert(RoleCountModel).values(role=role, count=delta))
+
+    def counter_counts(self) -> Dict[str, int]:
+        """Return the stored counters (empty if they were never initialized)."""
+        return dict(self._db.execute(select(RoleCountModel.role, RoleCountModel.count)).all())
+
+    def aggregate_counts(self) -> Dict[str, int]:
+        """Count users per role with a single GROUP BY over ``persons``."""
+        stmt = select(PersonModel.role, func.count()).group_by(PersonModel.role)
+        return dict(self._db.execute(stmt).all())
+
+    def counts(self) -> Dict[str, int]:
+        """Return users per role, from the counters when they are initialized."""
+        counts = {role: 0 for role in DEFAULT_ROLES}
+        stored = self.counter_counts()
+        counts.update(stored if stored else self.aggregate_counts())
+        return {role: n for role, n in counts.items() if n or role in DEFAULT_ROLES}
+
+    def check(self) -> Dict[str, Dict[str, int]]:
+        """Compare counters against the base table.
+
+        Both are read by one statement, so they come from the same snapshot
+        and a write landing in between cannot show up as drift. Returns
+        ``{role: {"counter": n, "actual": m}}`` for every mismatch.
+        """
+        both = union_all(
+            select(literal("counter"), RoleCountModel.role, RoleCountModel.count),
+            select(literal("actual"), PersonModel.role, func.count()).group_by(PersonModel.role),
+        )
+        read = {"counter": {}, "actual": {}}
+        for source, role, count in self._db.execute(both):
+            read[source][role] = count
+        stored, actual = read["counter"], read["actual"]
+        mismatches = {}
+        for role in set(stored) | set(actual):
+            if stored.get(role, 0) != actual.get(role, 0):
+                mismatches[role] = {"counter": stored.get(role, 0), "actual": actual.get(role, 0)}
+        return mismatches
+
+    def rebuild(self) -> Dict[str, int]:
+        """Recompute the counters from ``persons`` in one transaction.
+
+        The counters are deleted first: that write takes the write lock, so
+        no write can commit between the count and the new counters.
+        """
+        self._db.execute(delete(RoleCountModel))
+        actual = self.aggregate_counts()
+        if actual:
+            self._db.execute(insert(RoleCountModel), [{"role": r, "count": n} for r, n in actual.items()])
+        self._db.commit()
+        return actual
+
+    def ensure_initialized(self) -> None:
+        """Seed the counters from ``persons`` if the table is still empty."""
+        if not self.counter_counts() and self.aggregate_counts():
+            self.rebuild()
@@ -0,0 +1,162 @@
+"""Group commit for concurrent single-row writes.
+
+Requests hand their write to ``WriteCoalescer.submit`` and block until it is
+durable. A background thread gathers writes into windows bounded by
+``max_batch`` operations and ``max_wait`` seconds, runs each one inside its
+own SAVEPOINT of a shared transaction, and commits the window once. A failed
+operation (e.g. a uid/email conflict) only rolls back its savepoint, so its
+caller gets the error while the rest of the window still commits.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import sessionmaker
+
+from app.db.config import SessionLocal
+from app.db.repository import DatabaseUserRepository, UpsertResult
+from app.models.person import Person
+
+WriteOp = Callable[[DatabaseUserRepository], Any]
+
+_STOP = object()
+
+
+class WriteCoalescer:
+    """Collects writes from many threads and commits them in windows."""
+
+    def __init__(self, session_factory: sessionmaker, max_batch: int = 64, max_wait: float = 0.002):
+        self._session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.windows = 0
+        self.operations = 0
+
+    def submit(self, op: WriteOp) -> Any:
+        """Run ``op(repository)`` in the next window and return its result.
+
+        Re-raises the exception ``op`` raised, or the commit error if the
+        whole window failed to commit.
+        """
+        future: Future = Future()
+        self._ensure_started()
+        self._queue.put((op, future))
+        return future.result()
+
+    def close(self) -> None:
+        """Flush pending writes and stop the background thread."""
+        with self._lock:
+            if self._thread is None:
+                return
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="write-coalescer", daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            stop = False
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._commit_window(batch)
+            if stop:
+                return
+
+    def _commit_window(self, batch: List[Tuple[WriteOp, Future]]) -> None:
+        outcomes = []
+        db = self._session_factory(expire_on_commit=False)
+        try:
+            repo = DatabaseUserRepository(db, autocommit=False)
+            for op, future in batch:
+                try:
+                    with db.begin_nested():
+                        outcomes.append((future, op(repo), None))
+                except Exception as e:
+                    outcomes.append((future, None, e))
+                finally:
+                    # results are handed to other threads; detach them so a
+                    # later op in the window never sees their identities
+                    db.expunge_all()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        finally:
+            db.close()
+        self.windows += 1
+        self.operations += len(batch)
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "windows": self.windows,
+            "operations": self.operations,
+            "avg_batch": self.operations / self.windows if self.windows else 0.0,
+            "pending": self._queue.qsize(),
+        }
+
+
+class CoalescedUserRepository:
+    """Sends single-row writes through a ``WriteCoalescer``; reads are delegated."""
+
+    def __init__(self, repository: DatabaseUserRepository, coalescer: WriteCoalescer):
+        self._repository = repository
+        self._coalescer = coalescer
+
+    def __getattr__(self, name):
+        return getattr(self._repository, name)
+
+    def add_user(self, person: Person) -> Row:
+        return self._coalescer.submit(lambda repo: repo.add_user(person))
+
+    def upsert_user(self, person: Person) -> UpsertResult:
+        return self._coalescer.submit(lambda repo: repo.upsert_user(person))
+
+    def update_user(self, uid: str, *args, **kwargs) -> Optional[Row]:
+        return self._coalescer.submit(lambda repo: repo.update_user(uid, *args, **kwargs))
+
+    def delete_user(self, uid: str, *args, **kwargs) -> bool:
+        return self._coalescer.submit(lambda repo: repo.delete_user(uid, *args, **kwargs))
+
+
+# Group commit is opt-in: it trades up to WRITE_BATCH_WAIT_MS of latency for throughput
+WRITE_COALESCE = os.getenv("WRITE_COALESCE", "0").lower() in ("1", "true", "yes")
+
+write_coalescer = WriteCoalescer(
+    SessionLocal,
+    max_batch=int(os.getenv("WRITE_BATCH_SIZE", "64")),
+    max_wait=float(os.getenv("WRITE_BATCH_WAIT_MS", "2")) / 1000,
+)
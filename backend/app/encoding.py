@@ -0,0 +1,89 @@
+"""Pre-encoded JSON bodies for the lean read path.
+
+Rows read from the database were validated when they were written, so the
+lean path formats them straight into the ``UserOut`` JSON shape instead of
+building dicts and letting FastAPI validate them against the response model
+again (``EmailStr`` validation alone dominates the cost of a large page).
+"""
+
+from datetime import datetime
+from json.encoder import encode_basestring
+from typing import Any, Iterable, Mapping, Optional
+
+from fastapi import Response
+
+_USER = '{"uid":%s,"name":%s,"email":%s,"role":%s}'
+
+
+def _user_json(user: Any) -> str:
+    return _USER % (
+        encode_basestring(user.uid),
+        encode_basestring(user.name),
+        encode_basestring(user.email),
+        encode_basestring(user.role),
+    )
+
+
+def encode_user(user: Any) -> bytes:
+    """Encode one user (row, ``UserRecord`` or ``StoredUser``) as a ``UserOut`` JSON object."""
+    return _user_json(user).encode()
+
+
+def encode_users(rows: Iterable[Any]) -> bytes:
+    """Encode users as a JSON array of ``UserOut`` objects."""
+    return ("[" + ",".join([_user_json(row) for row in rows]) + "]").encode()
+
+
+def _user_map_json(users: Mapping[str, Optional[Any]]) -> str:
+    return "{" + ",".join([
+        encode_basestring(key) + ":" + (_user_json(user) if user is not None else "null")
+        for key, user in users.items()
+    ]) + "}"
+
+
+def encode_lookup(lookup: Any) -> bytes:
+    """Encode a ``UserLookup`` as a ``UserLookupResult`` JSON object (misses as null)."""
+    return ('{"users":%s,"emails":%s}' % (_user_map_json(lookup.by_uid), _user_map_json(lookup.by_email))).encode()
+
+
+_CHANGE = '{"seq":%d,"op":%s,"uid":%s,"name":%s,"email":%s,"role":%s,"changed_at":%s}'
+
+
+def _str_or_null(value: Optional[str]) -> str:
+    return encode_basestring(value) if value is not None else "null"
+
+
+def _change_json(change: Any) -> str:
+    changed_at: Optional[datetime] = change.changed_at
+    return _CHANGE % (
+        change.seq,
+        encode_basestring(change.op),
+        encode_basestring(change.uid),
+        _str_or_null(change.name),
+        _str_or_null(change.email),
+        _str_or_null(change.role),
+        _str_or_null(changed_at.isoformat() if changed_at else None),
+    )
+
+
+def encode_changes(changes: Iterable[Any], next_seq: int) -> bytes:
+    """Encode a page of change log entries as a ``ChangesPage`` JSON object."""
+    return ('{"changes":[%s],"next":%d}' % (",".join([_change_json(c) for c in changes]), next_seq)).encode()
+
+
+def encode_change_events(changes: Iterable[Any]) -> bytes:
+    """Encode change log entries as Server-Sent Events (``id`` is the ``seq``)."""
+    return "".join([f"id: {c.seq}\nevent: {c.op}\ndata: {_change_json(c)}\n\n" for c in changes]).encode()
+
+
+def raw_json(body: bytes, response: Response) -> Response:
+    """Wrap an encoded body, keeping headers already set on ``response``.
+
+    Returning a ``Response`` skips response-model validation, but FastAPI
+    then ignores the injected ``response``, so its headers are copied over.
+    """
+    raw = Response(content=body, media_type="application/json")
+    for name, value in response.headers.items():
+        if name not in ("content-length", "content-type"):
+            raw.headers[name] = value
+    return raw
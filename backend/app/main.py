@@ -1,23 +1,141 @@
+import asyncio
+import hmac
+import json
+import logging
 import os
-from typing import List, Optional
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException, Depends, Query
+from fastapi import APIRouter, FastAPI, HTTPException, Depends, Header, Query, Request, Response
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from fastapi.routing import APIRoute
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
+from .admission import ADMISSION_CONTROL, AdmissionMiddleware, admission
+from .conditional import collection_etag, etag_matches, is_fresh, not_modified, parse_if_match, set_validators, user_etag
+from .encoding import encode_change_events, encode_changes, encode_lookup, encode_user, encode_users, raw_json
 from .services.auth_service import AuthService
-from .models.person import Donor, Vendor, Victim, Person
-from .schemas import TokenData, UserCreate, UserOut
-from .db.config import get_db, Base, engine
-from .db.repository import DatabaseUserRepository
+from .models.person import Person
+from .schemas import ChangesPage, TokenData, UserCreate, UserLookupRequest, UserLookupResult, UserOut, BulkImportResult, UserStats
+from .db.backup import BackupError, BackupInProgress, backups
+from .db.changes import CHANGES_COMPACT_INTERVAL, ChangeLogRepository
+from .db.config import get_db, engine, SessionLocal, DB_MODE, READ_PATH
+from .db.repository import DatabaseUserRepository, PersonFactory, VersionConflict
+from .db.cache import user_cache
+from .db.cached_repository import CachedUserRepository
+from .db.hot_repository import READ_BACKEND, HotTierUserRepository, hot_store, hot_store_lock, hot_store_tracker
+from .db.write_coalescer import WRITE_COALESCE, CoalescedUserRepository, write_coalescer
+from .db.pagination import encode_cursor, decode_cursor
+from .db.schema import ensure_schema
+from .db.search import UserSearchRepository
+from .metrics import METRICS_ENABLED, MetricsMiddleware, metrics
+from .profiling import PROFILE_TOP, PROFILING, ProfiledRoute, ProfilingMiddleware, profiler
+from .services.change_feed import change_feed
+from .services.export_service import EXPORT_FORMATS, stream_users
+from .services.user_service import UserService
 
 
-app = FastAPI(title="ReliefConnect Backend")
+logger = logging.getLogger(__name__)
 
-# Initialize services
+
+def _compact_changes() -> Optional[dict]:
+    # every worker wakes up on the interval; the first to find a run due compacts
+    with SessionLocal() as db:
+        return ChangeLogRepository(db).compact(min_interval=CHANGES_COMPACT_INTERVAL)
+
+
+async def _compact_changes_periodically() -> None:
+    while True:
+        await asyncio.sleep(CHANGES_COMPACT_INTERVAL)
+        try:
+            await run_in_threadpool(_compact_changes)
+        except Exception:
+            logger.exception("change log compaction failed")
+
+
+async def _back_up_periodically() -> None:
+    # check often enough that the schedule slips by at most a minute
+    while True:
+        await asyncio.sleep(min(backups.interval, 60))
+        if backups.due():
+            backups.start(scheduled=True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup and shutdown work, kept out of import time.
+
+    Each worker checks the schema version (a single pragma read once the
+    database is current) and, with ``READ_BACKEND=memory``, loads the hot
+    tier before it accepts requests. The change log is compacted, and with
+    ``BACKUP_INTERVAL`` the database backed up, in the background. Pending
+    coalesced writes are flushed on shutdown.
+    """
+    await run_in_threadpool(ensure_schema, engine)
+    if READ_BACKEND == "memory":
+        await run_in_threadpool(hot_store_tracker.load, hot_store)
+    tasks = [asyncio.get_running_loop().create_task(_compact_changes_periodically())]
+    if backups is not None and backups.interval > 0:
+        tasks.append(asyncio.get_running_loop().create_task(_back_up_periodically()))
+    yield
+    for task in tasks:
+        task.cancel()
+    if WRITE_COALESCE:
+        await run_in_threadpool(write_coalescer.close)
+
+
+# Bearer token for the /admin routes, which are disabled without one
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Initialize services (Firebase Admin is set up on the first verification)
 auth_service = AuthService(cred_path=os.getenv("GOOGLE_APPLICATION_CREDENTIALS"))
 
-# Create database tables on startup
-Base.metadata.create_all(bind=engine)
+app = FastAPI(
+    title="ReliefConnect Backend",
+    lifespan=lifespan,
+    dependencies=[Depends(metrics.track_route)] if METRICS_ENABLED else None,
+)
+
+# Sync endpoints run inline on the event loop when their request is being profiled
+route_class = ProfiledRoute if PROFILING else APIRoute
+app.router.route_class = route_class
+
+# Per-client rate limits and load shedding in front of the single SQLite writer;
+# a client is the user of an already verified bearer token, else the peer address
+if ADMISSION_CONTROL:
+    app.add_middleware(AdmissionMiddleware, controller=admission, identify=auth_service.cached_uid)
+
+# cProfile of sampled requests and of those sent with X-Profile: $ADMIN_TOKEN
+if PROFILING:
+    app.add_middleware(ProfilingMiddleware, profiler=profiler, token=ADMIN_TOKEN)
+
+# Per-route latency, in-flight and query counts, exposed at /metrics
+# (added last so it wraps admission control and counts shed requests too)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, registry=metrics)
+
+# CRUD routes for the sync request path; the async equivalents live in
+# app/async_routes.py and one of the two is mounted according to DB_MODE.
+users_router = APIRouter(route_class=route_class)
+
+# Rows per transaction for bulk imports
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+
+# Rows fetched from the database per chunk when exporting
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+# Serve user reads as column rows encoded straight to JSON (READ_PATH=orm to disable)
+LEAN_READS = READ_PATH == "lean"
+
+def require_admin(authorization: Optional[str] = Header(None)) -> None:
+    """Dependency guarding operator endpoints with ``Authorization: Bearer $ADMIN_TOKEN``."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_TOKEN to enable them")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token", headers={"WWW-Authenticate": "Bearer"})
 
 
 @app.post("/verify-token")
@@ -30,22 +148,45 @@ def verify_token(payload: TokenData):
         raise HTTPException(status_code=401, detail=str(e))
 
 
+def _user_repository(db: Session):
+    """Repository for request handlers, with group commit and the hot tier or read cache when enabled."""
+    repo = DatabaseUserRepository(db)
+    if WRITE_COALESCE:
+        repo = CoalescedUserRepository(repo, write_coalescer)
+    if READ_BACKEND == "memory":
+        return HotTierUserRepository(repo, hot_store, hot_store_lock, hot_store_tracker)
+    return CachedUserRepository(repo, user_cache) if user_cache.enabled else repo
+
+
 def _create_person_from_payload(data: UserCreate) -> Person:
-    role = (data.role or "donor").lower()
-    if role == "donor":
-        return Donor(uid=data.uid, name=data.name, email=data.email)
-    if role == "vendor":
-        return Vendor(uid=data.uid, name=data.name, email=data.email)
-    if role == "victim":
-        return Victim(uid=data.uid, name=data.name, email=data.email)
-    # fallback
-    return Donor(uid=data.uid, name=data.name, email=data.email)
-
-
-@app.post("/users", response_model=UserOut)
+    return PersonFactory.create(data.role, uid=data.uid, name=data.name, email=data.email)
+
+
+def _users_body(users, response: Response):
+    """List response body: pre-encoded on the lean read path, validated dicts otherwise."""
+    if LEAN_READS:
+        return raw_json(encode_users(users), response)
+    return [{"uid": u.uid, "name": u.name, "email": u.email, "role": u.role} for u in users]
+
+
+def _lookup_body(lookup, response: Response):
+    """Lookup response body: pre-encoded on the lean read path, validated dicts otherwise."""
+    if LEAN_READS:
+        return raw_json(encode_lookup(lookup), response)
+
+    def as_dict(u):
+        return {"uid": u.uid, "name": u.name, "email": u.email, "role": u.role} if u is not None else None
+
+    return {
+        "users": {uid: as_dict(u) for uid, u in lookup.by_uid.items()},
+        "emails": {email: as_dict(u) for email, u in lookup.by_email.items()},
+    }
+
+
+@users_router.post("/users", response_model=UserOut)
 def create_user(payload: UserCreate, db: Session = Depends(get_db)):
     """Create a new user in the database."""
-    repo = DatabaseUserRepository(db)
+    repo = _user_repository(db)
     person = _create_person_from_payload(payload)
     try:
         db_model = repo.add_user(person)
@@ -54,39 +195,397 @@ def create_user(payload: UserCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=409, detail=str(e))
 
 
-@app.get("/users", response_model=List[UserOut])
-def list_users(role: Optional[str] = Query(None), skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    """List all users, optionally filtered by role."""
-    repo = DatabaseUserRepository(db)
-    users = repo.list_users(role=role) if role else repo.list_users_paginated(skip=skip, limit=limit)
-    return [{"uid": u.uid, "name": u.name, "email": u.email, "role": u.role} for u in users]
+async def _iter_ndjson(request: Request) -> AsyncIterator[bytes]:
+    """Yield non-empty lines from a streamed NDJSON request body."""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
 
 
-@app.get("/users/{uid}", response_model=UserOut)
-def get_user(uid: str, db: Session = Depends(get_db)):
-    """Retrieve a single user by UID."""
-    repo = DatabaseUserRepository(db)
-    user = repo.get_user(uid)
+async def _iter_bulk_rows(request: Request) -> AsyncIterator[object]:
+    """Yield raw rows from a JSON array or NDJSON body (decode errors as exceptions)."""
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        async for line in _iter_ndjson(request):
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield e
+        return
+    try:
+        rows = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    for row in rows:
+        yield row
+
+
+@app.post("/users/bulk", response_model=BulkImportResult)
+async def bulk_create_users(request: Request, db: Session = Depends(get_db)):
+    """Create many users from a JSON array or a streamed NDJSON body.
+
+    Rows are inserted in batches of ``BULK_BATCH_SIZE`` per transaction and
+    each row gets its own result, so conflicts do not abort the import.
+    """
+    repo = _user_repository(db)
+    results: List[dict] = []
+    pending: List[Tuple[int, Person]] = []
+
+    async def flush():
+        batch_results = await run_in_threadpool(repo.add_users, [p for _, p in pending], BULK_BATCH_SIZE)
+        for (index, _), result in zip(pending, batch_results):
+            result["index"] = index
+            results.append(result)
+        pending.clear()
+
+    index = 0
+    async for row in _iter_bulk_rows(request):
+        try:
+            if isinstance(row, Exception):
+                raise row
+            pending.append((index, _create_person_from_payload(UserCreate(**row))))
+        except (TypeError, ValueError) as e:
+            uid = row.get("uid") if isinstance(row, dict) else None
+            uid = str(uid) if uid is not None else None
+            results.append({"index": index, "uid": uid, "status": "invalid", "detail": str(e)})
+        index += 1
+        if len(pending) >= BULK_BATCH_SIZE:
+            await flush()
+    if pending:
+        await flush()
+
+    results.sort(key=lambda r: r["index"])
+    counts = {"created": 0, "conflict": 0, "invalid": 0}
+    for r in results:
+        counts[r["status"]] += 1
+    return {
+        "created": counts["created"],
+        "conflicts": counts["conflict"],
+        "invalid": counts["invalid"],
+        "results": results,
+    }
+
+
+@users_router.post("/users/lookup", response_model=UserLookupResult)
+def lookup_users(payload: UserLookupRequest, response: Response, db: Session = Depends(get_db)):
+    """Resolve many users by uid (and optionally email) in one request.
+
+    Keys are looked up with chunked IN queries; unknown keys map to null.
+    """
+    lookup = _user_repository(db).get_users_many(payload.uids, payload.emails)
+    return _lookup_body(lookup, response)
+
+
+@users_router.get("/users", response_model=List[UserOut])
+def list_users(
+    response: Response,
+    role: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=1000),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    """List users, optionally filtered by role.
+
+    Pages are keyed on (created_at, uid): pass the ``X-Next-Cursor`` header of
+    one page as ``cursor`` to fetch the next. The header is omitted on the last
+    page. ``skip`` is kept for older clients and uses OFFSET pagination.
+    """
+    repo = _user_repository(db)
+    etag = collection_etag(repo.collection_version())
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    if skip and not cursor:
+        list_page = repo.list_user_rows_paginated if LEAN_READS else repo.list_users_paginated
+        return _users_body(list_page(skip=skip, limit=limit, role=role), response)
+    try:
+        after = decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    list_page = repo.list_user_rows_keyset if LEAN_READS else repo.list_users_keyset
+    users = list_page(limit=limit + 1, role=role, after=after)
+    if len(users) > limit:
+        users = users[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(users[-1])
+    return _users_body(users, response)
+
+
+@app.get("/users/search", response_model=List[UserOut])
+def search_users(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    role: Optional[str] = Query(None),
+    skip: int = Query(0, ge=0, le=10000),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    """Search users by name or email words; every word of ``q`` is a prefix.
+
+    Results are ranked best match first and paginated with ``skip``/``limit``.
+    """
+    users = UserSearchRepository(db).search(q, role=role, limit=limit, skip=skip)
+    return _users_body(users, response)
+
+
+@app.get("/users/changes", response_model=ChangesPage)
+def list_changes(
+    since: Optional[int] = Query(None, ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db),
+):
+    """Inserts, updates and deletes committed after ``since``, oldest first.
+
+    Pass the returned ``next`` back as ``since``. Without ``since`` nothing is
+    returned and ``next`` is the current end of the log, the cursor to take
+    before loading the full listing. A cursor older than the compaction
+    horizon gets 410: reload the listing and start again.
+    """
+    changes = ChangeLogRepository(db)
+    if since is None:
+        return raw_json(encode_changes([], changes.latest_seq()), Response())
+    _check_horizon(changes.horizon(), since)
+    rows = changes.since(since, limit)
+    return raw_json(encode_changes(rows, rows[-1].seq if rows else since), Response())
+
+
+def _check_horizon(horizon: int, since: int) -> None:
+    if since < horizon:
+        raise HTTPException(
+            status_code=410,
+            detail=f"Changes up to seq {horizon} were compacted; reload the users and resume from a fresh cursor",
+        )
+
+
+def _stream_start(since: Optional[int], last_event_id: Optional[str]) -> Optional[int]:
+    # a reconnecting EventSource sends the id of the last event it received
+    if last_event_id and last_event_id.strip().isdigit():
+        return int(last_event_id)
+    return since
+
+
+def _stream_cursor(since: Optional[int]) -> Tuple[int, int]:
+    with SessionLocal() as db:
+        changes = ChangeLogRepository(db)
+        return changes.horizon(), changes.latest_seq() if since is None else since
+
+
+async def _change_events(since: int) -> AsyncIterator[bytes]:
+    yield b"retry: 3000\n\n"
+    async for rows in change_feed.events(since):
+        yield encode_change_events(rows) if rows else b": keep-alive\n\n"
+
+
+@app.get("/users/changes/stream")
+async def stream_changes(
+    since: Optional[int] = Query(None, ge=0),
+    last_event_id: Optional[str] = Header(None),
+):
+    """Server-Sent Events stream of the change log (events ``insert``, ``update``, ``delete``).
+
+    Starts after ``since`` (or ``Last-Event-ID`` on reconnect), from the
+    current end of the log when neither is given, and then pushes changes as
+    they commit. Each event's ``id`` is its ``seq``.
+    """
+    start = _stream_start(since, last_event_id)
+    horizon, start = await run_in_threadpool(_stream_cursor, start)
+    _check_horizon(horizon, start)
+    return StreamingResponse(
+        _change_events(start),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/users/export")
+def export_users(
+    format: str = Query("ndjson"),
+    role: Optional[str] = Query(None),
+    updated_since: Optional[datetime] = Query(None),
+):
+    """Stream every user (optionally filtered) as NDJSON or CSV.
+
+    Rows are read in chunks of ``EXPORT_CHUNK_SIZE`` and written as they
+    arrive, so memory use does not grow with the table. Pass the largest
+    ``updated_at`` seen as ``updated_since`` to export incrementally.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {sorted(EXPORT_FORMATS)}")
+    if updated_since and updated_since.tzinfo:
+        # timestamps are stored as naive UTC
+        updated_since = updated_since.astimezone(timezone.utc).replace(tzinfo=None)
+    return StreamingResponse(
+        stream_users(format, role=role, updated_since=updated_since, chunk_size=EXPORT_CHUNK_SIZE),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="users.{format}"'},
+    )
+
+
+@users_router.get("/users/{uid}", response_model=UserOut)
+def get_user(
+    uid: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    """Retrieve a single user by UID.
+
+    Responses carry an ETag and Last-Modified; a matching If-None-Match or
+    If-Modified-Since is answered with 304 after a version-only lookup.
+    """
+    repo = _user_repository(db)
+    if if_none_match or if_modified_since:
+        version = repo.get_user_version(uid)
+        if version is not None and is_fresh(if_none_match, if_modified_since, version):
+            return not_modified(user_etag(version), version)
+    user = (repo.get_user_row(uid) if LEAN_READS else repo.get_user(uid))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    set_validators(response, user.updated_at)
+    if LEAN_READS:
+        return raw_json(encode_user(user), response)
     return {"uid": user.uid, "name": user.name, "email": user.email, "role": user.role}
 
 
-@app.put("/users/{uid}", response_model=UserOut)
-def update_user(uid: str, payload: UserCreate, db: Session = Depends(get_db)):
-    """Update an existing user."""
-    repo = DatabaseUserRepository(db)
-    user = repo.update_user(uid, name=payload.name, email=payload.email)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+@users_router.put("/users/{uid}", response_model=UserOut)
+def upsert_user(
+    uid: str,
+    payload: UserCreate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    """Create the user (201) or update its name and email (200) in one statement.
+
+    With If-Match only an existing user whose ETag matches is updated (412
+    otherwise). A taken email is a 409.
+    """
+    repo = _user_repository(db)
+    try:
+        if if_match:
+            user = repo.update_user(uid, name=payload.name, email=payload.email, if_updated_at=parse_if_match(if_match))
+            if not user:
+                raise HTTPException(status_code=412, detail="User not found")
+        else:
+            user, created = repo.upsert_user(
+                PersonFactory.create(payload.role, uid=uid, name=payload.name, email=payload.email)
+            )
+            if created:
+                response.status_code = 201
+    except VersionConflict:
+        raise HTTPException(status_code=412, detail="User was modified")
+    except KeyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    set_validators(response, user.updated_at)
     return {"uid": user.uid, "name": user.name, "email": user.email, "role": user.role}
 
 
-@app.delete("/users/{uid}")
-def delete_user(uid: str, db: Session = Depends(get_db)):
-    """Delete a user by UID."""
-    repo = DatabaseUserRepository(db)
-    ok = repo.delete_user(uid)
+@users_router.delete("/users/{uid}")
+def delete_user(uid: str, if_match: Optional[str] = Header(None), db: Session = Depends(get_db)):
+    """Delete a user by UID (412 when If-Match does not match its ETag)."""
+    repo = _user_repository(db)
+    try:
+        ok = repo.delete_user(uid, if_updated_at=parse_if_match(if_match))
+    except VersionConflict:
+        raise HTTPException(status_code=412, detail="User was modified")
     if not ok:
-        raise HTTPException(status_code=404, detail="User not found")
+        raise HTTPException(status_code=412 if if_match else 404, detail="User not found")
     return {"detail": "User deleted successfully"}
+
+
+@app.get("/stats/users", response_model=UserStats)
+def user_stats(db: Session = Depends(get_db)):
+    """Return the number of users per role."""
+    counts = UserService(db).count_by_role()
+    return {"counts": counts, "total": sum(counts.values())}
+
+
+@app.get("/stats/cache")
+def cache_stats():
+    """Return hit/miss/eviction counters of the user read cache."""
+    return {"enabled": user_cache.enabled, **user_cache.stats()}
+
+
+@app.get("/stats/admission")
+def admission_stats():
+    """Return admitted and shed write counts and the current write queue."""
+    return {"enabled": ADMISSION_CONTROL, **admission.stats()}
+
+
+def _backups_or_404():
+    if backups is None:
+        raise HTTPException(status_code=404, detail="Backups are only available for SQLite database files")
+    return backups
+
+
+@app.get("/admin/backups", dependencies=[Depends(require_admin)])
+def backup_status():
+    """Return the running backup's progress, the last result and the snapshots on disk."""
+    manager = _backups_or_404()
+    return {**manager.stats(), "snapshots": manager.snapshots()}
+
+
+@app.post("/admin/backups", status_code=202, dependencies=[Depends(require_admin)])
+async def trigger_backup(response: Response, wait: bool = Query(False)):
+    """Start an online backup; with ``wait`` return once the snapshot is written and checked."""
+    manager = _backups_or_404()
+    if not wait:
+        if not manager.start():
+            raise HTTPException(status_code=409, detail="A backup is already running")
+        return manager.stats()
+    try:
+        result = await run_in_threadpool(manager.run)
+    except BackupInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except BackupError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    response.status_code = 201
+    return result.as_dict()
+
+
+@app.get("/admin/profiles", dependencies=[Depends(require_admin)])
+def list_profiles():
+    """Return the profiles in the on-disk ring, newest first, and the profiler's counters."""
+    return {"enabled": PROFILING, **profiler.stats(), "profiles": profiler.profiles()}
+
+
+@app.get("/admin/profiles/summary", dependencies=[Depends(require_admin)])
+def profile_summary(top: int = Query(PROFILE_TOP, ge=1, le=500)):
+    """Return, per route, the functions with the most self time over this worker's profiles."""
+    return profiler.summary(top)
+
+
+@app.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+def download_profile(profile_id: str):
+    """Download one profile as a pstats file (``python -m pstats``, snakeviz)."""
+    path = profiler.path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=os.path.basename(path))
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Request and database metrics in Prometheus text format."""
+    text = metrics.render() + (admission.render() if ADMISSION_CONTROL else "")
+    if backups is not None:
+        text += backups.render()
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+
+if DB_MODE == "async":
+    from .async_routes import router as async_users_router
+
+    app.include_router(async_users_router)
+else:
+    app.include_router(users_router)
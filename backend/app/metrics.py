@@ -0,0 +1,280 @@
+"""Per-request instrumentation: route latency, in-flight requests and database time.
+
+``MetricsMiddleware`` times every HTTP request under its route template and
+opens a ``RequestStats`` in a context variable. SQLAlchemy cursor events add
+each query's count and duration to it, including queries run in the thread
+pool or streamed after the handler returns (writes handed to the group-commit
+thread are not attributed). Totals are rendered in Prometheus text format by
+``MetricsRegistry.render`` and sent back per request as a ``Server-Timing``
+header.
+
+Requests that run more than ``QUERY_BUDGET`` queries, or the same statement
+more than ``REPEAT_BUDGET`` times (the usual N+1 shape), are logged and
+counted. The per-query cost is a context variable lookup and two clock reads.
+"""
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.requests import Request
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() in ("1", "true", "yes")
+
+# Queries per request, and repeats of one statement, before a request is flagged
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "20"))
+REPEAT_BUDGET = int(os.getenv("REPEAT_BUDGET", "5"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+UNMATCHED = "<unmatched>"
+
+
+class RequestStats:
+    """Database work done on behalf of one request."""
+
+    __slots__ = ("started", "queries", "db_time", "statements", "route")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements: Dict[str, int] = {}
+        self.route: Optional[Tuple[str, str]] = None  # set once the route is known
+
+    @property
+    def max_repeats(self) -> int:
+        return max(self.statements.values(), default=0)
+
+    def over_budget(self, query_budget: int, repeat_budget: int) -> bool:
+        return self.queries > query_budget or self.max_repeats > repeat_budget
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    """The ``RequestStats`` of the request being handled, if any."""
+    return _current.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current.get() is not None:
+        context._metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = getattr(context, "_metrics_started", None)
+    if stats is None or started is None:
+        return
+    stats.queries += 1
+    stats.db_time += time.perf_counter() - started
+    stats.statements[statement] = stats.statements.get(statement, 0) + 1
+
+
+class Histogram:
+    """Fixed-bucket histogram (not thread-safe; guarded by the registry lock)."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else repr(bound), total))
+        return result
+
+
+class RouteMetrics:
+    """Counters kept for one (method, route template) pair."""
+
+    __slots__ = ("latency", "queries", "db_time", "statuses", "in_flight", "over_budget")
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_time = 0.0
+        self.statuses: Dict[str, int] = {}
+        self.in_flight = 0
+        self.over_budget = 0
+
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED
+
+
+def _labels(method: str, route: str, **extra: str) -> str:
+    pairs = [("method", method), ("route", route), *extra.items()]
+    return ",".join(f'{k}="{v}"' for k, v in pairs)
+
+
+class MetricsRegistry:
+    """Process-wide request metrics."""
+
+    def __init__(self, query_budget: int = QUERY_BUDGET, repeat_budget: int = REPEAT_BUDGET):
+        self.query_budget = query_budget
+        self.repeat_budget = repeat_budget
+        self._routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self._lock = threading.Lock()
+        self.in_flight = 0
+
+    def _route(self, key: Tuple[str, str]) -> RouteMetrics:
+        metrics = self._routes.get(key)
+        if metrics is None:
+            metrics = self._routes[key] = RouteMetrics()
+        return metrics
+
+    def request_started(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    async def track_route(self, request: Request) -> None:
+        """App-wide dependency: counts the request as in flight on its route.
+
+        Routing happens inside the app, so the middleware only learns the
+        route template once the request is done; this runs as soon as the
+        route is matched.
+        """
+        stats = _current.get()
+        if stats is None or stats.route is not None:
+            return
+        stats.route = (request.method, _route_template(request.scope))
+        with self._lock:
+            self._route(stats.route).in_flight += 1
+
+    def request_finished(self, stats: RequestStats, method: str, route: str, status: int) -> None:
+        duration = time.perf_counter() - stats.started
+        flagged = stats.over_budget(self.query_budget, self.repeat_budget)
+        key = (method, route)
+        with self._lock:
+            self.in_flight -= 1
+            if stats.route is not None:
+                self._route(stats.route).in_flight -= 1
+            metrics = self._route(key)
+            metrics.latency.observe(duration)
+            metrics.queries.observe(stats.queries)
+            metrics.db_time += stats.db_time
+            status_label = str(status)
+            metrics.statuses[status_label] = metrics.statuses.get(status_label, 0) + 1
+            if flagged:
+                metrics.over_budget += 1
+        if flagged:
+            logger.warning(
+                "%s %s ran %d queries (%d repeats of one statement) in %.1f ms; budget is %d queries, %d repeats",
+                method, route, stats.queries, stats.max_repeats, stats.db_time * 1000,
+                self.query_budget, self.repeat_budget,
+            )
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = [
+                "# HELP http_requests_active Requests currently being handled, routed or not.",
+                "# TYPE http_requests_active gauge",
+                f"http_requests_active {self.in_flight}",
+                "# HELP http_requests_in_flight Requests currently being handled, by route.",
+                "# TYPE http_requests_in_flight gauge",
+            ]
+            lines += [f"http_requests_in_flight{{{_labels(*key)}}} {m.in_flight}" for key, m in routes]
+            lines += [
+                "# HELP http_requests_total Finished requests by status code.",
+                "# TYPE http_requests_total counter",
+            ]
+            for key, m in routes:
+                lines += [
+                    f"http_requests_total{{{_labels(*key, status=status)}}} {count}"
+                    for status, count in sorted(m.statuses.items())
+                ]
+            for name, help_text, attr in (
+                ("http_request_duration_seconds", "Request latency.", "latency"),
+                ("db_queries_per_request", "Database queries run per request.", "queries"),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for key, m in routes:
+                    histogram = getattr(m, attr)
+                    if not histogram.count:
+                        continue
+                    lines += [
+                        f"{name}_bucket{{{_labels(*key, le=le)}}} {count}" for le, count in histogram.cumulative()
+                    ]
+                    lines.append(f"{name}_sum{{{_labels(*key)}}} {histogram.sum}")
+                    lines.append(f"{name}_count{{{_labels(*key)}}} {histogram.count}")
+            lines += [
+                "# HELP db_query_seconds_total Time spent in database queries.",
+                "# TYPE db_query_seconds_total counter",
+            ]
+            lines += [f"db_query_seconds_total{{{_labels(*key)}}} {m.db_time}" for key, m in routes]
+            lines += [
+                "# HELP http_requests_over_query_budget_total Requests past the query or repeat budget.",
+                "# TYPE http_requests_over_query_budget_total counter",
+            ]
+            lines += [f"http_requests_over_query_budget_total{{{_labels(*key)}}} {m.over_budget}" for key, m in routes]
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+
+class MetricsMiddleware:
+    """ASGI middleware that records ``RequestStats`` for each HTTP request."""
+
+    def __init__(self, app, registry: "MetricsRegistry"):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = _current.set(stats)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = (time.perf_counter() - stats.started) * 1000
+                timing = (
+                    f'app;dur={elapsed:.1f}, db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"'
+                )
+                message["headers"] = [*message.get("headers", []), (b"server-timing", timing.encode("latin-1"))]
+            await send(message)
+
+        self.registry.request_started()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            self.registry.request_finished(stats, scope["method"], _route_template(scope), status)
+
+
+# Process-wide registry used by the API
+metrics = MetricsRegistry()
@@ -1,41 +1,189 @@
-from typing import Dict, Optional
+import sys
+import threading
+from bisect import bisect_right, insort
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 from .person import Person
 
 
+class StoredUser:
+    """Compact user record; ``__slots__`` keeps it to a fixed set of fields."""
+
+    __slots__ = ("uid", "name", "email", "role", "created_at", "updated_at")
+
+    def __init__(self, uid: str, name: str, email: str, role: str, created_at: datetime, updated_at: datetime):
+        self.uid = uid
+        self.name = name
+        self.email = email
+        self.role = sys.intern(role)
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+    @classmethod
+    def from_row(cls, row: Sequence) -> "StoredUser":
+        """Build from a (uid, name, email, role, created_at, updated_at) row."""
+        return cls(*row)
+
+    @classmethod
+    def from_person(cls, person: Person) -> "StoredUser":
+        now = datetime.utcnow()
+        return cls(person.uid, person.name, person.email, person.get_role(), now, now)
+
+    def as_row(self) -> Tuple:
+        return (self.uid, self.name, self.email, self.role, self.created_at, self.updated_at)
+
+    def __repr__(self):
+        return f"<StoredUser(uid={self.uid}, name={self.name}, role={self.role})>"
+
+
+def _order_key(user: StoredUser) -> Tuple[datetime, str]:
+    return (user.created_at, user.uid)
+
+
 class UserRepository:
-    """Simple in-memory repository demonstrating encapsulation of storage.
+    """In-memory repository demonstrating encapsulation of storage.
 
-    The internal storage `_users` is private to the repository.
+    The internal storage and its indexes are private to the repository:
+    ``_users`` by uid, ``_by_email`` by email, and lists kept sorted by
+    (created_at, uid), one for all users and one per role, so pages can be
+    served by bisecting to a cursor instead of copying every value.
     """
 
     def __init__(self):
-        self._users: Dict[str, Person] = {}
+        self._lock = threading.RLock()
+        self._users: Dict[str, StoredUser] = {}
+        self._by_email: Dict[str, StoredUser] = {}
+        self._ordered: List[StoredUser] = []
+        self._by_role: Dict[str, List[StoredUser]] = {}
 
-    def add_user(self, user: Person) -> None:
-        if user.uid in self._users:
-            raise KeyError("User already exists")
-        self._users[user.uid] = user
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def load(self, rows: Iterable[Sequence]) -> int:
+        """Replace the contents with ``rows`` (e.g. a snapshot of ``persons``).
+
+        The new indexes are built aside and swapped in at once, so readers
+        see either the old or the new contents. Returns the number of users.
+        """
+        users = {}
+        by_email = {}
+        ordered = []
+        for row in rows:
+            user = StoredUser.from_row(row)
+            users[user.uid] = user
+            by_email[user.email] = user
+            ordered.append(user)
+        ordered.sort(key=_order_key)  # already ordered when loaded from the index
+        by_role: Dict[str, List[StoredUser]] = {}
+        for user in ordered:
+            by_role.setdefault(user.role, []).append(user)
+        with self._lock:
+            self._users, self._by_email, self._ordered, self._by_role = users, by_email, ordered, by_role
+        return len(users)
+
+    def snapshot(self) -> List[Tuple]:
+        """Return every user as a row, in (created_at, uid) order."""
+        with self._lock:
+            return [user.as_row() for user in self._ordered]
 
-    def get_user(self, uid: str) -> Optional[Person]:
+    def add_user(self, user) -> StoredUser:
+        """Add a ``Person`` or ``StoredUser``; raises KeyError on uid/email conflicts."""
+        record = user if isinstance(user, StoredUser) else StoredUser.from_person(user)
+        with self._lock:
+            if record.uid in self._users:
+                raise KeyError("User already exists")
+            if record.email in self._by_email:
+                raise KeyError("Email already exists")
+            self._insert(record)
+        return record
+
+    def put(self, record: StoredUser) -> None:
+        """Insert or replace the user with ``record.uid``."""
+        with self._lock:
+            self._remove(record.uid)
+            self._insert(record)
+
+    def get_user(self, uid: str) -> Optional[StoredUser]:
         return self._users.get(uid)
 
-    def update_user(self, uid: str, **kwargs) -> Optional[Person]:
-        user = self._users.get(uid)
-        if not user:
-            return None
-        # allow updating name and email for demo
-        if "name" in kwargs:
-            user.name = kwargs["name"]
-        if "email" in kwargs:
-            user._email = kwargs["email"]
-        return user
+    def get_user_by_email(self, email: str) -> Optional[StoredUser]:
+        return self._by_email.get(email)
+
+    def update_user(self, uid: str, **kwargs) -> Optional[StoredUser]:
+        with self._lock:
+            user = self._users.get(uid)
+            if not user:
+                return None
+            if kwargs.get("email") and kwargs["email"] != user.email:
+                if kwargs["email"] in self._by_email:
+                    raise KeyError("Email already exists")
+                del self._by_email[user.email]
+                user.email = kwargs["email"]
+                self._by_email[user.email] = user
+            if kwargs.get("name"):
+                user.name = kwargs["name"]
+            if kwargs.get("role") and kwargs["role"].lower() != user.role:
+                self._remove(uid)
+                user.role = sys.intern(kwargs["role"].lower())
+                self._insert(user)
+            user.updated_at = datetime.utcnow()
+            return user
 
     def delete_user(self, uid: str) -> bool:
-        if uid in self._users:
-            del self._users[uid]
-            return True
-        return False
+        with self._lock:
+            return self._remove(uid) is not None
+
+    def list_users(self, role: Optional[str] = None) -> List[StoredUser]:
+        with self._lock:
+            return list(self._index(role))
+
+    def iter_users(
+        self,
+        role: Optional[str] = None,
+        after: Optional[Tuple[datetime, str]] = None,
+    ) -> Iterator[StoredUser]:
+        """Iterate users in (created_at, uid) order, starting after a cursor."""
+        index = self._index(role)
+        start = bisect_right(index, after, key=_order_key) if after else 0
+        for i in range(start, len(index)):
+            yield index[i]
 
-    def list_users(self):
-        return list(self._users.values())
+    def list_users_keyset(
+        self,
+        limit: int = 10,
+        role: Optional[str] = None,
+        after: Optional[Tuple[datetime, str]] = None,
+    ) -> List[StoredUser]:
+        with self._lock:
+            index = self._index(role)
+            start = bisect_right(index, after, key=_order_key) if after else 0
+            return index[start:start + limit]
+
+    def list_users_paginated(self, skip: int = 0, limit: int = 10, role: Optional[str] = None) -> List[StoredUser]:
+        with self._lock:
+            return self._index(role)[skip:skip + limit]
+
+    def _index(self, role: Optional[str]) -> List[StoredUser]:
+        if role:
+            return self._by_role.get(role.lower(), [])
+        return self._ordered
+
+    def _insert(self, user: StoredUser) -> None:
+        self._users[user.uid] = user
+        self._by_email[user.email] = user
+        # new users sort last, so insort is an append in the common case
+        insort(self._ordered, user, key=_order_key)
+        insort(self._by_role.setdefault(user.role, []), user, key=_order_key)
+
+    def _remove(self, uid: str) -> Optional[StoredUser]:
+        user = self._users.pop(uid, None)
+        if user is None:
+            return None
+        if self._by_email.get(user.email) is user:
+            del self._by_email[user.email]
+        for index in (self._ordered, self._by_role.get(user.role, [])):
+            i = bisect_right(index, _order_key(user), key=_order_key) - 1
+            if i >= 0 and index[i] is user:
+                del index[i]
+        return user
@@ -0,0 +1,287 @@
+"""On-demand request profiling: a full cProfile of sampled or flagged requests.
+
+With ``PROFILING=1`` a request is profiled when it is sampled (a
+``PROFILE_SAMPLE_RATE`` fraction of all requests) or when it carries
+``X-Profile: $ADMIN_TOKEN``. Its pstats file is written to ``PROFILE_DIR``,
+a ring of the newest ``PROFILE_KEEP`` files per directory, and its id comes
+back in an ``X-Profile-Id`` response header. Every profile also adds to a
+per-route total of calls, self time and cumulative time per function, from
+which ``Profiler.summary`` reports the top hotspots of each route.
+
+cProfile only sees the thread it is enabled on, and sync endpoints normally
+run in the thread pool. ``ProfiledRoute`` therefore turns sync endpoints into
+coroutines: a profiled request runs its endpoint inline on the event loop
+under the profile (holding up other requests meanwhile, so keep the sampling
+rate low), any other request hands it to the thread pool as FastAPI would.
+Either way the response model is validated on the event loop. Coroutines of
+other requests that run while a profiled one waits show up in its profile.
+
+Only one request per process is profiled at a time. With ``PROFILING`` off
+neither the middleware nor the route class is installed; with it on and
+nothing sampled, a request costs a header lookup and a random draw.
+"""
+
+import cProfile
+import functools
+import hmac
+import inspect
+import itertools
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+PROFILING = os.getenv("PROFILING", "0").lower() in ("1", "true", "yes")
+
+# Fraction of requests profiled at random (0: only those sent with the X-Profile header)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "100"))
+# Functions listed per route in the hotspot summary
+PROFILE_TOP = int(os.getenv("PROFILE_TOP", "20"))
+
+PROFILE_HEADER = b"x-profile"
+
+# <id>_<METHOD>_<route slug>.prof, the id being <timestamp>-<pid>-<sequence>
+_PROFILE_FILE = re.compile(r"^(?P<id>\d{8}-\d{6}-\d+-\d+)_(?P<method>[A-Z]+)_(?P<route>[\w-]*)\.prof$")
+_PROFILE_ID = re.compile(r"^\d{8}-\d{6}-\d+-\d+$")
+
+_profiling: ContextVar[bool] = ContextVar("profiling", default=False)
+
+
+def _run_inline_when_profiled(endpoint):
+    @functools.wraps(endpoint)
+    async def run(**values):
+        if _profiling.get():
+            return endpoint(**values)
+        return await run_in_threadpool(endpoint, **values)
+
+    return run
+
+
+class ProfiledRoute(APIRoute):
+    """Route class running sync endpoints on the event loop for profiled requests."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if inspect.isfunction(endpoint) and not (
+            inspect.iscoroutinefunction(endpoint)
+            or inspect.isgeneratorfunction(endpoint)
+            or inspect.isasyncgenfunction(endpoint)
+        ):
+            endpoint = _run_inline_when_profiled(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+class RouteProfile:
+    """Profiles taken on one (method, route template) pair, added up per function."""
+
+    __slots__ = ("profiles", "seconds", "functions")
+
+    def __init__(self):
+        self.profiles = 0
+        self.seconds = 0.0
+        # pstats function key -> [calls, self seconds, cumulative seconds]
+        self.functions: Dict[Tuple[str, int, str], List[float]] = {}
+
+    def add(self, stats: pstats.Stats, seconds: float) -> None:
+        self.profiles += 1
+        self.seconds += seconds
+        for func, (_, calls, self_time, cumulative, _) in stats.stats.items():
+            totals = self.functions.get(func)
+            if totals is None:
+                totals = self.functions[func] = [0, 0.0, 0.0]
+            totals[0] += calls
+            totals[1] += self_time
+            totals[2] += cumulative
+
+    def top(self, n: int) -> List[dict]:
+        hottest = sorted(self.functions.items(), key=lambda item: item[1][1], reverse=True)[:n]
+        return [
+            {
+                "function": pstats.func_std_string(func),
+                "calls": calls,
+                "self_seconds": round(self_time, 6),
+                "cumulative_seconds": round(cumulative, 6),
+            }
+            for func, (calls, self_time, cumulative) in hottest
+        ]
+
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "<unmatched>"
+
+
+class Profiler:
+    """The on-disk ring of request profiles and the per-route hotspot totals of this process."""
+
+    def __init__(
+        self,
+        directory: str = PROFILE_DIR,
+        keep: int = PROFILE_KEEP,
+        sample_rate: float = PROFILE_SAMPLE_RATE,
+        top: int = PROFILE_TOP,
+    ):
+        self.directory = os.path.abspath(directory)
+        self.keep = max(keep, 1)
+        self.sample_rate = sample_rate
+        self.top = top
+        self.captured = 0
+        self.skipped = 0  # wanted while another request was being profiled
+        self._busy = False  # cProfile has one profiler slot per thread
+        self._sequence = itertools.count(1)
+        self._routes: Dict[Tuple[str, str], RouteProfile] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Optional[str]:
+        """Claim the profiler for one request; returns the profile id, or None when it is taken."""
+        with self._lock:
+            if self._busy:
+                self.skipped += 1
+                return None
+            self._busy = True
+        return f"{datetime.utcnow():%Y%m%d-%H%M%S}-{os.getpid()}-{next(self._sequence)}"
+
+    def release(self) -> None:
+        with self._lock:
+            self._busy = False
+
+    def record(self, profile_id: str, profile: cProfile.Profile, method: str, route: str, seconds: float) -> str:
+        """Write ``profile`` into the ring and add it to the route's totals; returns its path."""
+        stats = pstats.Stats(profile)
+        slug = re.sub(r"[^\w]+", "-", route).strip("-")
+        path = os.path.join(self.directory, f"{profile_id}_{method}_{slug}.prof")
+        os.makedirs(self.directory, exist_ok=True)
+        stats.dump_stats(path + ".partial")
+        os.replace(path + ".partial", path)
+        with self._lock:
+            self.captured += 1
+            totals = self._routes.get((method, route))
+            if totals is None:
+                totals = self._routes[(method, route)] = RouteProfile()
+            totals.add(stats, seconds)
+        for stale in self.profiles()[self.keep:]:
+            try:
+                os.remove(os.path.join(self.directory, stale["name"]))
+            except FileNotFoundError:  # rotated by another worker sharing the directory
+                pass
+        return path
+
+    def profiles(self) -> List[dict]:
+        """Profiles in the ring, newest first (every worker writing to the directory)."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        found = []
+        for name in names:
+            match = _PROFILE_FILE.match(name)
+            if match:
+                found.append({**match.groupdict(), "name": name, "size": os.path.getsize(os.path.join(self.directory, name))})
+        timestamp = lambda p: (p["id"].rsplit("-", 2)[0], int(p["id"].rsplit("-", 1)[1]))  # noqa: E731
+        return sorted(found, key=timestamp, reverse=True)
+
+    def path(self, profile_id: str) -> Optional[str]:
+        """The pstats file of ``profile_id``, if it is still in the ring."""
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        for profile in self.profiles():
+            if profile["id"] == profile_id:
+                return os.path.join(self.directory, profile["name"])
+        return None
+
+    def summary(self, top: Optional[int] = None) -> dict:
+        """Per route: profiles taken, their total seconds and the ``top`` functions by self time."""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            return {
+                "routes": [
+                    {
+                        "method": method,
+                        "route": route,
+                        "profiles": totals.profiles,
+                        "seconds": round(totals.seconds, 6),
+                        "top": totals.top(top or self.top),
+                    }
+                    for (method, route), totals in routes
+                ]
+            }
+
+    def stats(self) -> dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "captured": self.captured,
+            "skipped": self.skipped,
+            "keep": self.keep,
+            "directory": self.directory,
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling sampled requests and those flagged with ``X-Profile: <token>``."""
+
+    def __init__(self, app, profiler: Profiler, token: Optional[str] = None):
+        self.app = app
+        self.profiler = profiler
+        self.token = token.encode() if token else None
+
+    def _wanted(self, scope) -> bool:
+        if self.token is not None:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER:
+                    if hmac.compare_digest(value, self.token):
+                        return True
+                    break  # a wrong token is just not a trigger; the request may still be sampled
+        return self.profiler.sample_rate > 0 and random.random() < self.profiler.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+        profile_id = self.profiler.acquire()
+        if profile_id is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        profile = cProfile.Profile()
+        token = _profiling.set(True)
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profile.disable()
+            seconds = time.perf_counter() - started
+            _profiling.reset(token)
+            try:
+                await run_in_threadpool(
+                    self.profiler.record, profile_id, profile, scope["method"], _route_template(scope), seconds
+                )
+            except Exception:
+                logger.exception("could not save profile %s", profile_id)
+            finally:
+                self.profiler.release()
+
+
+# Process-wide profiler used by the API
+profiler = Profiler()
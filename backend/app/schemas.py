@@ -1,5 +1,7 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from datetime import datetime
+
+from pydantic import BaseModel, EmailStr, Field
+from typing import Dict, List, Optional
 
 
 class TokenData(BaseModel):
@@ -18,3 +20,48 @@ class UserOut(BaseModel):
     name: str
     email: EmailStr
     role: str
+
+
+class UserLookupRequest(BaseModel):
+    uids: List[str] = Field(default_factory=list, max_length=1000)
+    emails: List[str] = Field(default_factory=list, max_length=1000)
+
+
+class UserLookupResult(BaseModel):
+    users: Dict[str, Optional[UserOut]]  # null for unknown uids
+    emails: Dict[str, Optional[UserOut]]
+
+
+class UserChange(BaseModel):
+    seq: int
+    op: str  # insert, update, delete
+    uid: str
+    # state after the change; null for deletes
+    name: Optional[str] = None
+    email: Optional[str] = None
+    role: Optional[str] = None
+    changed_at: datetime
+
+
+class ChangesPage(BaseModel):
+    changes: List[UserChange]
+    next: int  # pass back as ``since``
+
+
+class BulkUserResult(BaseModel):
+    index: int
+    uid: Optional[str] = None
+    status: str  # created, conflict, invalid
+    detail: Optional[str] = None
+
+
+class BulkImportResult(BaseModel):
+    created: int
+    conflicts: int
+    invalid: int
+    results: List[BulkUserResult]
+
+
+class UserStats(BaseModel):
+    counts: Dict[str, int]
+    total: int
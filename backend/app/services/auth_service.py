@@ -1,23 +1,44 @@
 import os
 from typing import Optional
 
-import firebase_admin
-from firebase_admin import auth, credentials
+from .token_cache import GoogleCertKeySource, KeySource, LocalTokenVerifier, PublicKeyCache, TokenClaimsCache
 
 
 class AuthService:
-    """Encapsulates Firebase Admin initialization and token verification."""
+    """Encapsulates Firebase Admin initialization and token verification.
 
-    def __init__(self, cred_path: Optional[str] = None):
+    Verified claims are cached per token until the token expires. When the
+    Firebase project id is known, tokens are verified locally against cached
+    public keys from ``key_source`` (Google's certificates by default);
+    otherwise verification is delegated to ``firebase_admin``.
+
+    Firebase Admin is imported and initialized on first use rather than at
+    construction, so building the service costs nothing at startup.
+    """
+
+    def __init__(
+        self,
+        cred_path: Optional[str] = None,
+        key_source: Optional[KeySource] = None,
+        project_id: Optional[str] = None,
+        cache_size: int = int(os.getenv("TOKEN_CACHE_SIZE", "10000")),
+        cache_ttl: float = float(os.getenv("TOKEN_CACHE_TTL", "300")),
+    ):
         self._app = None
         self._initialized = False
         self._cred_path = cred_path or os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
-        self._initialize()
+        self._project_id = project_id or os.getenv("FIREBASE_PROJECT_ID")
+        self._key_cache = PublicKeyCache(key_source or GoogleCertKeySource())
+        self._verifier: Optional[LocalTokenVerifier] = None
+        self._claims_cache = TokenClaimsCache(maxsize=cache_size, max_ttl=cache_ttl)
 
     def _initialize(self):
         # internal helper, hidden from public API
         if self._initialized:
             return
+        import firebase_admin
+        from firebase_admin import credentials
+
         try:
             if self._cred_path:
                 cred = credentials.Certificate(self._cred_path)
@@ -35,14 +56,49 @@ class AuthService:
                 # leave uninitialized; verification will raise helpful errors
                 self._initialized = False
 
+    def _get_verifier(self) -> Optional[LocalTokenVerifier]:
+        # internal helper: local verification needs the project id (audience)
+        if self._verifier is None:
+            project_id = self._project_id
+            if not project_id:
+                self._initialize()
+            if not project_id and self._app is not None:
+                try:
+                    project_id = self._app.project_id
+                except Exception:
+                    project_id = None
+            if project_id:
+                self._verifier = LocalTokenVerifier(project_id, self._key_cache)
+        return self._verifier
+
+    def cached_uid(self, id_token: str) -> Optional[str]:
+        """uid of ``id_token`` if it was verified earlier and is still cached, else None.
+
+        Never verifies, so it is cheap enough to call on every request.
+        """
+        claims = self._claims_cache.get(id_token) if id_token else None
+        return claims.get("uid") or claims.get("sub") if claims else None
+
     def verify_id_token(self, id_token: str) -> dict:
         """Verify a Firebase ID token and return decoded claims.
 
-        Raises an exception if verification fails.
+        Raises an exception if verification fails. Failed verifications are
+        never cached.
         """
         if not id_token:
             raise ValueError("id_token must be provided")
-        if not self._initialized:
-            # try a best-effort initialize (useful in dev)
-            self._initialize()
-        return auth.verify_id_token(id_token, app=self._app)
+        claims = self._claims_cache.get(id_token)
+        if claims is not None:
+            return dict(claims)
+        verifier = self._get_verifier()
+        if verifier is not None:
+            claims = verifier.verify(id_token)
+        else:
+            from firebase_admin import auth
+
+            if not self._initialized:
+                # try a best-effort initialize (useful in dev)
+                self._initialize()
+            claims = auth.verify_id_token(id_token, app=self._app)
+        self._claims_cache.put(id_token, claims)
+        return dict(claims)
@@ -0,0 +1,151 @@
+"""Server-Sent Events fan-out of the user change log.
+
+One reader per process follows the log and hands new entries to every
+connected stream, so a thousand open dashboards cost one incremental query
+per commit instead of a thousand polls. The reader wakes up when the shared
+table counter of ``app.db.generations`` moves (a memory read, bumped after
+every committed user write in any process) and only then queries the log.
+Databases without the counter file are polled every ``poll_interval``.
+
+A stream first replays the log after its cursor, then follows the reader.
+A stream that falls more than ``queue_size`` batches behind replays from
+its cursor again instead of holding unbounded memory.
+"""
+
+import asyncio
+import os
+from typing import AsyncIterator, List, Optional, Set
+
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
+
+from app.db.changes import ChangeLogRepository
+from app.db.config import DATABASE_URL, SessionLocal
+from app.db.generations import GenerationTable, generation_table
+
+# Seconds between checks for new changes, and between keep-alive comments
+CHANGE_POLL_INTERVAL = float(os.getenv("CHANGE_POLL_INTERVAL", "0.25"))
+CHANGE_HEARTBEAT = float(os.getenv("CHANGE_HEARTBEAT", "15"))
+
+
+class ChangeFeed:
+    """Follows ``user_changes`` and publishes new entries to subscribed streams."""
+
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        generations: Optional[GenerationTable] = None,
+        poll_interval: float = CHANGE_POLL_INTERVAL,
+        heartbeat: float = CHANGE_HEARTBEAT,
+        batch_size: int = 500,
+        queue_size: int = 100,
+    ):
+        self._session_factory = session_factory
+        self._generations = generations
+        self._poll_interval = poll_interval
+        self._heartbeat = heartbeat
+        self._batch_size = batch_size
+        self._queue_size = queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._seq = 0
+        self.reads = 0
+
+    def _read(self, since: int) -> List[Row]:
+        self.reads += 1
+        with self._session_factory() as db:
+            return ChangeLogRepository(db).since(since, self._batch_size)
+
+    def _latest(self) -> int:
+        with self._session_factory() as db:
+            return ChangeLogRepository(db).latest_seq()
+
+    def _mark(self) -> Optional[int]:
+        return self._generations.table() if self._generations is not None else None
+
+    async def _follow(self) -> None:
+        seen = None  # always read once: changes may have landed since _latest()
+        while True:
+            await asyncio.sleep(self._poll_interval)
+            mark = self._mark()
+            if mark is not None and mark == seen:
+                continue
+            # read after sampling: a commit bumps the counter only once visible
+            seen = mark
+            while True:
+                rows = await run_in_threadpool(self._read, self._seq)
+                if rows:
+                    self._seq = rows[-1].seq
+                    self._publish(rows)
+                if len(rows) < self._batch_size:
+                    break
+
+    def _publish(self, rows: List[Row]) -> None:
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(rows)
+            except asyncio.QueueFull:
+                # fell behind: drop its backlog and let it replay from its cursor
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    async def _subscribe(self) -> asyncio.Queue:
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._task is None:
+                # start from the current end, before the subscriber replays up to it
+                self._seq = await run_in_threadpool(self._latest)
+                self._task = asyncio.get_running_loop().create_task(self._follow())
+            queue: asyncio.Queue = asyncio.Queue(self._queue_size)
+            self._subscribers.add(queue)
+            return queue
+
+    def _unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+            self._start_lock = None
+
+    async def events(self, since: int) -> AsyncIterator[List[Row]]:
+        """Yield batches of entries after ``since`` as they commit, oldest first.
+
+        An empty batch is yielded after ``heartbeat`` seconds without changes
+        so the caller can keep the connection alive.
+        """
+        queue = await self._subscribe()
+        last = since
+        try:
+            while True:
+                while True:
+                    rows = await run_in_threadpool(self._read, last)
+                    if rows:
+                        last = rows[-1].seq
+                        yield rows
+                    if len(rows) < self._batch_size:
+                        break
+                while True:
+                    try:
+                        batch = await asyncio.wait_for(queue.get(), self._heartbeat)
+                    except asyncio.TimeoutError:
+                        yield []
+                        continue
+                    if batch is None:
+                        break
+                    rows = [row for row in batch if row.seq > last]
+                    if rows:
+                        last = rows[-1].seq
+                        yield rows
+        finally:
+            self._unsubscribe(queue)
+
+    def stats(self) -> dict:
+        return {"subscribers": len(self._subscribers), "reads": self.reads, "seq": self._seq}
+
+
+# Process-wide feed behind GET /users/changes/stream
+change_feed = ChangeFeed(SessionLocal, generation_table(DATABASE_URL))
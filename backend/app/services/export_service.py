@@ -0,0 +1,70 @@
+"""Streaming encoders for bulk user exports (NDJSON and CSV)."""
+
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional
+
+from app.db.config import SessionLocal
+from app.db.repository import DatabaseUserRepository
+
+EXPORT_FIELDS = ("uid", "name", "email", "role", "created_at", "updated_at")
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def encode_ndjson(chunks: Iterable[List[tuple]]) -> Iterator[bytes]:
+    """Encode each chunk of rows as one block of NDJSON lines."""
+    for chunk in chunks:
+        lines = [
+            json.dumps(
+                {"uid": uid, "name": name, "email": email, "role": role,
+                 "created_at": _iso(created_at), "updated_at": _iso(updated_at)},
+                separators=(",", ":"),
+            )
+            for uid, name, email, role, created_at, updated_at in chunk
+        ]
+        yield ("\n".join(lines) + "\n").encode()
+
+
+def encode_csv(chunks: Iterable[List[tuple]]) -> Iterator[bytes]:
+    """Encode a header row, then each chunk of rows as one block of CSV."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    yield buffer.getvalue().encode()
+    for chunk in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            (uid, name, email, role, _iso(created_at), _iso(updated_at))
+            for uid, name, email, role, created_at, updated_at in chunk
+        )
+        yield buffer.getvalue().encode()
+
+
+def stream_users(
+    fmt: str = "ndjson",
+    role: Optional[str] = None,
+    updated_since: Optional[datetime] = None,
+    chunk_size: int = 1000,
+) -> Iterator[bytes]:
+    """Yield the encoded export, holding a dedicated session for its lifetime.
+
+    The session is opened here rather than injected because a streaming
+    response outlives the request's dependency scope.
+    """
+    encoder = encode_csv if fmt == "csv" else encode_ndjson
+    db = SessionLocal()
+    try:
+        repo = DatabaseUserRepository(db)
+        yield from encoder(repo.iter_user_chunks(role=role, updated_since=updated_since, chunk_size=chunk_size))
+    finally:
+        db.close()
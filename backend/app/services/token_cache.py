@@ -0,0 +1,194 @@
+"""Caching building blocks for Firebase ID token verification.
+
+- ``TokenClaimsCache``: bounded LRU of decoded claims keyed by a hash of the
+  token. Entries never outlive the token's ``exp``.
+- ``KeySource`` implementations supply the RS256 public keys by ``kid``;
+  ``GoogleCertKeySource`` fetches Google's published certificates and
+  ``StaticKeySource`` serves fixed keys (for tests and offline benchmarks).
+- ``PublicKeyCache`` keeps the keys until their ``max-age`` expires and
+  refreshes them single-flight, so concurrent requests share one fetch.
+- ``LocalTokenVerifier`` checks signature and claims the way
+  ``firebase_admin.auth.verify_id_token`` does.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+import urllib.request
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import jwt
+from cryptography.x509 import load_pem_x509_certificate
+
+GOOGLE_CERT_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+ISSUER_PREFIX = "https://securetoken.google.com/"
+
+
+class TokenClaimsCache:
+    """Thread-safe LRU cache of verified token claims with expiry."""
+
+    def __init__(self, maxsize: int = 10000, max_ttl: float = 300.0, clock: Callable[[], float] = time.time):
+        self._maxsize = maxsize
+        self._max_ttl = max_ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        # never keep raw bearer tokens in memory longer than necessary
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[dict]:
+        """Return cached claims, or None if absent or expired."""
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, claims = entry
+            if self._clock() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return claims
+
+    def put(self, token: str, claims: dict) -> None:
+        """Cache ``claims`` until the earlier of ``exp`` and ``max_ttl`` from now."""
+        if self._maxsize <= 0:
+            return
+        now = self._clock()
+        expires_at = now + self._max_ttl
+        if "exp" in claims:
+            expires_at = min(expires_at, float(claims["exp"]))
+        if expires_at <= now:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, claims)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class KeySource(ABC):
+    """Supplies public keys by ``kid`` together with how long they stay valid."""
+
+    @abstractmethod
+    def fetch(self) -> Tuple[Dict[str, Any], float]:
+        """Return ``({kid: public_key}, max_age_seconds)``."""
+
+
+class GoogleCertKeySource(KeySource):
+    """Fetches the X.509 certificates Google signs Firebase ID tokens with."""
+
+    def __init__(self, url: str = GOOGLE_CERT_URL, timeout: float = 10.0):
+        self._url = url
+        self._timeout = timeout
+
+    def fetch(self) -> Tuple[Dict[str, Any], float]:
+        with urllib.request.urlopen(self._url, timeout=self._timeout) as response:
+            certs = json.loads(response.read())
+            cache_control = response.headers.get("Cache-Control", "")
+        match = re.search(r"max-age=(\d+)", cache_control)
+        max_age = float(match.group(1)) if match else 3600.0
+        keys = {kid: load_pem_x509_certificate(pem.encode()).public_key() for kid, pem in certs.items()}
+        return keys, max_age
+
+
+class StaticKeySource(KeySource):
+    """Serves a fixed set of keys; counts fetches so tests can assert on them."""
+
+    def __init__(self, keys: Dict[str, Any], max_age: float = 3600.0):
+        self.keys = dict(keys)
+        self.max_age = max_age
+        self.fetch_count = 0
+
+    def fetch(self) -> Tuple[Dict[str, Any], float]:
+        self.fetch_count += 1
+        return dict(self.keys), self.max_age
+
+
+class PublicKeyCache:
+    """Caches keys from a ``KeySource`` with single-flight refresh.
+
+    Only one thread fetches at a time; threads that were waiting re-check
+    freshness after acquiring the lock and reuse the result. An unknown
+    ``kid`` forces a refresh (key rotation), at most once per
+    ``min_refresh_interval`` seconds.
+    """
+
+    def __init__(self, source: KeySource, min_refresh_interval: float = 30.0, clock: Callable[[], float] = time.time):
+        self._source = source
+        self._min_refresh_interval = min_refresh_interval
+        self._clock = clock
+        self._keys: Dict[str, Any] = {}
+        self._expires_at = 0.0
+        self._fetched_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def get(self, kid: str) -> Any:
+        """Return the key for ``kid``; raises KeyError if it is not published."""
+        key = self._lookup(kid)
+        if key is not None:
+            return key
+        with self._lock:
+            key = self._lookup(kid)
+            if key is not None:
+                return key
+            now = self._clock()
+            recently_fetched = self._fetched_at is not None and now - self._fetched_at < self._min_refresh_interval
+            if now >= self._expires_at or not recently_fetched:
+                keys, max_age = self._source.fetch()
+                self._keys, self._expires_at, self._fetched_at = keys, now + max_age, now
+        if kid not in self._keys:
+            raise KeyError(f"No public key for kid {kid!r}")
+        return self._keys[kid]
+
+    def _lookup(self, kid: str) -> Any:
+        if self._clock() < self._expires_at:
+            return self._keys.get(kid)
+        return None
+
+
+class LocalTokenVerifier:
+    """Verifies Firebase ID tokens locally with RS256 keys from a ``PublicKeyCache``."""
+
+    def __init__(self, project_id: str, keys: PublicKeyCache, clock_skew: int = 0):
+        self._project_id = project_id
+        self._issuer = ISSUER_PREFIX + project_id
+        self._keys = keys
+        self._clock_skew = clock_skew
+
+    def verify(self, id_token: str) -> dict:
+        """Return decoded claims; raises ``jwt.InvalidTokenError`` or KeyError on failure."""
+        header = jwt.get_unverified_header(id_token)
+        if header.get("alg") != "RS256":
+            raise jwt.InvalidAlgorithmError("ID token must be signed with RS256")
+        key = self._keys.get(header.get("kid", ""))
+        claims = jwt.decode(
+            id_token,
+            key=key,
+            algorithms=["RS256"],
+            audience=self._project_id,
+            issuer=self._issuer,
+            leeway=self._clock_skew,
+            options={"require": ["exp", "iat", "sub", "aud", "iss"]},
+        )
+        if not claims.get("sub") or len(claims["sub"]) > 128:
+            raise jwt.InvalidTokenError('ID token has an invalid "sub" (subject) claim')
+        if claims.get("auth_time", 0) > time.time() + self._clock_skew:
+            raise jwt.ImmatureSignatureError('ID token has a future "auth_time" claim')
+        claims["uid"] = claims["sub"]
+        return claims
@@ -4,6 +4,7 @@ from typing import Optional, List
 from sqlalchemy.orm import Session
 
 from app.db.repository import DatabaseUserRepository
+from app.db.stats import RoleStatsRepository
 from app.models.person import Person, Donor, Vendor, Victim
 
 
@@ -18,6 +19,7 @@ class UserService:
 
     def __init__(self, db: Session):
         self._repository = DatabaseUserRepository(db)
+        self._stats = RoleStatsRepository(db)
 
     def create_user(self, person: Person) -> dict:
         """Create a user with business logic validation."""
@@ -35,6 +37,14 @@ class UserService:
             return None
         return self._format_user(user)
 
+    def get_users_many(self, uids: List[str], emails: List[str] = ()) -> dict:
+        """Retrieve many users by uid (and email) in a few queries; misses map to None."""
+        lookup = self._repository.get_users_many(uids, emails)
+        return {
+            "users": {uid: self._format_user(u) if u else None for uid, u in lookup.by_uid.items()},
+            "emails": {email: self._format_user(u) if u else None for email, u in lookup.by_email.items()},
+        }
+
     def update_user(self, uid: str, name: Optional[str] = None, email: Optional[str] = None) -> Optional[dict]:
         """Update a user with validation."""
         if name and not name.strip():
@@ -67,12 +77,8 @@ class UserService:
         return self.list_users(role="victim")
 
     def count_by_role(self) -> dict:
-        """Count users by role."""
-        all_users = self._repository.list_users()
-        counts = {"donor": 0, "vendor": 0, "victim": 0}
-        for user in all_users:
-            counts[user.role.lower()] += 1
-        return counts
+        """Count users by role from the maintained counters."""
+        return self._stats.counts()
 
     @staticmethod
     def _format_user(user) -> dict:
@@ -0,0 +1 @@
+"""Benchmark scripts. Run from the backend root, e.g. ``python -m benchmarks.bench_bulk_import``."""
@@ -0,0 +1,106 @@
+"""Overload test of user writes with and without admission control.
+
+Runs the app in process (no sockets, so the load generator does not compete
+with the server for the CPU) against a fresh database and fires
+``POST /users`` for ``--seconds`` from ``--concurrency`` tasks with no think
+time, spread over ``--clients`` bearer tokens, with one extra client sending
+a quarter of all requests; clients wait out ``Retry-After`` when told to.
+The app is driven wrapped in ``AdmissionMiddleware`` and then bare. Reports
+how requests ended (created, 429, 503, 500, or no answer within
+``--timeout``) and p50/p99 latency of the created ones.
+
+Without admission control a burst wider than the connection pool fills
+every thread-pool worker with a write waiting for a connection, and writes
+stall until the pool's 30 s checkout timeout.
+
+Usage: python -m benchmarks.bench_admission [--seconds N] [--concurrency N] [--clients N]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+
+
+async def drive(asgi_app, args, prefix: str):
+    latencies = []
+    outcomes: Counter = Counter()
+    counter = iter(range(10**9))
+    rng = random.Random(42)
+    transport = httpx.ASGITransport(app=asgi_app, raise_app_exceptions=False)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+        async def worker():
+            for i in counter:
+                if time.perf_counter() > deadline:
+                    return
+                who = "heavy" if rng.random() < 0.25 else f"client{rng.randrange(args.clients)}"
+                uid = f"{prefix}{i}"
+                body = {"uid": uid, "name": f"User {i}", "email": f"{uid}@example.com"}
+                start = time.perf_counter()
+                try:
+                    r = await asyncio.wait_for(
+                        client.post("/users", json=body, headers={"Authorization": f"Bearer {who}"}), args.timeout
+                    )
+                except asyncio.TimeoutError:
+                    outcomes["timeout"] += 1
+                    continue
+                if r.status_code == 200:
+                    latencies.append(time.perf_counter() - start)
+                    outcomes["created"] += 1
+                else:
+                    outcomes[str(r.status_code)] += 1
+                    if "retry-after" in r.headers:
+                        await asyncio.sleep(float(r.headers["retry-after"]))
+
+        start = time.perf_counter()
+        deadline = start + args.seconds
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return latencies, outcomes, time.perf_counter() - start
+
+
+def report(label: str, latencies, outcomes: Counter, elapsed: float) -> None:
+    from benchmarks.common import percentile
+
+    ended = "  ".join(f"{k}={v}" for k, v in sorted(outcomes.items()))
+    print(
+        f"  admission {label:<3} {outcomes['created'] / elapsed:>6.0f} created/s"
+        f"  created p50={percentile(latencies, 50) * 1000:>7.1f} ms  p99={percentile(latencies, 99) * 1000:>7.1f} ms"
+        f"   {ended}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=10, help="client-side timeout per request, in seconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'admission.db')}"
+        os.environ["ADMISSION_CONTROL"] = "0"
+
+        import app.main as main_module
+        from app.admission import AdmissionController, AdmissionMiddleware
+        from app.db.config import engine
+        from app.db.schema import ensure_schema
+
+        ensure_schema(engine)
+        print(f"seconds={args.seconds} concurrency={args.concurrency} clients={args.clients}")
+        controller = AdmissionController()
+        report("on", *asyncio.run(drive(AdmissionMiddleware(main_module.app, controller), args, "on")))
+        print(f"    server: {controller.stats()}")
+        report("off", *asyncio.run(drive(main_module.app, args, "off")))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Load test comparing the sync (thread pool) and async (event loop) request paths.
+
+Starts one uvicorn server per ``DB_MODE`` against a fresh seeded database and
+drives a read-heavy mix of requests at high concurrency, reporting
+throughput and p50/p99 latency.
+
+Usage: python -m benchmarks.bench_async_load [--requests N] [--concurrency N] [--users N]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.common import percentile
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(mode: str, db_path: str, port: int) -> subprocess.Popen:
+    env = dict(os.environ, DB_MODE=mode, DATABASE_URL=f"sqlite:///{db_path}")
+    env.pop("ASYNC_DATABASE_URL", None)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            await client.get("/stats/users")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def drive(client: httpx.AsyncClient, users: int, total: int, concurrency: int):
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+    rng = random.Random(42)
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            roll = rng.random()
+            start = time.perf_counter()
+            if roll < 0.7:
+                r = await client.get(f"/users/u{rng.randrange(users)}")
+            elif roll < 0.9:
+                r = await client.get("/users", params={"limit": 20})
+            else:
+                r = await client.post("/users", json={"uid": f"new{i}", "name": "New", "email": f"new{i}@example.com"})
+            latencies.append(time.perf_counter() - start)
+            if r.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+async def run_mode(mode: str, args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        server = start_server(mode, os.path.join(tmp, "load.db"), port)
+        limits = httpx.Limits(max_connections=args.concurrency)
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+                await wait_ready(client)
+                rows = [{"uid": f"u{i}", "name": f"User {i}", "email": f"u{i}@example.com"} for i in range(args.users)]
+                await client.post("/users/bulk", json=rows)
+                latencies, errors, elapsed = await drive(client, args.users, args.requests, args.concurrency)
+        finally:
+            server.terminate()
+            server.wait()
+    print(
+        f"  {mode:<6} {len(latencies) / elapsed:>9.0f} req/s"
+        f"  p50={percentile(latencies, 50) * 1000:>7.1f} ms"
+        f"  p99={percentile(latencies, 99) * 1000:>7.1f} ms  errors={errors}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--users", type=int, default=10000)
+    args = parser.parse_args()
+    print(f"requests={args.requests} concurrency={args.concurrency} users={args.users}")
+    for mode in ("sync", "async"):
+        asyncio.run(run_mode(mode, args))
+
+
+if __name__ == "__main__":
+    main()
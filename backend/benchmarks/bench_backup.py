@@ -0,0 +1,167 @@
+"""Request latency while an online backup of a multi-GB database runs.
+
+Builds (once, in ``--database``) a database of ``--users`` synthetic users
+padded with a blob table to ``--size-gb``, then drives the app in process
+with ``--concurrency`` tasks: GET /users/{uid} for random existing users
+(mostly cache misses at a million users) and, for ``--write-share`` of the
+requests, PUT /users/{uid} renaming one. Latencies are taken for
+``--seconds`` with no backup running, then for the length of each backup:
+the stepped copy the app runs (``BACKUP_PAGES_PER_STEP`` pages, then a
+pause) and a single-step copy of the whole file. Each backup includes its
+integrity check (``--integrity``). Reports p50/p99/max of reads and writes
+per phase, and for each backup its length, the part spent checking, steps,
+longest step, restarts and how long writers were locked out.
+
+Usage: python -m benchmarks.bench_backup [--size-gb N] [--users N] [--database PATH] [--seconds N]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+import httpx
+
+FILLER_ROW = 4000  # bytes of blob per filler row, about one page
+
+
+def build(path: str, users: int, size_gb: float) -> None:
+    from app.db.config import SessionLocal, engine
+    from app.db.models import PersonModel
+    from app.db.schema import ensure_schema
+    from init_db import load_users
+    from sqlalchemy import func, select
+
+    ensure_schema(engine)
+    with SessionLocal() as db:
+        existing = db.execute(select(func.count()).select_from(PersonModel)).scalar()
+    if not existing:
+        print(f"Loading {users:,} users")
+        load_users(SessionLocal, users)
+    engine.dispose()
+
+    target = int(size_gb * 1024**3)
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS backup_filler (id INTEGER PRIMARY KEY, data BLOB)")
+        while os.path.getsize(path) < target:
+            rows = min(50_000, (target - os.path.getsize(path)) // FILLER_ROW + 1)
+            conn.execute(
+                "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?) "
+                "INSERT INTO backup_filler (data) SELECT randomblob(?) FROM n",
+                (rows, FILLER_ROW),
+            )
+            conn.commit()
+            print(f"  padded to {os.path.getsize(path) / 1024**3:.2f} GB", end="\r")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    print(f"\nDatabase {path}: {os.path.getsize(path) / 1024**3:.2f} GB")
+
+
+def sample_users(path: str, count: int = 5000) -> list:
+    with sqlite3.connect(path) as conn:
+        total = conn.execute("SELECT max(rowid) FROM persons").fetchone()[0]
+        stride = max(total // count, 1)
+        return conn.execute(
+            "SELECT uid, name, email, role FROM persons WHERE rowid % ? = 0 LIMIT ?", (stride, count)
+        ).fetchall()
+
+
+async def drive(asgi_app, users: list, args, until) -> tuple:
+    reads, writes, errors = [], [], 0
+    rng = random.Random(7)
+    transport = httpx.ASGITransport(app=asgi_app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+        async def worker():
+            nonlocal errors
+            while not until():
+                uid, name, email, role = rng.choice(users)
+                start = time.perf_counter()
+                if rng.random() < args.write_share:
+                    body = {"uid": uid, "name": f"{name.split(' #')[0]} #{rng.randrange(1000)}", "email": email, "role": role}
+                    r = await client.put(f"/users/{uid}", json=body)
+                    samples = writes
+                else:
+                    r = await client.get(f"/users/{uid}")
+                    samples = reads
+                if r.status_code >= 300:
+                    errors += 1
+                else:
+                    samples.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return reads, writes, errors
+
+
+def report(label: str, reads: list, writes: list, errors: int, elapsed: float) -> None:
+    from benchmarks.common import percentile
+
+    def ms(samples):
+        return (
+            f"p50={percentile(samples, 50) * 1000:>6.1f} p99={percentile(samples, 99) * 1000:>7.1f}"
+            f" max={max(samples, default=0) * 1000:>7.1f} ms"
+        )
+
+    print(
+        f"  {label:<22} {(len(reads) + len(writes)) / elapsed:>6.0f} req/s"
+        f"   reads {ms(reads)}   writes {ms(writes)}   errors={errors}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-gb", type=float, default=2.0, help="pad the database file to this size")
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--database", default="bench_backup.db", help="reused between runs")
+    parser.add_argument("--seconds", type=float, default=20, help="length of the baseline phase")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--write-share", type=float, default=0.1)
+    parser.add_argument("--integrity", choices=("full", "quick", "off"), default="full", help="check run on each snapshot")
+    args = parser.parse_args()
+
+    path = os.path.abspath(args.database)
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ["ADMISSION_CONTROL"] = "0"
+    build(path, args.users, args.size_gb)
+
+    import app.main as main_module
+    from app.db.backup import BACKUP_PAGES_PER_STEP, BACKUP_STEP_PAUSE, BackupManager
+
+    users = sample_users(path)
+    out = tempfile.mkdtemp(prefix="bench-backup-", dir=os.path.dirname(path))
+    print(f"concurrency={args.concurrency} write share={args.write_share:.0%} users sampled={len(users):,}")
+    try:
+        deadline = time.perf_counter() + args.seconds
+        start = time.perf_counter()
+        report("no backup", *asyncio.run(drive(main_module.app, users, args, lambda: time.perf_counter() > deadline)),
+               time.perf_counter() - start)
+
+        for label, pages, pause in (
+            (f"stepped ({BACKUP_PAGES_PER_STEP} pages)", BACKUP_PAGES_PER_STEP, BACKUP_STEP_PAUSE),
+            ("single step", -1, 0.0),
+        ):
+            manager = BackupManager(path, out, keep=1, pages_per_step=pages, step_pause=pause, integrity=args.integrity)
+            assert manager.start()
+            start = time.perf_counter()
+            report(label, *asyncio.run(drive(main_module.app, users, args, lambda: not manager.running)),
+                   time.perf_counter() - start)
+            if manager.last_error:
+                print(f"    backup failed: {manager.last_error}")
+                continue
+            result = manager.last_result
+            print(
+                f"    backup {result.elapsed:.1f} s for {result.size / 1024**3:.2f} GB (integrity check {result.check_time:.1f} s),"
+                f" {result.steps} steps"
+                f" (longest {result.longest_step * 1000:.0f} ms), {result.restarts} restarts,"
+                f" writers locked out {result.write_lock * 1000:.0f} ms, integrity {result.integrity}"
+            )
+    finally:
+        shutil.rmtree(out, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Compare rows/sec of single-row ``add_user`` against batched ``add_users``.
+
+Usage: python -m benchmarks.bench_bulk_import [--rows N] [--batch-size N]
+"""
+
+import argparse
+
+from app.db.repository import DatabaseUserRepository
+from benchmarks.common import Timer, make_people, temp_database
+
+
+def bench_single(rows: int) -> float:
+    people = make_people(rows, prefix="single")
+    with temp_database() as Session:
+        db = Session()
+        repo = DatabaseUserRepository(db)
+        with Timer() as t:
+            for person in people:
+                repo.add_user(person)
+        db.close()
+    return rows / t.elapsed
+
+
+def bench_bulk(rows: int, batch_size: int) -> float:
+    people = make_people(rows, prefix="bulk")
+    with temp_database() as Session:
+        db = Session()
+        repo = DatabaseUserRepository(db)
+        with Timer() as t:
+            results = repo.add_users(people, batch_size=batch_size)
+        db.close()
+    assert all(r["status"] == "created" for r in results)
+    return rows / t.elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    single = bench_single(args.rows)
+    bulk = bench_bulk(args.rows, args.batch_size)
+    print(f"rows={args.rows} batch_size={args.batch_size}")
+    print(f"  add_user  (one transaction per row): {single:>10.0f} rows/sec")
+    print(f"  add_users (batched transactions):    {bulk:>10.0f} rows/sec  ({bulk / single:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
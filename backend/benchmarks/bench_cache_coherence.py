@@ -0,0 +1,76 @@
+"""Cost of the cross-process cache coherence check.
+
+Measures the cache-hit path of ``UserCache`` with and without the shared
+generation counters (one memory-mapped read per hit), the cost of bumping
+the counters after a commit, and ``update_user`` with and without the bump,
+so the per-request and per-write overhead of ``CACHE_COHERENCE=shared`` is
+tracked.
+
+Usage: python -m benchmarks.bench_cache_coherence [--lookups N] [--writes N]
+"""
+
+import argparse
+import os
+import tempfile
+from typing import Callable, List
+
+from app.db import generations
+from app.db.cache import UserCache, UserRecord
+from app.db.repository import DatabaseUserRepository
+from benchmarks.common import Timer, make_people, percentile, temp_database
+
+
+def latencies(fn: Callable[[int], object], count: int) -> List[float]:
+    samples = []
+    for i in range(count):
+        with Timer() as t:
+            fn(i)
+        samples.append(t.elapsed)
+    return samples
+
+
+def report(name: str, samples: List[float]) -> None:
+    print(f"  {name:<34} p50 {percentile(samples, 50) * 1e6:>8.2f} us   p99 {percentile(samples, 99) * 1e6:>8.2f} us")
+
+
+def cache_hits(cache: UserCache, lookups: int) -> List[float]:
+    keys = [("user", f"u{i}") for i in range(1000)]
+    for key in keys:
+        cache.get_or_load(key, lambda key=key: UserRecord(key[1], "N", "e", "donor", None, None))
+    return latencies(lambda i: cache.get_or_load(keys[i % 1000], None), lookups)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    parser.add_argument("--writes", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        table = generations.GenerationTable(os.path.join(tmp, "bench.db-gen"))
+        cache_hits(UserCache(generations=table), 10_000)  # warm up
+        report("cache hit, local only", cache_hits(UserCache(), args.lookups))
+        report("cache hit, shared counters", cache_hits(UserCache(generations=table), args.lookups))
+        list_cache = UserCache(generations=table)
+        list_cache.get_or_load(("list", "keyset", None, 100, None), lambda: [])
+        report("list page hit, shared counters", latencies(
+            lambda i: list_cache.get_or_load(("list", "keyset", None, 100, None), None), args.lookups
+        ))
+        report("bump one user", latencies(lambda i: table.bump([f"u{i}"]), args.writes))
+        table.close()
+
+    with temp_database() as Session:
+        with Session() as db:
+            repo = DatabaseUserRepository(db)
+            repo.add_users(make_people(1000))
+            report("update_user with bump", latencies(lambda i: repo.update_user(f"bench{i % 1000}", name=f"N{i}"), args.writes))
+            bump = generations.bump
+            generations.bump = lambda path, uids: None
+            try:
+                report("update_user without bump", latencies(lambda i: repo.update_user(f"bench{i % 1000}", name=f"M{i}"), args.writes))
+            finally:
+                generations.bump = bump
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Polling the user listing vs reading the change log, and SSE fan-out.
+
+Seeds ``--users`` users, then compares what one dashboard poll costs when
+nothing changed: the first ``GET /users`` page (read from the database) and
+an incremental ``changes.since(cursor)`` read. It then subscribes
+``--clients`` streams to one ``ChangeFeed``, commits ``--writes`` updates
+from another thread and reports the write-to-delivery latency and how
+many log queries the feed needed for all clients together.
+
+Usage: python -m benchmarks.bench_change_feed [--users N] [--clients N] [--writes N]
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+from typing import Dict, List
+
+from app.db.changes import ChangeLogRepository
+from app.db.generations import generation_table
+from app.db.repository import DatabaseUserRepository
+from app.services.change_feed import ChangeFeed
+from benchmarks.common import Timer, make_people, percentile, temp_database
+
+
+def poll_costs(Session, polls: int) -> None:
+    with Session() as db:
+        repo = DatabaseUserRepository(db)
+        changes = ChangeLogRepository(db)
+        cursor = changes.latest_seq()
+        for name, fn in (
+            ("GET /users page (100 rows)", lambda: repo.list_user_rows_keyset(limit=100)),
+            ("changes.since(cursor), no news", lambda: changes.since(cursor)),
+        ):
+            samples = []
+            for _ in range(polls):
+                with Timer() as t:
+                    fn()
+                samples.append(t.elapsed)
+            print(f"  {name:<34} p50 {percentile(samples, 50) * 1e3:>7.3f} ms   p99 {percentile(samples, 99) * 1e3:>7.3f} ms")
+
+
+async def fan_out(Session, clients: int, writes: int) -> None:
+    feed = ChangeFeed(Session, generation_table(str(Session.kw["bind"].url)), poll_interval=0.01)
+    with Session() as db:
+        start = ChangeLogRepository(db).latest_seq()
+    written: Dict[str, float] = {}
+    latencies: List[float] = []
+
+    async def client():
+        events = feed.events(since=start)
+        received = 0
+        async for rows in events:
+            now = time.perf_counter()
+            for row in rows:
+                latencies.append(now - written[row.uid])
+            received += len(rows)
+            if received >= writes:
+                break
+        await events.aclose()
+
+    def writer():
+        with Session() as db:
+            repo = DatabaseUserRepository(db)
+            for i in range(writes):
+                written[f"bench{i}"] = time.perf_counter()
+                repo.update_user(f"bench{i}", name=f"Renamed {i}")
+                time.sleep(0.005)
+
+    tasks = [asyncio.create_task(client()) for _ in range(clients)]
+    while feed.stats()["subscribers"] < clients:
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(0.5)  # let every stream finish its replay read
+    reads_before = feed.reads
+    thread = threading.Thread(target=writer)
+    thread.start()
+    await asyncio.gather(*tasks)
+    thread.join()
+    print(
+        f"  {clients} clients x {writes} changes: delivery p50 {percentile(latencies, 50) * 1e3:.1f} ms,"
+        f" p99 {percentile(latencies, 99) * 1e3:.1f} ms, {feed.reads - reads_before} log reads in total"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--writes", type=int, default=100)
+    parser.add_argument("--polls", type=int, default=2000)
+    args = parser.parse_args()
+
+    with temp_database() as Session:
+        with Session() as db:
+            repo = DatabaseUserRepository(db)
+            for start in range(0, args.users, 50_000):
+                repo.add_users(make_people(min(50_000, args.users - start), start=start), batch_size=10_000)
+        print(f"users={args.users}")
+        poll_costs(Session, args.polls)
+        asyncio.run(fan_out(Session, args.clients, args.writes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""In-process endpoint and repository benchmark with baseline regression check.
+
+Seeds a database with ``--users`` users (e.g. 10000, 100000, 1000000), stubs
+out ``AuthService`` so no Firebase calls are made, then drives every route in
+``app.main`` through the ASGI app in-process and every hot repository method
+directly, so HTTP/serialization cost can be told apart from database cost.
+
+Results (ops/sec and p50/p95/p99 latency per case) can be saved as a baseline
+and compared on later runs; the process exits with status 1 when any case's
+p50 latency regresses by more than ``--threshold``.
+
+Usage:
+    python -m benchmarks.bench_endpoints --users 10000 --save-baseline
+    python -m benchmarks.bench_endpoints --users 10000 --threshold 0.25
+    python -m benchmarks.bench_endpoints --users 1000000 --database /tmp/1m.db
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Requests per case; exports stream whole tables, so they get fewer runs
+EXPORT_ITERATIONS = 3
+
+
+class StubAuthService:
+    """Stands in for ``AuthService``: accepts any non-empty token."""
+
+    def verify_id_token(self, id_token: str) -> dict:
+        if not id_token:
+            raise ValueError("id_token must be provided")
+        return {"uid": id_token, "sub": id_token, "aud": "bench", "exp": int(time.time()) + 3600}
+
+
+def seed(session_factory, users: int) -> None:
+    """Insert ``users`` synthetic users unless the database already has them."""
+    from app.db.repository import DatabaseUserRepository
+    from app.db.stats import RoleStatsRepository
+    from benchmarks.common import make_people
+
+    with session_factory() as db:
+        existing = sum(RoleStatsRepository(db).counts().values())
+        if existing >= users:
+            return
+        repo = DatabaseUserRepository(db)
+        chunk = 50000
+        for start in range(existing, users, chunk):
+            repo.add_users(make_people(min(chunk, users - start), prefix="seed", start=start), batch_size=10000)
+        print(f"seeded {users} users", file=sys.stderr)
+
+
+def measure(fn: Callable[[int], object], iterations: int) -> Dict[str, float]:
+    """Call ``fn(i)`` ``iterations`` times and summarize latency."""
+    from benchmarks.common import percentile
+
+    samples: List[float] = []
+    errors = 0
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        result = fn(i)
+        samples.append(time.perf_counter() - t0)
+        if getattr(result, "status_code", 200) >= 500:
+            errors += 1
+    elapsed = time.perf_counter() - started
+    return {
+        "ops": iterations / elapsed,
+        "p50": percentile(samples, 50) * 1000,
+        "p95": percentile(samples, 95) * 1000,
+        "p99": percentile(samples, 99) * 1000,
+        "errors": errors,  # 5xx responses
+    }
+
+
+def http_cases(client, users: int, rng: random.Random) -> List[Tuple[str, str, str, Callable, int]]:
+    """(name, method, route, call, iterations) for every endpoint scenario."""
+    seeded = lambda: f"seed{rng.randrange(users)}"  # noqa: E731
+    deep_cursor = client.get("/users", params={"limit": 1, "skip": max(users - 20, 0)}).headers.get("x-next-cursor")
+    first_page = client.get("/users", params={"limit": 100})
+    cursor = first_page.headers.get("x-next-cursor")
+    run_id = datetime.utcnow().strftime("%H%M%S%f")
+
+    def new_user(i):
+        uid = f"new{i}-{run_id}"
+        return client.post("/users", json={"uid": uid, "name": "New User", "email": f"{uid}@example.com", "role": "victim"})
+
+    def bulk(i):
+        rows = [
+            {"uid": f"bulk{i}-{j}-{run_id}", "name": "Bulk", "email": f"bulk{i}-{j}-{run_id}@example.com"}
+            for j in range(100)
+        ]
+        return client.post("/users/bulk", json=rows)
+
+    etags = {}
+
+    def not_modified(url, **params):
+        # fetch the ETag on first use, after the write cases before it have run
+        if url not in etags:
+            etags[url] = client.get(url, params=params).headers.get("etag")
+        return client.get(url, params=params, headers={"If-None-Match": etags[url]})
+
+    def delete_user(i):
+        return client.delete(f"/users/new{i}-{run_id}")
+
+    def lookup(i):
+        # a dashboard resolving the people behind 50 requests, two of them unknown
+        uids = [seeded() for _ in range(48)] + [f"missing{i}", f"missing{i + 1}"]
+        return client.post("/users/lookup", json={"uids": uids})
+
+    return [
+        ("verify_token", "POST", "/verify-token", lambda i: client.post("/verify-token", json={"id_token": f"t{i}"}), None),
+        ("create_user", "POST", "/users", new_user, None),
+        ("bulk_create_100", "POST", "/users/bulk", bulk, 20),
+        ("get_user", "GET", "/users/{uid}", lambda i: client.get(f"/users/{seeded()}"), None),
+        ("get_user_not_modified", "GET", "/users/{uid}", lambda i: not_modified("/users/seed0"), None),
+        ("get_user_missing", "GET", "/users/{uid}", lambda i: client.get(f"/users/missing{i}"), None),
+        ("lookup_50", "POST", "/users/lookup", lookup, None),
+        ("get_user_x50", "GET", "/users/{uid}", lambda i: [client.get(f"/users/{seeded()}") for _ in range(50)][-1], 20),
+        ("list_first_page", "GET", "/users", lambda i: client.get("/users", params={"limit": 100}), None),
+        ("list_first_page_not_modified", "GET", "/users", lambda i: not_modified("/users", limit=100), None),
+        ("list_next_page", "GET", "/users", lambda i: client.get("/users", params={"limit": 100, "cursor": cursor}), None),
+        ("list_deep_page", "GET", "/users", lambda i: client.get("/users", params={"limit": 20, "cursor": deep_cursor}), None),
+        ("list_by_role", "GET", "/users", lambda i: client.get("/users", params={"role": "vendor", "limit": 100}), None),
+        ("search_prefix", "GET", "/users/search", lambda i: client.get("/users/search", params={"q": f"seed{i % 100}"}), None),
+        ("search_role", "GET", "/users/search", lambda i: client.get(
+            "/users/search", params={"q": "user 1", "role": "vendor"}
+        ), None),
+        ("update_user", "PUT", "/users/{uid}", lambda i: client.put(
+            f"/users/seed{i % users}", json={"uid": f"seed{i % users}", "name": f"Renamed {i}", "email": f"seed{i % users}@example.com"}
+        ), None),
+        ("delete_user", "DELETE", "/users/{uid}", delete_user, None),
+        ("export_ndjson_role", "GET", "/users/export", lambda i: client.get("/users/export", params={"role": "victim"}), EXPORT_ITERATIONS),
+        ("export_csv_incremental", "GET", "/users/export", lambda i: client.get(
+            "/users/export", params={"format": "csv", "updated_since": "2999-01-01T00:00:00"}
+        ), None),
+        ("stats_users", "GET", "/stats/users", lambda i: client.get("/stats/users"), None),
+        ("stats_cache", "GET", "/stats/cache", lambda i: client.get("/stats/cache"), None),
+        ("metrics", "GET", "/metrics", lambda i: client.get("/metrics"), None),
+    ]
+
+
+def repository_cases(session_factory, users: int, rng: random.Random):
+    """Return an open session and (name, call, iterations) for the repository methods behind the routes."""
+    from app.db.repository import DatabaseUserRepository
+    from app.db.stats import RoleStatsRepository
+    from app.models.person import Donor
+
+    db = session_factory()
+    repo = DatabaseUserRepository(db)
+    deep = repo.list_users_paginated(skip=max(users - 20, 0), limit=1)
+    after = (deep[0].created_at, deep[0].uid) if deep else None
+    run_id = datetime.utcnow().strftime("%H%M%S%f")
+
+    def first_chunk(i):
+        chunks = repo.iter_user_chunks(chunk_size=1000)
+        try:
+            return next(chunks, None)
+        finally:
+            chunks.close()
+
+    def fresh(fn):
+        def call(i):
+            try:
+                return fn(i)
+            finally:
+                db.expunge_all()
+        return call
+
+    return db, [
+        ("repo.get_user", fresh(lambda i: repo.get_user(f"seed{rng.randrange(users)}")), None),
+        ("repo.get_users_many_50", fresh(lambda i: repo.get_users_many([f"seed{rng.randrange(users)}" for _ in range(50)])), None),
+        ("repo.list_users_keyset", fresh(lambda i: repo.list_users_keyset(limit=100)), None),
+        ("repo.list_users_keyset_deep", fresh(lambda i: repo.list_users_keyset(limit=20, after=after)), None),
+        ("repo.list_users_keyset_role", fresh(lambda i: repo.list_users_keyset(limit=100, role="vendor")), None),
+        ("repo.list_users_paginated_deep", fresh(lambda i: repo.list_users_paginated(skip=max(users - 20, 0), limit=20)), None),
+        ("repo.add_user", fresh(lambda i: repo.add_user(Donor(f"repo{i}-{run_id}", "Repo", f"repo{i}-{run_id}@example.com"))), None),
+        ("repo.update_user", fresh(lambda i: repo.update_user(f"seed{i % users}", name=f"Repo {i}")), None),
+        ("repo.delete_user", fresh(lambda i: repo.delete_user(f"repo{i}-{run_id}")), None),
+        ("repo.role_counts", fresh(lambda i: RoleStatsRepository(db).counts()), None),
+        ("repo.iter_user_chunks_first", fresh(first_chunk), None),
+    ]
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Return a description of every case whose p50 regressed past ``threshold``."""
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if not before or before["p50"] <= 0:
+            continue
+        change = current["p50"] / before["p50"] - 1
+        if change > threshold:
+            regressions.append(f"{name}: p50 {before['p50']:.3f} -> {current['p50']:.3f} ms (+{change:.0%})")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--database", help="reuse (and seed if needed) this SQLite file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed p50 slowdown, e.g. 0.2 = 20%%")
+    parser.add_argument("--only", choices=("http", "repo"), help="run only one group of cases")
+    args = parser.parse_args()
+
+    tmp = None
+    if not args.database:
+        tmp = tempfile.TemporaryDirectory()
+        args.database = os.path.join(tmp.name, "bench.db")
+    # must be set before the app modules create their engines
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.database}"
+
+    from fastapi.testclient import TestClient
+
+    import app.main as main_module
+    from app.db.config import SessionLocal, engine
+    from app.db.schema import ensure_schema
+
+    main_module.auth_service = StubAuthService()
+    ensure_schema(engine)
+    seed(SessionLocal, args.users)
+    rng = random.Random(1234)
+    results: Dict[str, dict] = {}
+
+    if args.only in (None, "http"):
+        with TestClient(main_module.app) as client:
+            cases = http_cases(client, args.users, rng)
+            routes = {(m.upper(), path) for path, ops in main_module.app.openapi()["paths"].items() for m in ops}
+            uncovered = sorted(routes - {(method, route) for _, method, route, _, _ in cases})
+            for name, _, _, call, iterations in cases:
+                results[f"http.{name}"] = measure(call, iterations or args.iterations)
+        if uncovered:
+            print("routes without a benchmark case: " + ", ".join(f"{m} {p}" for m, p in uncovered), file=sys.stderr)
+
+    if args.only in (None, "repo"):
+        db, cases = repository_cases(SessionLocal, args.users, rng)
+        for name, call, iterations in cases:
+            results[name] = measure(call, iterations or args.iterations)
+        db.close()
+
+    print(f"users={args.users} iterations={args.iterations}")
+    print(f"  {'case':<34} {'ops/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name, r in results.items():
+        print(f"  {name:<34} {r['ops']:>9.0f} {r['p50']:>9.3f} {r['p95']:>9.3f} {r['p99']:>9.3f} {r['errors']:>7}")
+
+    key = str(args.users)
+    stored = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+    status = 0
+    if args.save_baseline:
+        stored[key] = results
+        with open(args.baseline, "w") as f:
+            json.dump(stored, f, indent=2, sort_keys=True)
+        print(f"baseline for users={key} saved to {args.baseline}")
+    elif key in stored:
+        regressions = compare(results, stored[key], args.threshold)
+        for line in regressions:
+            print("REGRESSION " + line)
+        status = 1 if regressions else 0
+        if not regressions:
+            print(f"no regressions beyond {args.threshold:.0%} against {args.baseline}")
+    else:
+        print(f"no baseline for users={key}; run with --save-baseline to record one")
+
+    if tmp:
+        tmp.cleanup()
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
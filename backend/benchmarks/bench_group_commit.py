@@ -0,0 +1,82 @@
+"""Throughput vs latency of group commit for concurrent single-row writes.
+
+Each writer thread inserts users one request at a time, either committing
+directly (one transaction per write) or through a ``WriteCoalescer`` with
+different window sizes.
+
+Group commit pays off most when every commit is an fsync (``--synchronous
+FULL``); under WAL with ``synchronous=NORMAL`` commits are already cheap.
+
+Usage: python -m benchmarks.bench_group_commit [--threads N] [--writes N] [--synchronous FULL|NORMAL]
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+from dataclasses import replace
+
+from app.db.config import PROFILES, Base, create_engines, make_sessionmaker
+from app.db.repository import DatabaseUserRepository
+from app.db.write_coalescer import WriteCoalescer
+from benchmarks.common import Timer, make_people, percentile
+
+
+def run(label: str, args, max_wait_ms=None) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        profile = replace(PROFILES["production"], synchronous=args.synchronous)
+        writer, reader = create_engines(f"sqlite:///{os.path.join(tmp, 'group.db')}", profile)
+        Base.metadata.create_all(bind=writer)
+        Session = make_sessionmaker(writer, reader)
+        coalescer = None
+        if max_wait_ms is not None:
+            coalescer = WriteCoalescer(Session, max_batch=args.max_batch, max_wait=max_wait_ms / 1000)
+
+        people = make_people(args.threads * args.writes)
+        latencies = []
+
+        def worker(chunk):
+            for person in chunk:
+                with Timer() as t:
+                    if coalescer:
+                        coalescer.submit(lambda repo, p=person: repo.add_user(p))
+                    else:
+                        with Session() as db:
+                            DatabaseUserRepository(db).add_user(person)
+                latencies.append(t.elapsed)
+
+        threads = [
+            threading.Thread(target=worker, args=(people[i * args.writes:(i + 1) * args.writes],))
+            for i in range(args.threads)
+        ]
+        with Timer() as total:
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        batch = f" avg_batch={coalescer.stats()['avg_batch']:.1f}" if coalescer else ""
+        if coalescer:
+            coalescer.close()
+        writer.dispose()
+        reader.dispose()
+    print(
+        f"  {label:<22} {len(latencies) / total.elapsed:>8.0f} writes/s"
+        f"  p50={percentile(latencies, 50) * 1000:>6.2f} ms  p99={percentile(latencies, 99) * 1000:>7.2f} ms{batch}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--writes", type=int, default=50)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--synchronous", default="FULL")
+    args = parser.parse_args()
+    print(f"threads={args.threads} writes/thread={args.writes} max_batch={args.max_batch} synchronous={args.synchronous}")
+    run("direct commit", args)
+    for wait_ms in (0, 2, 10):
+        run(f"group commit {wait_ms} ms", args, max_wait_ms=wait_ms)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Memory per user and lookup latency of the in-memory hot tier vs SQLite.
+
+Builds a ``UserRepository`` of ``--users`` users (one million by default),
+reports the bytes allocated per user and p50/p99 latency of uid and email
+lookups and of keyset pages. With ``--sqlite`` the same users are written to
+a temporary database, loaded into the store from it, and the equivalent
+``DatabaseUserRepository`` reads are measured alongside.
+
+Usage: python -m benchmarks.bench_hot_tier [--users N] [--lookups N] [--sqlite]
+"""
+
+import argparse
+import gc
+import random
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from app.db.hot_repository import load_hot_store
+from app.db.repository import DatabaseUserRepository
+from app.models.user_repo import UserRepository
+from benchmarks.common import Timer, make_people, percentile, temp_database
+
+ROLES = ("donor", "vendor", "victim")
+
+
+def synthetic_rows(count: int):
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        at = start + timedelta(microseconds=i)
+        yield (f"bench{i}", f"User {i}", f"bench{i}@example.com", ROLES[i % 3], at, at)
+
+
+def latencies(fn: Callable[[int], object], count: int) -> List[float]:
+    samples = []
+    for i in range(count):
+        with Timer() as t:
+            fn(i)
+        samples.append(t.elapsed)
+    return samples
+
+
+def report(name: str, samples: List[float]) -> None:
+    print(f"  {name:<30} p50 {percentile(samples, 50) * 1e6:>8.1f} us   p99 {percentile(samples, 99) * 1e6:>8.1f} us")
+
+
+def cases(repo, users: int, lookups: int, rng: random.Random):
+    probes = [rng.randrange(users) for _ in range(lookups)]
+    cursors = []
+    for i in probes[:200]:
+        user = repo.get_user(f"bench{i}")
+        cursors.append((user.created_at, user.uid))
+    get_by_email = repo.get_user_by_email
+    return [
+        ("get_user", lambda i: repo.get_user(f"bench{probes[i]}"), lookups),
+        ("get_user_by_email", lambda i: get_by_email(f"bench{probes[i]}@example.com"), lookups),
+        ("keyset page (100)", lambda i: repo.list_users_keyset(limit=100, after=cursors[i % len(cursors)]), 1000),
+        ("keyset role page (100)", lambda i: repo.list_users_keyset(limit=100, role="vendor", after=cursors[i % len(cursors)]), 1000),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--sqlite", action="store_true", help="also load from and compare against SQLite")
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    gc.collect()
+    tracemalloc.start()
+    store = UserRepository()
+    with Timer() as t:
+        store.load(synthetic_rows(args.users))
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"users={args.users}")
+    print(f"  memory: {allocated / args.users:.0f} bytes/user ({allocated / 2**20:.0f} MiB), built in {t.elapsed:.1f}s")
+    for name, fn, count in cases(store, args.users, args.lookups, rng):
+        report(f"memory {name}", latencies(fn, count))
+
+    if not args.sqlite:
+        return
+    with temp_database() as Session:
+        with Timer() as t:
+            with Session() as db:
+                repo = DatabaseUserRepository(db)
+                chunk = 100_000
+                for start in range(0, args.users, chunk):
+                    repo.add_users(make_people(min(chunk, args.users - start), start=start), batch_size=10_000)
+        print(f"  seeded sqlite in {t.elapsed:.1f}s")
+        with Timer() as t:
+            load_hot_store(Session, UserRepository())
+        print(f"  load_hot_store from sqlite: {t.elapsed:.1f}s")
+        with Session() as db:
+            for name, fn, count in cases(DatabaseUserRepository(db), args.users, min(args.lookups, 10_000), rng):
+                report(f"sqlite {name}", latencies(lambda i: (fn(i), db.expunge_all()), count))
+
+
+if __name__ == "__main__":
+    main()
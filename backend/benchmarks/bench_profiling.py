@@ -0,0 +1,108 @@
+"""Per-request cost of request profiling, off, idle, sampled and always on.
+
+Every mode runs in a fresh interpreter, since ``PROFILING`` decides at import
+whether the middleware and route class are installed. Each one serves
+``--requests`` in-process GET /users/{uid} and PUT /users/{uid} (one in
+ten) against the same database of ``--users`` users and reports mean,
+p50 and p99 latency:
+
+- off: ``PROFILING=0``, the default
+- idle: ``PROFILING=1`` with an ``ADMIN_TOKEN`` but nothing sampled or flagged
+- sampled: ``PROFILE_SAMPLE_RATE=0.01``
+- every request: ``PROFILE_SAMPLE_RATE=1``
+
+The last mode also prints the top functions by self time for GET
+/users/{uid}, as ``/admin/profiles/summary`` reports them.
+
+Usage: python -m benchmarks.bench_profiling [--requests N] [--users N]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import make_people
+
+CHILD = """
+import json, random, sys, time
+from fastapi.testclient import TestClient
+import app.main
+from app.profiling import profiler
+from benchmarks.common import percentile
+
+requests, users = int(sys.argv[1]), int(sys.argv[2])
+rng = random.Random(1)
+latencies = []
+with TestClient(app.main.app) as client:
+    for i in range(requests):
+        uid = f"bench{rng.randrange(users)}"
+        start = time.perf_counter()
+        if i % 10 == 9:
+            r = client.put(f"/users/{uid}", json={"uid": uid, "name": f"User {i}", "email": f"{uid}@example.com"})
+        else:
+            r = client.get(f"/users/{uid}")
+        latencies.append(time.perf_counter() - start)
+        assert r.status_code == 200, r.status_code
+routes = {(r["method"], r["route"]): r for r in profiler.summary(5)["routes"]}
+print(json.dumps({
+    "mean": sum(latencies) / len(latencies),
+    "p50": percentile(latencies, 50),
+    "p99": percentile(latencies, 99),
+    "captured": profiler.captured,
+    "top": routes.get(("GET", "/users/{uid}"), {}).get("top", []),
+}))
+"""
+
+MODES = (
+    ("off", {"PROFILING": "0"}),
+    ("idle", {"PROFILING": "1", "ADMIN_TOKEN": "bench"}),
+    ("sampled 1%", {"PROFILING": "1", "ADMIN_TOKEN": "bench", "PROFILE_SAMPLE_RATE": "0.01"}),
+    ("every request", {"PROFILING": "1", "ADMIN_TOKEN": "bench", "PROFILE_SAMPLE_RATE": "1"}),
+)
+
+
+def run_child(url: str, profiles: str, mode_env: dict, args) -> dict:
+    env = {**os.environ, "DATABASE_URL": url, "PROFILE_DIR": profiles, "ADMISSION_CONTROL": "0", **mode_env}
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD, str(args.requests), str(args.users)],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--users", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'profiling.db')}"
+        from app.db.config import PROFILES, create_engines, make_sessionmaker
+        from app.db.repository import DatabaseUserRepository
+        from app.db.schema import ensure_schema
+
+        writer, reader = create_engines(url, PROFILES["production"])
+        ensure_schema(writer)
+        with make_sessionmaker(writer, reader)() as db:
+            DatabaseUserRepository(db).add_users(make_people(args.users), batch_size=10_000)
+        writer.dispose()
+        reader.dispose()
+
+        print(f"{args.requests} requests (90% GET, 10% PUT /users/{{uid}}), {args.users} users")
+        for label, mode_env in MODES:
+            result = run_child(url, os.path.join(tmp, "profiles"), mode_env, args)
+            print(
+                f"  {label:<14} mean {result['mean'] * 1e3:>6.2f} ms  p50 {result['p50'] * 1e3:>6.2f} ms"
+                f"  p99 {result['p99'] * 1e3:>6.2f} ms  profiles {result['captured']}"
+            )
+        print("  GET /users/{uid} hotspots over the profiled requests (self time):")
+        for function in result["top"]:
+            print(f"    {function['self_seconds']:>8.3f} s  {function['calls']:>7} calls  {function['function']}")
+
+
+if __name__ == "__main__":
+    main()
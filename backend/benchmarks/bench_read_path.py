@@ -0,0 +1,77 @@
+"""Compare the ORM and lean read paths on large list pages.
+
+ORM path: load ``PersonModel`` instances, build dicts, then validate and
+serialize them against ``List[UserOut]`` as FastAPI does for the route.
+Lean path: select the columns as rows and encode them straight to JSON.
+Reports CPU time and peak allocated memory per row for each page size.
+
+Usage: python -m benchmarks.bench_read_path [--users N] [--limits 100,1000] [--repeat N]
+"""
+
+import argparse
+import tracemalloc
+from typing import Callable, List
+
+from pydantic import TypeAdapter
+
+from app.db.repository import DatabaseUserRepository
+from app.encoding import encode_users
+from app.schemas import UserOut
+from benchmarks.common import Timer, make_people, temp_database
+
+USERS_OUT = TypeAdapter(List[UserOut])
+
+
+def orm_page(repo: DatabaseUserRepository, limit: int) -> bytes:
+    users = repo.list_users_keyset(limit=limit)
+    body = [{"uid": u.uid, "name": u.name, "email": u.email, "role": u.role} for u in users]
+    return USERS_OUT.dump_json(USERS_OUT.validate_python(body))
+
+
+def lean_page(repo: DatabaseUserRepository, limit: int) -> bytes:
+    return encode_users(repo.list_user_rows_keyset(limit=limit))
+
+
+def measure(db, page: Callable, limit: int, repeat: int):
+    """Return (microseconds per row, peak KiB allocated per page)."""
+    repo = DatabaseUserRepository(db)
+    page(repo, limit)  # warm up statement caches
+    db.expunge_all()
+    with Timer() as t:
+        for _ in range(repeat):
+            page(repo, limit)
+            db.expunge_all()
+    tracemalloc.start()
+    page(repo, limit)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.expunge_all()
+    return t.elapsed / repeat / limit * 1e6, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--limits", default="100,1000")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with temp_database() as Session:
+        with Session() as db:
+            DatabaseUserRepository(db).add_users(make_people(args.users), batch_size=5000)
+        with Session() as db:
+            assert orm_page(DatabaseUserRepository(db), 50) == lean_page(DatabaseUserRepository(db), 50)
+            print(f"users={args.users} repeat={args.repeat}")
+            for limit in (int(x) for x in args.limits.split(",")):
+                orm_us, orm_kib = measure(db, orm_page, limit, args.repeat)
+                lean_us, lean_kib = measure(db, lean_page, limit, args.repeat)
+                print(f"  limit={limit}")
+                print(f"    orm : {orm_us:>8.2f} us/row  {orm_kib:>9.1f} KiB peak/page")
+                print(
+                    f"    lean: {lean_us:>8.2f} us/row  {lean_kib:>9.1f} KiB peak/page"
+                    f"  ({orm_us / lean_us:.1f}x faster, {orm_kib / lean_kib:.1f}x less memory)"
+                )
+
+
+if __name__ == "__main__":
+    main()
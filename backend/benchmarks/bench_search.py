@@ -0,0 +1,81 @@
+"""Latency of FTS5 user search against the ``LIKE '%q%'`` scan it replaces.
+
+Seeds ``--users`` users (one million by default) with varied first and last
+names, then reports p50/p99 latency of ``UserSearchRepository.search`` and
+``search_like`` for a selective name prefix, a two-word name, an email
+prefix, a role-filtered query and a broad prefix matching most users. The
+seeding rate is reported too, since every insert also updates the index.
+
+Usage: python -m benchmarks.bench_search [--users N] [--queries N]
+"""
+
+import argparse
+import random
+from typing import Callable, List
+
+from app.db.repository import DatabaseUserRepository
+from app.db.search import UserSearchRepository
+from benchmarks.common import ROLE_CLASSES, Timer, percentile, temp_database
+
+FIRST = ("Alice", "Bilal", "Carmen", "Dmitri", "Esther", "Farah", "Goran", "Hana", "Ines", "Jamal",
+         "Kenji", "Leila", "Mateo", "Nadia", "Omar", "Priya", "Quentin", "Rosa", "Sami", "Tariq")
+LAST = ("Adeyemi", "Baptiste", "Chen", "Duarte", "Eriksen", "Fofana", "Garcia", "Haddad", "Ivanova",
+        "Jensen", "Kowalski", "Lindqvist", "Moreau", "Nakamura", "Okafor", "Petrov", "Quispe", "Rahman",
+        "Silva", "Tanaka")
+
+
+def seed(Session, users: int, chunk: int = 100_000) -> float:
+    rng = random.Random(7)
+    with Timer() as t:
+        with Session() as db:
+            repo = DatabaseUserRepository(db)
+            for start in range(0, users, chunk):
+                people = []
+                for i in range(start, min(start + chunk, users)):
+                    first, last = rng.choice(FIRST), rng.choice(LAST)
+                    people.append(ROLE_CLASSES[i % 3](
+                        uid=f"u{i}", name=f"{first} {last}{i % 997}", email=f"{first.lower()}.{i}@example.com"
+                    ))
+                repo.add_users(people, batch_size=10_000)
+    return t.elapsed
+
+
+def latencies(fn: Callable[[], object], count: int) -> List[float]:
+    samples = []
+    for _ in range(count):
+        with Timer() as t:
+            fn()
+        samples.append(t.elapsed)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=20, help="repetitions per query and method")
+    args = parser.parse_args()
+
+    queries = [
+        ("name prefix", "Kowalski12", None),
+        ("two words", "esther nakam", None),
+        ("email prefix", "quentin.4242", None),
+        ("role filter", "rosa chen", "vendor"),
+        ("broad prefix", "a", None),
+    ]
+    with temp_database() as Session:
+        elapsed = seed(Session, args.users)
+        print(f"users={args.users}  seeded in {elapsed:.1f}s ({args.users / elapsed:,.0f} users/s with the FTS triggers)")
+        with Session() as db:
+            search = UserSearchRepository(db)
+            for label, q, role in queries:
+                hits = len(search.search(q, role=role, limit=20))
+                for method in (search.search, search.search_like):
+                    samples = latencies(lambda: method(q, role=role, limit=20), args.queries)
+                    print(
+                        f"  {label:<14} {method.__name__:<12} hits {hits:>3}"
+                        f"   p50 {percentile(samples, 50) * 1e3:>8.2f} ms   p99 {percentile(samples, 99) * 1e3:>8.2f} ms"
+                    )
+
+
+if __name__ == "__main__":
+    main()
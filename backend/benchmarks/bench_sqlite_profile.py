@@ -0,0 +1,85 @@
+"""Mixed read/write concurrency benchmark for the SQLite connection profiles.
+
+Runs reader threads (``get_user`` / ``list_users_keyset``) and writer threads
+(``update_user``) against the same database for a fixed time, once per
+profile in ``app.db.config.PROFILES``, and reports ops/sec, p99 latency and
+errors (e.g. "database is locked") for each side.
+
+Usage: python -m benchmarks.bench_sqlite_profile [--seconds S] [--readers N] [--writers N]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from app.db.config import PROFILES, Base, create_engines, make_sessionmaker
+from app.db.repository import DatabaseUserRepository
+from benchmarks.common import make_people, percentile
+
+
+def run_profile(name: str, args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        writer, reader = create_engines(f"sqlite:///{os.path.join(tmp, 'profile.db')}", PROFILES[name])
+        Base.metadata.create_all(bind=writer)
+        Session = make_sessionmaker(writer, reader)
+        with Session() as db:
+            DatabaseUserRepository(db).add_users(make_people(args.users))
+
+        stop = time.monotonic() + args.seconds
+        samples = {"read": [], "write": []}
+        errors = {"read": 0, "write": 0}
+
+        def worker(kind: str, seed: int):
+            rng = random.Random(seed)
+            while time.monotonic() < stop:
+                uid = f"bench{rng.randrange(args.users)}"
+                start = time.perf_counter()
+                try:
+                    with Session() as db:
+                        repo = DatabaseUserRepository(db)
+                        if kind == "write":
+                            repo.update_user(uid, name=f"Renamed {rng.random()}")
+                        elif rng.random() < 0.8:
+                            repo.get_user(uid)
+                        else:
+                            repo.list_users_keyset(limit=20)
+                except Exception:
+                    errors[kind] += 1
+                    continue
+                samples[kind].append(time.perf_counter() - start)
+
+        threads = [threading.Thread(target=worker, args=("read", i)) for i in range(args.readers)]
+        threads += [threading.Thread(target=worker, args=("write", 1000 + i)) for i in range(args.writers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        writer.dispose()
+        reader.dispose()
+
+    for kind in ("read", "write"):
+        lat = samples[kind]
+        print(
+            f"  {name:<10} {kind:<5} {len(lat) / args.seconds:>8.0f} ops/s"
+            f"  p50={percentile(lat, 50) * 1000:>6.2f} ms  p99={percentile(lat, 99) * 1000:>7.2f} ms"
+            f"  errors={errors[kind]}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--users", type=int, default=10000)
+    args = parser.parse_args()
+    print(f"seconds={args.seconds} readers={args.readers} writers={args.writers} users={args.users}")
+    for name in PROFILES:
+        run_profile(name, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Cold start: import time, startup time and time to first request.
+
+Every run starts a fresh interpreter (as a new uvicorn worker would) that
+imports ``app.main``, runs the lifespan startup and serves one
+``GET /users?limit=1``. Runs are made against a database that does not
+exist yet and against one of ``--users`` users whose schema is current, and
+the median of ``--runs`` runs is reported per phase. The in-process cost of
+the versioned schema check is compared with the unconditional setup it
+replaced (``create_all``, search index and role counter checks).
+
+Usage: python -m benchmarks.bench_startup [--runs N] [--users N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import Timer, make_people
+
+CHILD = """
+import json, time
+t0 = time.perf_counter()
+from fastapi.testclient import TestClient
+t1 = time.perf_counter()
+import app.main
+t2 = time.perf_counter()
+with TestClient(app.main.app) as client:
+    t3 = time.perf_counter()
+    status = client.get("/users", params={"limit": 1}).status_code
+    t4 = time.perf_counter()
+assert status == 200, status
+print(json.dumps({"import": t2 - t1, "startup": t3 - t2, "first_request": t4 - t3, "ready": t4 - t1}))
+"""
+
+PHASES = ("import", "startup", "first_request", "ready")
+
+
+def run_child(url: str) -> dict:
+    env = {**os.environ, "DATABASE_URL": url}
+    with Timer() as t:
+        out = subprocess.run(
+            [sys.executable, "-c", CHILD], env=env, check=True, capture_output=True, text=True
+        ).stdout
+    return {**json.loads(out.strip().splitlines()[-1]), "process": t.elapsed}
+
+
+def report(label: str, runs) -> None:
+    cells = "  ".join(f"{p} {statistics.median([r[p] for r in runs]) * 1e3:>7.1f} ms" for p in PHASES + ("process",))
+    print(f"  {label:<16} {cells}")
+
+
+def schema_setup_cost(url: str, repeat: int = 20):
+    from sqlalchemy.orm import Session
+
+    from app.db.config import PROFILES, Base, create_engines
+    from app.db.schema import ensure_schema
+    from app.db.search import ensure_search_index
+    from app.db.stats import RoleStatsRepository
+
+    writer, reader = create_engines(url, PROFILES["production"])
+    try:
+        with Timer() as versioned:
+            for _ in range(repeat):
+                ensure_schema(writer)
+        with Timer() as unversioned:
+            for _ in range(repeat):
+                Base.metadata.create_all(bind=writer)
+                ensure_search_index(writer)
+                with Session(writer) as db:
+                    RoleStatsRepository(db).ensure_initialized()
+    finally:
+        writer.dispose()
+        reader.dispose()
+    return versioned.elapsed / repeat, unversioned.elapsed / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--users", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fresh = []
+        for i in range(args.runs):
+            fresh.append(run_child(f"sqlite:///{os.path.join(tmp, f'fresh{i}.db')}"))
+
+        url = f"sqlite:///{os.path.join(tmp, 'current.db')}"
+        from app.db.config import PROFILES, create_engines, make_sessionmaker
+        from app.db.repository import DatabaseUserRepository
+        from app.db.schema import ensure_schema
+
+        writer, reader = create_engines(url, PROFILES["production"])
+        ensure_schema(writer)
+        with make_sessionmaker(writer, reader)() as db:
+            repo = DatabaseUserRepository(db)
+            for start in range(0, args.users, 50_000):
+                repo.add_users(make_people(min(50_000, args.users - start), start=start), batch_size=10_000)
+        writer.dispose()
+        reader.dispose()
+        current = [run_child(url) for _ in range(args.runs)]
+
+        print(f"median of {args.runs} runs (process = interpreter start to exit)")
+        report("new database", fresh)
+        report(f"{args.users} users", current)
+        versioned, unversioned = schema_setup_cost(url)
+        print(f"  schema check on a current database: {versioned * 1e3:.2f} ms (unconditional setup: {unversioned * 1e3:.2f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Compare cold (full RS256 verification) and warm (cached claims) token checks.
+
+Runs offline against a locally generated key pair.
+Usage: python -m benchmarks.bench_token_verify [--iterations N]
+"""
+
+import argparse
+import time
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.services.auth_service import AuthService
+from app.services.token_cache import StaticKeySource
+from benchmarks.common import Timer
+
+PROJECT_ID = "reliefconnect-bench"
+
+
+def mint_tokens(private_key, count: int):
+    now = int(time.time())
+    return [
+        jwt.encode(
+            {
+                "iss": f"https://securetoken.google.com/{PROJECT_ID}",
+                "aud": PROJECT_ID,
+                "sub": f"user{i}",
+                "iat": now,
+                "auth_time": now,
+                "exp": now + 3600,
+            },
+            private_key,
+            algorithm="RS256",
+            headers={"kid": "bench"},
+        )
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    source = StaticKeySource({"bench": private_key.public_key()})
+    tokens = mint_tokens(private_key, args.iterations)
+
+    cold = AuthService(key_source=source, project_id=PROJECT_ID, cache_size=0)
+    with Timer() as cold_time:
+        for token in tokens:
+            cold.verify_id_token(token)
+
+    warm = AuthService(key_source=source, project_id=PROJECT_ID)
+    warm.verify_id_token(tokens[0])
+    with Timer() as warm_time:
+        for _ in range(args.iterations):
+            warm.verify_id_token(tokens[0])
+
+    cold_us = cold_time.elapsed / args.iterations * 1e6
+    warm_us = warm_time.elapsed / args.iterations * 1e6
+    print(f"iterations={args.iterations} key fetches={source.fetch_count}")
+    print(f"  cold (signature + claims check): {cold_us:>8.1f} us/verify")
+    print(f"  warm (claims cache hit):         {warm_us:>8.1f} us/verify  ({cold_us / warm_us:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
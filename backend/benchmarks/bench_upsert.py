@@ -0,0 +1,128 @@
+"""Statements per write and create-or-update throughput under contention.
+
+First counts the SQL statements each repository write sends (BEGIN aside),
+including ``upsert_user`` against the read-then-write sequence a client had
+to use before ``PUT /users/{uid}`` could create: look the user up, then
+insert or update it, retrying when a concurrent insert wins the race.
+
+Then ``--threads`` writer threads create-or-update users drawn from
+``--keys`` hot uids, once with each approach, reporting writes/s, p50/p99
+latency and lost races.
+
+Usage: python -m benchmarks.bench_upsert [--threads N] [--writes N] [--keys N]
+"""
+
+import argparse
+import random
+import threading
+from collections import Counter
+
+from sqlalchemy import event
+
+from app.db.repository import DatabaseUserRepository, UserConflict
+from app.models.person import Donor
+from benchmarks.common import Timer, percentile, temp_database
+
+
+def read_then_write(repo: DatabaseUserRepository, person, races: Counter) -> None:
+    while True:
+        if repo.get_user_row(person.uid) is None:
+            try:
+                repo.add_user(person)
+                return
+            except UserConflict as e:
+                if e.constraint != "uid":
+                    raise
+                races["lost"] += 1
+                continue
+        repo.update_user(person.uid, name=person.name, email=person.email)
+        return
+
+
+def upsert(repo: DatabaseUserRepository, person, races: Counter) -> None:
+    repo.upsert_user(person)
+
+
+def person(uid: str, name: str):
+    return Donor(uid=uid, name=name, email=f"{uid}@example.com")
+
+
+def count_statements(Session) -> None:
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        if not statement.startswith("BEGIN"):
+            statements.append(statement)
+
+    cases = [
+        ("add_user", lambda repo, i: repo.add_user(person(f"a{i}", "A"))),
+        ("update_user", lambda repo, i: repo.update_user(f"a{i}", name="B")),
+        ("update_user (role change)", lambda repo, i: repo.update_user(f"a{i}", role="vendor")),
+        ("delete_user", lambda repo, i: repo.delete_user(f"a{i}")),
+        ("upsert_user (creates)", lambda repo, i: repo.upsert_user(person(f"u{i}", "A"))),
+        ("upsert_user (updates)", lambda repo, i: repo.upsert_user(person(f"u{i}", "B"))),
+        ("upsert_user (unchanged)", lambda repo, i: repo.upsert_user(person(f"u{i}", "B"))),
+        ("read-then-write (creates)", lambda repo, i: read_then_write(repo, person(f"r{i}", "A"), Counter())),
+        ("read-then-write (updates)", lambda repo, i: read_then_write(repo, person(f"r{i}", "B"), Counter())),
+    ]
+    runs = 100
+    with Session() as db:
+        repo = DatabaseUserRepository(db)
+        engines = {db.get_bind(), db.info.get("reader") or db.get_bind()}
+        for name, fn in cases:
+            statements.clear()
+            for engine in engines:
+                event.listen(engine, "before_cursor_execute", listener)
+            try:
+                for i in range(runs):
+                    fn(repo, i)
+            finally:
+                for engine in engines:
+                    event.remove(engine, "before_cursor_execute", listener)
+            print(f"  {name:<28} {len(statements) / runs:>4.1f} statements per call")
+
+
+def contention(Session, label: str, write, args) -> None:
+    latencies = []
+    races: Counter = Counter()
+
+    def worker(seed: int):
+        rng = random.Random(seed)
+        with Session() as db:
+            repo = DatabaseUserRepository(db)
+            for i in range(args.writes):
+                uid = f"hot{rng.randrange(args.keys)}"
+                with Timer() as t:
+                    write(repo, person(uid, f"Name {seed}-{i}"), races)
+                latencies.append(t.elapsed)
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(args.threads)]
+    with Timer() as total:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    print(
+        f"  {label:<16} {len(latencies) / total.elapsed:>7.0f} writes/s"
+        f"  p50={percentile(latencies, 50) * 1000:>6.2f} ms  p99={percentile(latencies, 99) * 1000:>7.2f} ms"
+        f"  lost races={races['lost']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--writes", type=int, default=300)
+    parser.add_argument("--keys", type=int, default=500)
+    args = parser.parse_args()
+
+    with temp_database() as Session:
+        count_statements(Session)
+    print(f"threads={args.threads} writes/thread={args.writes} keys={args.keys}")
+    for label, write in (("read-then-write", read_then_write), ("upsert", upsert)):
+        with temp_database() as Session:
+            contention(Session, label, write, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Shared helpers for benchmark scripts."""
+
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from sqlalchemy.orm import sessionmaker
+
+from app.db.config import PROFILES, create_engines, make_sessionmaker
+from app.db.schema import ensure_schema
+from app.models.person import Donor, Vendor, Victim, Person
+
+ROLE_CLASSES = (Donor, Vendor, Victim)
+
+
+@contextmanager
+def temp_database(profile: str = "production") -> Iterator[sessionmaker]:
+    """Yield a session factory bound to a fresh on-disk SQLite database."""
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        writer, reader = create_engines(url, PROFILES[profile])
+        ensure_schema(writer)
+        try:
+            yield make_sessionmaker(writer, reader)
+        finally:
+            writer.dispose()
+            reader.dispose()
+
+
+def make_people(count: int, prefix: str = "bench", start: int = 0) -> List[Person]:
+    """Build ``count`` people cycling through the three roles."""
+    return [
+        ROLE_CLASSES[i % 3](uid=f"{prefix}{i}", name=f"User {i}", email=f"{prefix}{i}@example.com")
+        for i in range(start, start + count)
+    ]
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Return the ``pct`` percentile (0-100) of ``samples``."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+class Timer:
+    """Context manager measuring wall-clock seconds."""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
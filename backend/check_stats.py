@@ -0,0 +1,38 @@
+"""Verify (and optionally repair) the role counters against the persons table."""
+
+import argparse
+import sys
+
+from app.db.config import SessionLocal, engine
+from app.db.schema import ensure_schema
+from app.db.stats import RoleStatsRepository
+
+
+def check_stats(repair: bool = False) -> int:
+    """Print counter mismatches; rebuild them when ``repair`` is set.
+
+    Returns a process exit code: 0 when consistent (or repaired), 1 otherwise.
+    """
+    ensure_schema(engine)
+    db = SessionLocal()
+    try:
+        stats = RoleStatsRepository(db)
+        mismatches = stats.check()
+        if not mismatches:
+            print(f"Role counters are consistent: {stats.counter_counts()}")
+            return 0
+        for role, values in sorted(mismatches.items()):
+            print(f"  {role}: counter={values['counter']} actual={values['actual']}")
+        if not repair:
+            print("Role counters are inconsistent. Re-run with --repair to rebuild them.")
+            return 1
+        print(f"Rebuilt role counters: {stats.rebuild()}")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repair", action="store_true", help="rebuild counters from the persons table")
+    sys.exit(check_stats(repair=parser.parse_args().repair))
@@ -1,14 +1,50 @@
-"""Database initialization script with sample data."""
+"""Initialize the database with sample data, or generate synthetic users for scale tests.
 
-from app.db.config import SessionLocal, Base, engine
+With no arguments the schema is created and six sample users are added to
+an empty database. ``--users N`` instead generates N donors, vendors and
+victims (``--roles`` sets the skew) and loads them with bulk Core inserts,
+``--transaction-size`` rows per transaction, printing the load rate. It then
+runs the query plan check: every repository query is explained against the
+loaded table, and the exit status is 1 when a hot query falls back to a full
+scan. ``--check-plans`` runs only the check, against the existing database.
+"""
+
+import argparse
+import itertools
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db.changes import ChangeLogRepository
+from app.db.config import SessionLocal, engine
+from app.db.generations import mark_changed
 from app.db.models import PersonModel
-from app.models.person import Donor, Vendor, Victim
+from app.db.plans import explain_queries
+from app.db.schema import ensure_schema
+from app.db.search import deferred_search_index
+from app.db.stats import RoleStatsRepository
+
+DEFAULT_ROLES = {"donor": 70.0, "victim": 25.0, "vendor": 5.0}
+
+FIRST = ("Aisha", "Bilal", "Carmen", "Dmitri", "Esther", "Farah", "Goran", "Hana", "Ines", "Jamal", "Kenji",
+         "Leila", "Mateo", "Nadia", "Omar", "Priya", "Quentin", "Rosa", "Sami", "Tariq", "Uma", "Viktor",
+         "Wanjiru", "Xavier", "Yusuf", "Zanele", "Alice", "Bob", "Charlie", "Diana", "Eve", "Frank")
+LAST = ("Adeyemi", "Baptiste", "Chen", "Duarte", "Eriksen", "Fofana", "Garcia", "Haddad", "Ivanova", "Jensen",
+        "Kowalski", "Lindqvist", "Moreau", "Nakamura", "Okafor", "Petrov", "Quispe", "Rahman", "Silva",
+        "Tanaka", "Usman", "Volkov", "Wang", "Xu", "Yilmaz", "Zhou", "Johnson", "Smith", "Brown", "Wilson")
+VENDOR_KINDS = ("Supplies", "Goods", "Foods", "Pharmacy", "Logistics", "Hardware", "Textiles", "Water Co.")
+DOMAINS = ("example.com", "example.org", "example.net", "mail.example.com")
 
 
 def init_db():
     """Create tables and populate with sample data."""
-    # Create all tables
-    Base.metadata.create_all(bind=engine)
+    # Create or upgrade the schema
+    ensure_schema(engine)
     
     db = SessionLocal()
     
@@ -33,6 +69,7 @@ def init_db():
             db.add(user)
         
         db.commit()
+        RoleStatsRepository(db).rebuild()
         print(f"Database initialized with {len(sample_users)} sample users.")
         
     except Exception as e:
@@ -42,5 +79,164 @@ def init_db():
         db.close()
 
 
+def parse_roles(value: str) -> Dict[str, float]:
+    """Parse ``donor=70,victim=25,vendor=5`` into relative role weights."""
+    weights = {}
+    for part in value.split(","):
+        role, _, weight = part.partition("=")
+        role = role.strip().lower()
+        if role not in DEFAULT_ROLES:
+            raise argparse.ArgumentTypeError(f"unknown role {role!r}")
+        try:
+            weights[role] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"bad weight for {role}: {weight!r}")
+        if weights[role] < 0:
+            raise argparse.ArgumentTypeError(f"negative weight for {role}")
+    if not sum(weights.values()):
+        raise argparse.ArgumentTypeError("at least one role needs a positive weight")
+    return weights
+
+
+def generate_users(
+    count: int,
+    roles: Dict[str, float] = DEFAULT_ROLES,
+    seed: int = 42,
+    days: int = 730,
+    now: Optional[datetime] = None,
+) -> Iterator[dict]:
+    """Yield ``count`` synthetic ``persons`` rows, deterministic for a ``seed``.
+
+    Roles are drawn with the given relative weights. Uids are random
+    28-character ids like Firebase Auth's, so they land all over the primary
+    key index as real sign-ups do. Emails are unique because they carry the
+    row number. Sign-ups are spread evenly over the last ``days`` and come
+    out in ``created_at`` order; a fifth of the users were edited since.
+    """
+    rng = random.Random(seed)
+    names = list(roles)
+    cum_weights = []
+    total = 0.0
+    for role in names:
+        total += roles[role]
+        cum_weights.append(total)
+    now = now or datetime.utcnow()
+    start = now - timedelta(days=days)
+    step = days * 86400 / max(count, 1)
+    for i in range(count):
+        role = rng.choices(names, cum_weights=cum_weights)[0]
+        first, last = rng.choice(FIRST), rng.choice(LAST)
+        if role == "vendor":
+            name = f"{last} {rng.choice(VENDOR_KINDS)}"
+            local = f"sales.{last.lower()}"
+        else:
+            name = f"{first} {last}"
+            local = f"{first.lower()}.{last.lower()}"
+        created_at = start + timedelta(seconds=(i + rng.random()) * step)
+        updated_at = created_at
+        if rng.random() < 0.2:
+            updated_at += (now - created_at) * rng.random()
+        yield {
+            "uid": format(rng.getrandbits(112), "028x"),
+            "name": name,
+            "email": f"{local}.{i:x}@{rng.choice(DOMAINS)}",
+            "role": role,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+
+
+def load_users(
+    Session: sessionmaker,
+    count: int,
+    roles: Dict[str, float] = DEFAULT_ROLES,
+    seed: int = 42,
+    batch_size: int = 10_000,
+    transaction_size: int = 250_000,
+) -> float:
+    """Insert ``count`` generated users; returns the elapsed seconds.
+
+    Rows go in as Core executemany batches of ``batch_size`` (no ORM
+    objects), committed every ``transaction_size`` rows together with their
+    role counter deltas and change log entries, as any other write would be.
+    The search index takes each transaction's rows in one statement
+    (``deferred_search_index``) instead of row by row.
+    """
+    rows = generate_users(count, roles, seed)
+    loaded = 0
+    started = time.perf_counter()
+    with Session() as db:
+        stats = RoleStatsRepository(db)
+        changes = ChangeLogRepository(db)
+        while loaded < count:
+            deltas: Dict[str, int] = {}
+            in_transaction = 0
+            with deferred_search_index(db):
+                while in_transaction < transaction_size and loaded < count:
+                    batch: List[dict] = list(itertools.islice(rows, min(batch_size, transaction_size - in_transaction)))
+                    # Core executemany on the table: no ORM bulk-insert bookkeeping per row
+                    db.execute(insert(PersonModel.__table__), batch)
+                    changes.record("insert", batch)
+                    mark_changed(db, [row["uid"] for row in batch])
+                    for row in batch:
+                        deltas[row["role"]] = deltas.get(row["role"], 0) + 1
+                    in_transaction += len(batch)
+                    loaded += len(batch)
+            stats.apply_deltas(deltas)
+            db.commit()
+            elapsed = time.perf_counter() - started
+            print(f"  {loaded:>10,}/{count:,} users  {loaded / elapsed:>9,.0f} users/s")
+    return time.perf_counter() - started
+
+
+def check_plans(Session: sessionmaker) -> int:
+    """Print the plan of every repository query; returns 1 when a hot one does a full scan."""
+    if Session.kw["bind"].dialect.name != "sqlite":
+        print("The query plan check reads SQLite's EXPLAIN QUERY PLAN; skipping it on other databases.")
+        return 0
+    plans = explain_queries(Session)
+    failed = [plan for plan in plans if plan.failed]
+    print(f"Query plans ({len(plans)} statements):")
+    for plan in plans:
+        status = "FULL SCAN" if plan.failed else ("scan" if plan.full_scans else "ok")
+        print(f"  {status:<9} {plan.query:<32} {'; '.join(plan.steps) or '(no table access)'}")
+    if failed:
+        print(f"{len(failed)} hot queries fall back to a full scan:")
+        for plan in failed:
+            print(f"  {plan.query} scans {', '.join(plan.full_scans)}: {' '.join(plan.sql.split())}")
+        return 1
+    print("No hot query does a full scan.")
+    return 0
+
+
+def generate(Session: sessionmaker, args) -> int:
+    """``--users``: load synthetic users into an empty database, then check the plans."""
+    with Session() as db:
+        existing = db.execute(select(func.count()).select_from(PersonModel)).scalar()
+    if existing:
+        print(f"Database already has {existing:,} users; not generating more. Checking the plans only.")
+    else:
+        print(f"Generating {args.users:,} users (roles {args.roles}, seed {args.seed})")
+        elapsed = load_users(Session, args.users, args.roles, args.seed, args.batch_size, args.transaction_size)
+        with Session() as db:
+            counts = RoleStatsRepository(db).counts()
+        print(
+            f"Loaded {args.users:,} users in {elapsed:.1f} s ({args.users / elapsed:,.0f} users/s): "
+            + " ".join(f"{role}={n:,}" for role, n in sorted(counts.items()))
+        )
+    return check_plans(Session)
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, help="generate this many synthetic users instead of the samples")
+    parser.add_argument("--roles", type=parse_roles, default=DEFAULT_ROLES, help="relative role weights, e.g. donor=70,victim=25,vendor=5")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=10_000, help="rows per executemany")
+    parser.add_argument("--transaction-size", type=int, default=250_000, help="rows per transaction")
+    parser.add_argument("--check-plans", action="store_true", help="only run the query plan check")
+    args = parser.parse_args()
+    if args.check_plans or args.users:
+        ensure_schema(engine)
+        sys.exit(check_plans(SessionLocal) if args.check_plans else generate(SessionLocal, args))
     init_db()
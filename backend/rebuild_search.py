@@ -0,0 +1,36 @@
+"""Create (if needed), rebuild and verify the full-text search index over users."""
+
+import argparse
+import sys
+
+from app.db.config import SessionLocal, engine
+from app.db.schema import ensure_schema
+from app.db.search import UserSearchRepository
+
+
+def rebuild_search(check_only: bool = False) -> int:
+    """Re-index every user unless ``check_only``; returns a process exit code."""
+    if ensure_schema(engine):
+        print("Upgraded the database schema (including the search index).")
+    if engine.dialect.name != "sqlite":
+        print("Full-text search needs SQLite FTS5; other databases use LIKE and need no index.")
+        return 0
+    db = SessionLocal()
+    try:
+        search = UserSearchRepository(db)
+        if not check_only:
+            search.rebuild()
+            print("Rebuilt the search index.")
+        if search.check():
+            print("Search index is consistent with the persons table.")
+            return 0
+        print("Search index is inconsistent. Re-run without --check to rebuild it.")
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--check", action="store_true", help="only verify the index, do not rebuild it")
+    sys.exit(rebuild_search(check_only=parser.parse_args().check))
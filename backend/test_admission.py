@@ -0,0 +1,169 @@
+"""Tests for admission control: token buckets, the bounded write queue and the middleware."""
+
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.admission import (
+    QUEUE_FULL,
+    QUEUE_TIMEOUT,
+    AdmissionController,
+    AdmissionMiddleware,
+    RateLimiter,
+    WriteGate,
+    client_key,
+    is_write,
+    parse_networks,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_allows_a_burst_then_refills():
+    clock = FakeClock()
+    limiter = RateLimiter(rate=2, burst=3, clock=clock)
+
+    assert [limiter.acquire("a") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.acquire("a") == 0.5
+    assert limiter.acquire("b") == 0.0  # other clients have their own bucket
+
+    clock.now += 0.5
+    assert limiter.acquire("a") == 0.0
+    assert limiter.acquire("a") > 0
+
+
+def test_rate_limiter_forgets_least_recent_clients():
+    limiter = RateLimiter(rate=1, burst=1, max_clients=2, clock=FakeClock())
+    for key in ("a", "b", "c"):
+        limiter.acquire(key)
+    assert len(limiter) == 2
+    assert limiter.acquire("a") == 0.0  # its bucket was dropped, so it starts full again
+
+
+def test_write_gate_queues_in_order_and_sheds_past_its_bounds():
+    async def scenario():
+        gate = WriteGate(limit=1, max_queue=2, timeout=0.2)
+        assert await gate.acquire() is None
+        order = []
+
+        async def queued(name):
+            result = await gate.acquire()
+            order.append((name, result))
+
+        first = asyncio.ensure_future(queued("first"))
+        second = asyncio.ensure_future(queued("second"))
+        await asyncio.sleep(0)
+        assert gate.queued == 2
+        assert await gate.acquire() == QUEUE_FULL
+
+        gate.release()
+        await first
+        assert order == [("first", None)]
+        await second  # the slot is still held by "first"
+        assert order[-1] == ("second", QUEUE_TIMEOUT)
+        assert (gate.in_flight, gate.queued) == (1, 0)
+        gate.release()
+        assert gate.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def _app(controller, identify=None, trusted_proxies=()):
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware, controller=controller, identify=identify, trusted_proxies=trusted_proxies)
+
+    @app.post("/users")
+    def create_user():
+        return {"ok": True}
+
+    @app.post("/users/lookup")
+    def lookup_users():
+        return {"ok": True}
+
+    @app.get("/users/{uid}")
+    def get_user(uid: str):
+        return {"uid": uid}
+
+    return app
+
+
+def test_middleware_limits_writes_per_client():
+    controller = AdmissionController(limiter=RateLimiter(rate=1, burst=2, clock=FakeClock()))
+    client = TestClient(_app(controller, identify={"verified": "u-other"}.get))
+
+    statuses = [client.post("/users").status_code for _ in range(3)]
+    rejected = client.post("/users")
+    other = client.post("/users", headers={"Authorization": "Bearer verified"})
+
+    assert statuses == [200, 200, 429]
+    assert rejected.status_code == 429 and rejected.headers["retry-after"] == "1"
+    assert other.status_code == 200
+    # reads are never limited, including POST routes that only read
+    assert all(client.get("/users/a").status_code == 200 for _ in range(5))
+    assert all(client.post("/users/lookup").status_code == 200 for _ in range(5))
+    assert controller.stats()["admitted"] == 3
+    assert controller.stats()["rejected"]["rate_limited"] == 2
+    text = controller.render()
+    assert 'admission_rejected_total{reason="rate_limited"} 2' in text
+    assert "admission_writes_in_flight 0" in text
+
+
+def test_rotating_unverified_tokens_do_not_escape_the_limit():
+    verified = {"verified-token": "u1"}.get
+    controller = AdmissionController(limiter=RateLimiter(rate=1, burst=2, clock=FakeClock()))
+    client = TestClient(_app(controller, identify=verified))
+
+    statuses = [client.post("/users", headers={"Authorization": f"Bearer forged-{i}"}).status_code for i in range(5)]
+
+    assert statuses == [200, 200, 429, 429, 429]  # one bucket: the peer address
+    assert len(controller.limiter) == 1
+    assert client.post("/users", headers={"Authorization": "Bearer verified-token"}).status_code == 200
+
+    def key(authorization):
+        return client_key({"headers": [(b"authorization", authorization)], "client": ("1.2.3.4", 1)}, verified)
+
+    assert key(b"Bearer verified-token") == "user:u1"
+    assert key(b"verified-token") == key(b"Bearer forged") == "addr:1.2.3.4"
+    assert client_key({"headers": [(b"authorization", b"Bearer verified-token")], "client": ("1.2.3.4", 1)}) == "addr:1.2.3.4"
+
+
+def test_clients_behind_a_trusted_proxy_get_their_own_buckets():
+    proxy = ("10.0.0.5", 1)
+    forwarded = [{"X-Forwarded-For": f"203.0.113.{i}"} for i in range(5)]
+
+    # by default the proxy's address is the client, so everyone behind it shares one bucket
+    controller = AdmissionController(limiter=RateLimiter(rate=1, burst=2, clock=FakeClock()))
+    client = TestClient(_app(controller), client=proxy)
+    assert [client.post("/users", headers=headers).status_code for headers in forwarded] == [200, 200, 429, 429, 429]
+
+    controller = AdmissionController(limiter=RateLimiter(rate=1, burst=2, clock=FakeClock()))
+    client = TestClient(_app(controller, trusted_proxies=parse_networks("10.0.0.0/8")), client=proxy)
+    assert [client.post("/users", headers=headers).status_code for headers in forwarded] == [200] * 5
+    assert len(controller.limiter) == 5
+    # hops a client sends itself come before the one the proxy appends, so they do not pick the bucket
+    spoofed = [{"X-Forwarded-For": f"198.51.100.{i}, 203.0.113.9"} for i in range(3)]
+    assert [client.post("/users", headers=headers).status_code for headers in spoofed] == [200, 200, 429]
+
+    def key(headers, peer="10.0.0.5"):
+        return client_key({"headers": headers, "client": (peer, 1)}, trusted_proxies=parse_networks("10.0.0.0/8, ::1"))
+
+    assert key([(b"forwarded", b'for=192.0.2.60;proto=http, for="[2001:db8::1]:4711";by=10.0.0.1')]) == "addr:2001:db8::1"
+    assert key([(b"x-forwarded-for", b"192.0.2.60, 10.0.0.7")]) == "addr:192.0.2.60"  # trusted hops are skipped
+    assert key([(b"x-forwarded-for", b"192.0.2.60")], peer="203.0.113.1") == "addr:203.0.113.1"
+    assert key([]) == "addr:10.0.0.5"
+
+
+def test_writes_are_told_apart_from_reads():
+    assert is_write("POST", "/users")
+    assert is_write("PUT", "/users/a")
+    assert is_write("DELETE", "/users/a")
+    assert not is_write("GET", "/users/a")
+    assert not is_write("POST", "/users/lookup")
+    assert not is_write("POST", "/verify-token")
@@ -0,0 +1,116 @@
+"""Run the user routes on the sync and async (DB_MODE=async) paths and compare the responses."""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.db.cache import user_cache
+from app.db.config import PROFILES, create_engines, get_async_db, get_db, make_sessionmaker, to_async_url
+from app.db.schema import ensure_schema
+
+
+@contextmanager
+def sync_client():
+    """Client for an app mounting the sync users router on a fresh database."""
+    import app.main as main_module
+
+    with tempfile.TemporaryDirectory() as tmp:
+        writer, reader = create_engines(f"sqlite:///{os.path.join(tmp, 'sync.db')}", PROFILES["production"])
+        ensure_schema(writer)
+        Session = make_sessionmaker(writer, reader)
+
+        def override_db():
+            with Session() as db:
+                yield db
+
+        app = FastAPI()
+        app.include_router(main_module.users_router)
+        app.dependency_overrides[get_db] = override_db
+        try:
+            with TestClient(app) as client:
+                yield client
+        finally:
+            user_cache.clear()
+            writer.dispose()
+            reader.dispose()
+
+
+@contextmanager
+def async_client():
+    """Client for an app mounting the async users router on a fresh database."""
+    from app.async_routes import router
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'async.db')}"
+        setup = create_engine(url)
+        ensure_schema(setup)
+        setup.dispose()
+        engine = create_async_engine(to_async_url(url), poolclass=NullPool)
+        AsyncSession = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+        async def override_async_db():
+            async with AsyncSession() as db:
+                yield db
+
+        app = FastAPI()
+        app.include_router(router)
+        app.dependency_overrides[get_async_db] = override_async_db
+        try:
+            with TestClient(app) as client:
+                yield client
+        finally:
+            user_cache.clear()
+
+
+def exercise(client) -> list:
+    """Run one scenario over the users routes; returns (method, url, status, body) per request."""
+    seen = []
+
+    def call(method, url, **kwargs):
+        response = client.request(method, url, **kwargs)
+        seen.append((method, url, response.status_code, response.json()))
+        return response
+
+    for i, role in enumerate(["donor", "vendor", "victim", "donor", "vendor"]):
+        call("POST", "/users", json={"uid": f"u{i}", "name": f"User {i}", "email": f"u{i}@example.com", "role": role})
+    call("POST", "/users", json={"uid": "u0", "name": "Again", "email": "again@example.com"})
+    call("POST", "/users", json={"uid": "bad", "name": "Bad", "email": "not-an-email"})
+
+    call("GET", "/users/u1")
+    call("GET", "/users/missing")
+    call("GET", "/users", params={"skip": 1, "limit": 2})
+    call("GET", "/users", params={"role": "donor"})
+    page = call("GET", "/users", params={"limit": 2})
+    call("GET", "/users", params={"limit": 2, "cursor": page.headers["X-Next-Cursor"]})
+    call("GET", "/users", params={"cursor": "not-a-cursor"})
+    call("POST", "/users/lookup", json={"uids": ["u0", "u2", "nobody"], "emails": ["u3@example.com", "x@example.com"]})
+
+    call("PUT", "/users/u9", json={"uid": "u9", "name": "New", "email": "u9@example.com", "role": "victim"})
+    call("PUT", "/users/u1", json={"uid": "u1", "name": "Renamed", "email": "u1@example.com"})
+    call("PUT", "/users/u2", json={"uid": "u2", "name": "Taken", "email": "u0@example.com"})
+    call("PUT", "/users/u3", json={"uid": "u3", "name": "Stale", "email": "u3@example.com"},
+         headers={"If-Match": '"0"'})
+    call("GET", "/users/u1")
+
+    call("DELETE", "/users/u4")
+    call("DELETE", "/users/u4")
+    call("GET", "/users")
+    return seen
+
+
+def test_async_routes_answer_like_the_sync_routes():
+    with sync_client() as client:
+        expected = exercise(client)
+    with async_client() as client:
+        actual = exercise(client)
+
+    assert [entry[:3] for entry in actual] == [entry[:3] for entry in expected]
+    assert actual == expected
+    statuses = {(method, status) for method, _, status, _ in expected}
+    assert {("POST", 409), ("POST", 422), ("GET", 404), ("PUT", 201), ("PUT", 412), ("DELETE", 404)} <= statuses
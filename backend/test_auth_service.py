@@ -0,0 +1,125 @@
+"""Offline tests for token verification caching, using locally minted RS256 tokens."""
+
+import threading
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.services.auth_service import AuthService
+from app.services.token_cache import PublicKeyCache, StaticKeySource, TokenClaimsCache
+
+PROJECT_ID = "reliefconnect-test"
+
+
+@pytest.fixture(scope="module")
+def private_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def mint_token(private_key, uid="user1", kid="k1", lifetime=3600, **claims):
+    now = int(time.time())
+    payload = {
+        "iss": f"https://securetoken.google.com/{PROJECT_ID}",
+        "aud": PROJECT_ID,
+        "sub": uid,
+        "iat": now,
+        "auth_time": now,
+        "exp": now + lifetime,
+        **claims,
+    }
+    return jwt.encode(payload, private_key, algorithm="RS256", headers={"kid": kid})
+
+
+def make_service(private_key, **kwargs):
+    source = StaticKeySource({"k1": private_key.public_key()})
+    return AuthService(key_source=source, project_id=PROJECT_ID, **kwargs), source
+
+
+def test_verify_caches_claims(private_key, monkeypatch):
+    service, source = make_service(private_key)
+    token = mint_token(private_key)
+    original_decode = jwt.decode
+    calls = []
+
+    def counting_decode(*args, **kwargs):
+        calls.append(1)
+        return original_decode(*args, **kwargs)
+
+    monkeypatch.setattr(jwt, "decode", counting_decode)
+
+    assert service.verify_id_token(token)["uid"] == "user1"
+    assert service.verify_id_token(token)["uid"] == "user1"
+    assert len(calls) == 1
+    assert source.fetch_count == 1
+
+
+def test_rejects_bad_tokens_and_does_not_cache_them(private_key):
+    service, _ = make_service(private_key)
+    other_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    for token in (
+        mint_token(other_key),
+        mint_token(private_key, aud="someone-else"),
+        mint_token(private_key, lifetime=-10),
+        mint_token(private_key, kid="unknown"),
+    ):
+        for _ in range(2):
+            with pytest.raises(Exception):
+                service.verify_id_token(token)
+
+
+def test_cache_entry_never_outlives_exp():
+    now = [1000.0]
+    cache = TokenClaimsCache(max_ttl=300, clock=lambda: now[0])
+    cache.put("t", {"exp": 1010})
+    assert cache.get("t") == {"exp": 1010}
+    now[0] = 1010.0
+    assert cache.get("t") is None
+    cache.put("expired", {"exp": 900})
+    assert len(cache) == 0
+
+
+def test_cache_is_bounded():
+    cache = TokenClaimsCache(maxsize=2)
+    for token in ("a", "b", "c"):
+        cache.put(token, {"sub": token})
+    assert cache.get("a") is None
+    assert cache.get("c") == {"sub": "c"}
+
+
+def test_concurrent_key_refresh_is_single_flight(private_key):
+    class SlowSource(StaticKeySource):
+        def fetch(self):
+            time.sleep(0.05)
+            return super().fetch()
+
+    source = SlowSource({"k1": private_key.public_key()})
+    keys = PublicKeyCache(source)
+    threads = [threading.Thread(target=keys.get, args=("k1",)) for _ in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert source.fetch_count == 1
+
+
+def test_unknown_kid_refresh_is_rate_limited(private_key):
+    source = StaticKeySource({"k1": private_key.public_key()})
+    keys = PublicKeyCache(source, min_refresh_interval=60)
+    keys.get("k1")
+    for _ in range(5):
+        with pytest.raises(KeyError):
+            keys.get("rotated")
+    assert source.fetch_count == 1
+
+
+def test_cached_uid_only_knows_verified_tokens(private_key):
+    service, source = make_service(private_key)
+    token = mint_token(private_key, uid="user7")
+
+    assert service.cached_uid(token) is None  # looked up, never verified
+    assert source.fetch_count == 0
+    service.verify_id_token(token)
+    assert service.cached_uid(token) == "user7"
+    assert service.cached_uid("forged") is None and service.cached_uid("") is None
@@ -0,0 +1,108 @@
+"""Tests for online backups: consistent snapshots, live writes, rotation and the admin endpoints."""
+
+import os
+import sqlite3
+import tempfile
+import time
+
+from fastapi.testclient import TestClient
+
+from app.db.backup import BackupManager
+from app.db.config import get_db
+from app.db.repository import DatabaseUserRepository
+from app.models.person import Donor
+from benchmarks.common import make_people, temp_database
+
+
+def _database(Session) -> str:
+    return Session.kw["bind"].url.database
+
+
+def _count(path: str) -> int:
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT count(*) FROM persons").fetchone()[0]
+
+
+def test_snapshot_is_a_checked_self_contained_copy():
+    with temp_database() as Session, tempfile.TemporaryDirectory() as out:
+        with Session() as db:
+            DatabaseUserRepository(db).add_users(make_people(500))
+        manager = BackupManager(_database(Session), out, pages_per_step=8, step_pause=0)
+
+        result = manager.run()
+
+        assert result.integrity == "ok" and result.steps > 1 and result.restarts == 0
+        assert result.write_lock == 0.0  # WAL: the copy never holds up a commit
+        assert _count(result.path) == 500
+        with sqlite3.connect(result.path) as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+        assert [s["name"] for s in manager.snapshots()] == [os.path.basename(result.path)]
+        assert not [name for name in os.listdir(out) if name.endswith((".partial", "-wal"))]
+
+
+def test_writes_commit_while_a_backup_runs_and_the_snapshot_stays_consistent():
+    with temp_database() as Session, tempfile.TemporaryDirectory() as out:
+        with Session() as db:
+            DatabaseUserRepository(db).add_users(make_people(300))
+        manager = BackupManager(_database(Session), out, pages_per_step=1, step_pause=0.02)
+
+        assert manager.start()
+        while manager.stats()["progress"] is None:
+            time.sleep(0.005)
+        with Session() as db:
+            DatabaseUserRepository(db).add_user(Donor(uid="during", name="During", email="during@example.com"))
+        assert manager.running  # the write did not wait for the copy
+        assert not manager.start()
+        manager._thread.join()
+
+        result = manager.last_result
+        assert result.restarts == 0
+        assert _count(result.path) == 300  # the snapshot is the database as of the start
+
+
+def test_rotation_keeps_the_newest_snapshots_and_the_schedule_waits_for_the_interval():
+    with temp_database() as Session, tempfile.TemporaryDirectory() as out:
+        manager = BackupManager(_database(Session), out, keep=2, interval=3600)
+        assert manager.due()
+
+        paths = [manager.run().path for _ in range(3)]
+
+        assert [s["name"] for s in manager.snapshots()] == [os.path.basename(p) for p in reversed(paths[1:])]
+        assert not manager.due()
+        assert manager.run(scheduled=True) is None
+
+
+def test_admin_backup_endpoints():
+    import app.main as main_module
+
+    with temp_database() as Session, tempfile.TemporaryDirectory() as out:
+
+        def override_db():
+            with Session() as db:
+                yield db
+
+        original = main_module.backups, main_module.ADMIN_TOKEN
+        main_module.app.dependency_overrides[get_db] = override_db
+        main_module.backups = BackupManager(_database(Session), out)
+        main_module.ADMIN_TOKEN = None
+        try:
+            client = TestClient(main_module.app)
+            assert client.post("/admin/backups").status_code == 403  # disabled without a token
+
+            main_module.ADMIN_TOKEN = "secret"
+            admin = {"Authorization": "Bearer secret"}
+            assert client.post("/admin/backups", headers={"Authorization": "Bearer wrong"}).status_code == 401
+            client.post("/users", json={"uid": "a", "name": "A", "email": "a@example.com"})
+
+            created = client.post("/admin/backups", params={"wait": "true"}, headers=admin)
+            status = client.get("/admin/backups", headers=admin).json()
+
+            assert created.status_code == 201 and created.json()["integrity"] == "ok"
+            assert _count(created.json()["path"]) == 1
+            assert status["completed"] == 1 and not status["running"]
+            assert [s["name"] for s in status["snapshots"]] == [os.path.basename(created.json()["path"])]
+            assert "backup_completed_total 1" in client.get("/metrics").text
+        finally:
+            main_module.backups, main_module.ADMIN_TOKEN = original
+            main_module.app.dependency_overrides.clear()
+            main_module.user_cache.clear()
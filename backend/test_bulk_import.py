@@ -0,0 +1,110 @@
+"""Tests for bulk user import: per-row results, batching, counters and change log entries."""
+
+import json
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.db.changes import ChangeLogRepository
+from app.db.config import get_db
+from app.db.repository import DatabaseUserRepository
+from app.db.stats import RoleStatsRepository
+from app.models.person import Donor, Vendor, Victim
+from benchmarks.common import temp_database
+
+
+def test_add_users_reports_conflicts_within_the_batch_and_against_existing_rows():
+    with temp_database() as Session:
+        with Session() as db:
+            repo = DatabaseUserRepository(db)
+            repo.add_user(Donor(uid="old", name="Old", email="old@example.com"))
+
+            results = repo.add_users([
+                Donor(uid="a", name="A", email="a@example.com"),
+                Vendor(uid="a", name="A again", email="a2@example.com"),    # uid taken earlier in the batch
+                Victim(uid="b", name="B", email="a@example.com"),           # email taken earlier in the batch
+                Donor(uid="old", name="Old again", email="new@example.com"),  # uid of an existing row
+                Vendor(uid="c", name="C", email="old@example.com"),         # email of an existing row
+                Victim(uid="d", name="D", email="d@example.com"),
+            ])
+
+            assert [(r["index"], r["uid"], r["status"]) for r in results] == [
+                (0, "a", "created"), (1, "a", "conflict"), (2, "b", "conflict"),
+                (3, "old", "conflict"), (4, "c", "conflict"), (5, "d", "created"),
+            ]
+            details = [r["detail"] for r in results]
+            assert "uid" in details[1].lower() and "uid" in details[3].lower()
+            assert "email" in details[2].lower() and "email" in details[4].lower()
+            assert repo.get_user("a").role == "donor" and repo.get_user("b") is None and repo.get_user("c") is None
+
+
+def test_add_users_commits_one_transaction_per_batch():
+    with temp_database() as Session:
+        with Session() as db:
+            commits = []
+            event.listen(db, "after_commit", lambda session: commits.append(1))
+            people = [Donor(uid=f"u{i}", name=f"U {i}", email=f"u{i}@example.com") for i in range(7)]
+
+            results = DatabaseUserRepository(db).add_users(people, batch_size=3)
+
+            assert len(commits) == 3  # 3 + 3 + 1
+            assert [r["index"] for r in results] == list(range(7))
+            assert all(r["status"] == "created" for r in results)
+
+
+def test_imported_users_update_counters_and_the_change_log():
+    with temp_database() as Session:
+        with Session() as db:
+            DatabaseUserRepository(db).add_users([
+                Donor(uid="a", name="A", email="a@example.com"),
+                Donor(uid="b", name="B", email="b@example.com"),
+                Vendor(uid="c", name="C", email="c@example.com"),
+                Victim(uid="a", name="dup", email="dup@example.com"),
+            ], batch_size=2)
+
+            stats = RoleStatsRepository(db)
+            assert stats.counter_counts() == {"donor": 2, "vendor": 1}
+            assert stats.check() == {}
+            changes = ChangeLogRepository(db).since(0)
+            assert [(c.op, c.uid, c.role) for c in changes] == [
+                ("insert", "a", "donor"), ("insert", "b", "donor"), ("insert", "c", "vendor"),
+            ]
+
+
+def test_bulk_endpoint_returns_one_result_per_ndjson_row(monkeypatch):
+    import app.main as main_module
+
+    with temp_database() as Session:
+
+        def override_db():
+            with Session() as db:
+                yield db
+
+        monkeypatch.setattr(main_module, "BULK_BATCH_SIZE", 2)
+        main_module.app.dependency_overrides[get_db] = override_db
+        try:
+            client = TestClient(main_module.app)
+            client.post("/users", json={"uid": "old", "name": "Old", "email": "old@example.com"})
+            rows = [
+                {"uid": "a", "name": "A", "email": "a@example.com", "role": "vendor"},
+                {"uid": "b", "name": "B", "email": "not-an-email"},
+                {"uid": "a", "name": "A again", "email": "a2@example.com"},
+                {"uid": "c", "name": "C", "email": "old@example.com"},
+                {"uid": "d", "name": "D", "email": "d@example.com", "role": "victim"},
+            ]
+            body = "\n".join(json.dumps(row) for row in rows) + "\nnot json\n"
+
+            response = client.post("/users/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+
+            assert response.status_code == 200
+            result = response.json()
+            assert (result["created"], result["conflicts"], result["invalid"]) == (2, 2, 2)
+            assert [(r["index"], r["uid"], r["status"]) for r in result["results"]] == [
+                (0, "a", "created"), (1, "b", "invalid"), (2, "a", "conflict"),
+                (3, "c", "conflict"), (4, "d", "created"), (5, None, "invalid"),
+            ]
+            assert client.get("/users/d").json()["role"] == "victim"
+            assert client.get("/stats/users").json()["counts"] == {"donor": 1, "vendor": 1, "victim": 1}
+        finally:
+            main_module.app.dependency_overrides.clear()
+            main_module.user_cache.clear()
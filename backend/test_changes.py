@@ -0,0 +1,179 @@
+"""Tests for the user change log, its compaction and the change feed."""
+
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.db.changes import ChangeLogRepository
+from app.db.config import get_db
+from app.db.generations import generation_table
+from app.db.repository import DatabaseUserRepository, VersionConflict
+from app.models.person import Donor, Vendor
+from app.services.change_feed import ChangeFeed
+from benchmarks.common import make_people, temp_database
+
+
+def _ops(rows):
+    return [(row.op, row.uid) for row in rows]
+
+
+def test_writes_append_to_the_log_in_their_transaction():
+    with temp_database() as Session:
+        with Session() as db:
+            repo = DatabaseUserRepository(db)
+            changes = ChangeLogRepository(db)
+            repo.add_user(Donor(uid="a", name="A", email="a@example.com"))
+            with pytest.raises(KeyError):
+                repo.add_user(Donor(uid="a", name="Dup", email="dup@example.com"))
+            repo.add_users(make_people(2, prefix="b"))
+            seen = repo.update_user("a", name="A2", role="vendor").updated_at
+            with pytest.raises(VersionConflict):
+                repo.delete_user("a", if_updated_at={seen - timedelta(seconds=1)})
+            repo.delete_user("b0")
+
+            rows = changes.since(0)
+            assert _ops(rows) == [("insert", "a"), ("insert", "b0"), ("insert", "b1"), ("update", "a"), ("delete", "b0")]
+            assert [row.seq for row in rows] == sorted(row.seq for row in rows)
+            assert (rows[3].name, rows[3].role) == ("A2", "vendor") and rows[4].email is None
+            assert _ops(changes.since(rows[2].seq, limit=1)) == [("update", "a")]
+            assert changes.latest_seq() == rows[-1].seq
+
+
+def test_compaction_keeps_the_latest_entry_per_user_and_expires_tombstones():
+    with temp_database() as Session:
+        with Session() as db:
+            repo = DatabaseUserRepository(db)
+            changes = ChangeLogRepository(db)
+            repo.add_user(Donor(uid="a", name="A", email="a@example.com"))
+            repo.add_user(Vendor(uid="b", name="B", email="b@example.com"))
+            repo.update_user("a", name="A2")
+            repo.update_user("a", name="A3")
+            repo.delete_user("b")
+            latest = changes.latest_seq()
+
+            assert changes.compact() == {"superseded": 3, "tombstones": 0, "horizon": 0}
+            assert _ops(changes.since(0)) == [("update", "a"), ("delete", "b")]
+            assert changes.since(0)[0].name == "A3"
+
+            result = changes.compact(now=datetime.utcnow() + timedelta(days=8))
+            assert result == {"superseded": 0, "tombstones": 1, "horizon": latest}
+            assert changes.horizon() == latest and changes.latest_seq() == latest
+            # AUTOINCREMENT: sequence numbers are never reused after compaction
+            repo.add_user(Donor(uid="c", name="C", email="c@example.com"))
+            assert changes.since(latest)[0].seq == latest + 1
+
+
+def test_overlapping_compactions_never_move_the_horizon_back():
+    with temp_database() as Session:
+        with Session() as db:
+            repo = DatabaseUserRepository(db)
+            repo.add_users(make_people(3, prefix="u"))
+            repo.delete_user("u0")
+            repo.delete_user("u1")
+            latest = ChangeLogRepository(db).latest_seq()
+
+        later = datetime.utcnow() + timedelta(days=8)
+        results = {}
+
+        def compact_again():
+            # no tombstone is old enough for this run: it must keep the first run's horizon
+            with Session() as other:
+                results["second"] = ChangeLogRepository(other).compact(now=later, tombstone_ttl=timedelta(days=30))
+
+        second = threading.Thread(target=compact_again)
+
+        def start_second(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("DELETE FROM user_changes WHERE") and "op =" in statement and not second.is_alive():
+                second.start()
+                time.sleep(0.3)  # let the second run read and reach the write lock
+
+        event.listen(Engine, "after_cursor_execute", start_second)
+        try:
+            with Session() as db:
+                results["first"] = ChangeLogRepository(db).compact(now=later)
+        finally:
+            event.remove(Engine, "after_cursor_execute", start_second)
+            second.join()
+
+        assert results["first"]["horizon"] == latest and results["first"]["tombstones"] == 2
+        assert results["second"]["horizon"] == latest and results["second"]["tombstones"] == 0
+        with Session() as db:
+            assert ChangeLogRepository(db).horizon() == latest
+
+
+def test_compaction_is_skipped_until_the_interval_has_passed():
+    with temp_database() as Session:
+        with Session() as db:
+            DatabaseUserRepository(db).add_users(make_people(2, prefix="u"))
+            changes = ChangeLogRepository(db)
+            start = datetime.utcnow()
+
+            assert changes.compact(now=start, min_interval=600) is not None
+            assert changes.compact(now=start + timedelta(seconds=599), min_interval=600) is None
+            assert changes.compact(now=start + timedelta(seconds=600), min_interval=600) is not None
+            assert changes.state()["compacted_at"] == start + timedelta(seconds=600)
+
+
+def test_changes_route_pages_and_rejects_compacted_cursors():
+    import app.main as main_module
+
+    with temp_database() as Session:
+        with Session() as db:
+            repo = DatabaseUserRepository(db)
+            repo.add_users(make_people(3, prefix="u"))
+
+        def override_db():
+            with Session() as db:
+                yield db
+
+        main_module.app.dependency_overrides[get_db] = override_db
+        try:
+            client = TestClient(main_module.app)
+            assert client.get("/users/changes").json() == {"changes": [], "next": 3}
+            page = client.get("/users/changes", params={"since": 0, "limit": 2}).json()
+            assert [c["uid"] for c in page["changes"]] == ["u0", "u1"] and page["next"] == 2
+            assert page["changes"][0]["op"] == "insert" and page["changes"][0]["email"] == "u0@example.com"
+            assert client.get("/users/changes", params={"since": 3}).json() == {"changes": [], "next": 3}
+
+            with Session() as db:
+                DatabaseUserRepository(db).delete_user("u0")
+                ChangeLogRepository(db).compact(now=datetime.utcnow() + timedelta(days=30))
+            assert client.get("/users/changes", params={"since": 2}).status_code == 410
+            assert client.get("/users/changes", params={"since": 4}).json()["next"] == 4
+        finally:
+            main_module.app.dependency_overrides.clear()
+
+
+def test_feed_replays_then_pushes_new_commits():
+    with temp_database() as Session:
+        with Session() as db:
+            DatabaseUserRepository(db).add_users(make_people(2, prefix="u"))
+        feed = ChangeFeed(Session, generation_table(str(Session.kw["bind"].url)), poll_interval=0.01, heartbeat=0.05)
+
+        def write():
+            with Session() as db:
+                repo = DatabaseUserRepository(db)
+                repo.update_user("u0", name="Live")
+                repo.delete_user("u1")
+
+        async def collect():
+            received = []
+            events = feed.events(since=1)
+            async for rows in events:
+                received.extend(_ops(rows))
+                if received == [("insert", "u1")]:
+                    threading.Thread(target=write).start()
+                if len(received) == 3:
+                    break
+            await events.aclose()
+            return received
+
+        received = asyncio.run(asyncio.wait_for(collect(), 10))
+        assert received == [("insert", "u1"), ("update", "u0"), ("delete", "u1")]
+        assert feed.stats()["subscribers"] == 0
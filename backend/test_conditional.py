@@ -0,0 +1,84 @@
+"""Tests for ETag / Last-Modified handling and If-Match optimistic concurrency."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.conditional import collection_etag, parse_if_match, user_etag
+from app.db.config import get_db
+from app.db.repository import DatabaseUserRepository, VersionConflict
+from app.models.person import Donor
+from benchmarks.common import temp_database
+
+
+def test_user_etag_round_trips_through_if_match():
+    with temp_database() as Session:
+        with Session() as db:
+            user = DatabaseUserRepository(db).add_user(Donor(uid="a", name="A", email="a@example.com"))
+            assert parse_if_match(f'W/"x", {user_etag(user.updated_at)}') == {user.updated_at}
+        assert parse_if_match("*") is None
+        assert parse_if_match('W/"abc"') == set()
+
+
+def test_update_with_stale_version_is_rejected():
+    with temp_database() as Session:
+        with Session() as db:
+            repo = DatabaseUserRepository(db)
+            seen = repo.add_user(Donor(uid="a", name="A", email="a@example.com")).updated_at
+            repo.update_user("a", name="B", if_updated_at={seen})
+            with pytest.raises(VersionConflict):
+                repo.update_user("a", name="C", if_updated_at={seen})
+            with pytest.raises(VersionConflict):
+                repo.delete_user("a", if_updated_at={seen})
+            assert repo.get_user("a").name == "B"
+            assert repo.delete_user("a", if_updated_at={repo.get_user_version("a")})
+
+
+def test_collection_version_changes_on_every_write():
+    with temp_database() as Session:
+        with Session() as db:
+            repo = DatabaseUserRepository(db)
+            versions = [repo.collection_version()]
+            repo.add_user(Donor(uid="a", name="A", email="a@example.com"))
+            versions.append(repo.collection_version())
+            repo.add_user(Donor(uid="b", name="B", email="b@example.com"))
+            versions.append(repo.collection_version())
+            repo.update_user("a", name="A2")
+            versions.append(repo.collection_version())
+            repo.delete_user("b")
+            versions.append(repo.collection_version())
+            assert len({collection_etag(v) for v in versions}) == len(versions)
+
+
+def test_conditional_requests_through_the_api():
+    import app.main as main_module
+
+    with temp_database() as Session:
+
+        def override_db():
+            with Session() as db:
+                yield db
+
+        main_module.app.dependency_overrides[get_db] = override_db
+        main_module.user_cache.clear()
+        try:
+            client = TestClient(main_module.app)
+            client.post("/users", json={"uid": "a", "name": "A", "email": "a@example.com", "role": "donor"})
+
+            first = client.get("/users/a")
+            etag = first.headers["etag"]
+            assert client.get("/users/a", headers={"If-None-Match": etag}).status_code == 304
+            assert client.get("/users/a", headers={"If-Modified-Since": first.headers["last-modified"]}).status_code == 304
+
+            page_etag = client.get("/users").headers["etag"]
+            assert client.get("/users", headers={"If-None-Match": page_etag}).status_code == 304
+
+            payload = {"uid": "a", "name": "B", "email": "a@example.com"}
+            updated = client.put("/users/a", json=payload, headers={"If-Match": etag})
+            assert updated.status_code == 200 and updated.headers["etag"] != etag
+            assert client.put("/users/a", json=payload, headers={"If-Match": etag}).status_code == 412
+            assert client.get("/users", headers={"If-None-Match": page_etag}).status_code == 200
+            assert client.delete("/users/a", headers={"If-Match": etag}).status_code == 412
+            assert client.delete("/users/a", headers={"If-Match": updated.headers["etag"]}).status_code == 200
+        finally:
+            main_module.app.dependency_overrides.clear()
+            main_module.user_cache.clear()
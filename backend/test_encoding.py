@@ -0,0 +1,59 @@
+"""Tests for the lean read path: pre-encoded bodies match the validated ones."""
+
+import json
+
+from fastapi.testclient import TestClient
+
+from app.db.cache import UserRecord
+from app.db.config import get_db
+from app.db.repository import DatabaseUserRepository
+from app.encoding import encode_user, encode_users
+from app.models.person import Donor, Vendor
+from benchmarks.common import temp_database
+
+
+def test_rows_encode_to_user_out_json():
+    rows = [
+        UserRecord("a", 'Quote "and" back\\slash', "a@example.com", "donor", None, None),
+        UserRecord("b", "Zoë 🚀", "b@example.com", "vendor", None, None),
+    ]
+    assert json.loads(encode_users(rows)) == [
+        {"uid": "a", "name": 'Quote "and" back\\slash', "email": "a@example.com", "role": "donor"},
+        {"uid": "b", "name": "Zoë 🚀", "email": "b@example.com", "role": "vendor"},
+    ]
+    assert json.loads(encode_user(rows[1]))["name"] == "Zoë 🚀"
+    assert encode_users([]) == b"[]"
+
+
+def test_lean_and_orm_paths_return_the_same_responses():
+    import app.main as main_module
+
+    with temp_database() as Session:
+        with Session() as db:
+            repo = DatabaseUserRepository(db)
+            repo.add_user(Donor(uid="a", name="Zoë", email="a@example.com"))
+            repo.add_user(Vendor(uid="b", name="B", email="b@example.com"))
+
+        def override_db():
+            with Session() as db:
+                yield db
+
+        main_module.app.dependency_overrides[get_db] = override_db
+        lean = main_module.LEAN_READS
+        try:
+            client = TestClient(main_module.app)
+            responses = {}
+            for mode in (True, False):
+                main_module.LEAN_READS = mode
+                main_module.user_cache.clear()
+                page = client.get("/users", params={"limit": 1})
+                one = client.get("/users/a")
+                responses[mode] = (
+                    page.json(), page.headers["x-next-cursor"], page.headers["etag"],
+                    one.json(), one.headers["etag"], one.headers["content-type"],
+                )
+            assert responses[True] == responses[False]
+        finally:
+            main_module.LEAN_READS = lean
+            main_module.app.dependency_overrides.clear()
+            main_module.user_cache.clear()
@@ -0,0 +1,82 @@
+"""Tests for the streaming NDJSON/CSV user export."""
+
+import csv
+import io
+import json
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from app.db.models import PersonModel
+from app.db.repository import DatabaseUserRepository
+from app.services import export_service
+from app.services.export_service import EXPORT_FIELDS, encode_csv, encode_ndjson, stream_users
+from benchmarks.common import make_people, temp_database
+
+SINCE = datetime(2030, 1, 1)
+
+
+def _seed(Session) -> None:
+    """Seven users, roles cycling donor/vendor/victim; u1 and u4 were updated after ``SINCE``."""
+    with Session() as db:
+        DatabaseUserRepository(db).add_users(make_people(7, prefix="u"))
+        db.execute(update(PersonModel).where(PersonModel.uid == "u4").values(updated_at=datetime(2030, 1, 2)))
+        db.execute(update(PersonModel).where(PersonModel.uid == "u1").values(updated_at=datetime(2030, 1, 3)))
+        db.commit()
+
+
+def test_encoders_write_one_block_per_chunk():
+    stamp = datetime(2024, 5, 1, 12, 30)
+    chunks = [[("a", "A", "a@example.com", "donor", stamp, stamp)], [("b", 'B, "Jr"', "b@example.com", "vendor", stamp, None)]]
+
+    ndjson = list(encode_ndjson(chunks))
+    rows = list(csv.reader(io.StringIO(b"".join(encode_csv(chunks)).decode())))
+
+    assert len(ndjson) == 2
+    assert json.loads(ndjson[1]) == {
+        "uid": "b", "name": 'B, "Jr"', "email": "b@example.com", "role": "vendor",
+        "created_at": "2024-05-01T12:30:00", "updated_at": None,
+    }
+    assert len(list(encode_csv(chunks))) == 3  # header, then one block per chunk
+    assert rows == [list(EXPORT_FIELDS), ["a", "A", "a@example.com", "donor", stamp.isoformat(), stamp.isoformat()],
+                    ["b", 'B, "Jr"', "b@example.com", "vendor", stamp.isoformat(), ""]]
+
+
+def test_stream_users_reads_in_chunks_and_applies_filters(monkeypatch):
+    with temp_database() as Session:
+        _seed(Session)
+        monkeypatch.setattr(export_service, "SessionLocal", Session)
+
+        blocks = list(stream_users("ndjson", chunk_size=3))
+        everyone = [json.loads(line) for block in blocks for line in block.decode().splitlines()]
+        assert len(blocks) == 3  # 3 + 3 + 1 rows
+        assert [user["uid"] for user in everyone] == [f"u{i}" for i in range(7)]
+
+        donors = b"".join(stream_users("ndjson", role="DONOR", chunk_size=2)).decode().splitlines()
+        assert [json.loads(line)["uid"] for line in donors] == ["u0", "u3", "u6"]
+
+        updated = b"".join(stream_users("csv", updated_since=SINCE, chunk_size=1)).decode()
+        assert [row["uid"] for row in csv.DictReader(io.StringIO(updated))] == ["u4", "u1"]  # updated_at order
+
+
+def test_export_endpoint_streams_csv_and_ndjson(monkeypatch):
+    import app.main as main_module
+
+    with temp_database() as Session:
+        _seed(Session)
+        monkeypatch.setattr(export_service, "SessionLocal", Session)
+        monkeypatch.setattr(main_module, "EXPORT_CHUNK_SIZE", 2)
+        client = TestClient(main_module.app)
+
+        exported = client.get("/users/export", params={"format": "csv", "role": "vendor"})
+        assert exported.status_code == 200
+        assert exported.headers["content-type"].startswith("text/csv")
+        assert 'filename="users.csv"' in exported.headers["content-disposition"]
+        assert [row["uid"] for row in csv.DictReader(io.StringIO(exported.text))] == ["u1", "u4"]
+
+        since = client.get("/users/export", params={"updated_since": "2030-01-01T01:00:00+01:00"})
+        assert since.headers["content-type"].startswith("application/x-ndjson")
+        assert [json.loads(line)["uid"] for line in since.text.splitlines()] == ["u4", "u1"]
+
+        assert client.get("/users/export", params={"format": "xml"}).status_code == 400
@@ -0,0 +1,94 @@
+"""Tests for cross-process cache invalidation through shared generation counters."""
+
+import multiprocessing
+import os
+import tempfile
+
+from app.db.cache import UserCache
+from app.db.cached_repository import CachedUserRepository
+from app.db.config import PROFILES, create_engines, make_sessionmaker
+from app.db.generations import GenerationTable, bump, generation_table, slot_of
+from app.db.repository import DatabaseUserRepository
+from app.models.person import Donor
+from benchmarks.common import make_people, temp_database
+
+
+def _write_in_child(url: str) -> None:
+    writer, reader = create_engines(url, PROFILES["production"])
+    try:
+        with make_sessionmaker(writer, reader)() as db:
+            repo = DatabaseUserRepository(db)
+            repo.update_user("u0", name="Changed elsewhere")
+            repo.delete_user("u1")
+            repo.add_user(Donor(uid="u9", name="New", email="u9@example.com"))
+    finally:
+        writer.dispose()
+        reader.dispose()
+
+
+def _bump_in_child(path: str, times: int) -> None:
+    for _ in range(times):
+        bump(path, ["same"])
+
+
+def _run(target, *args) -> None:
+    process = multiprocessing.get_context("spawn").Process(target=target, args=args)
+    process.start()
+    process.join(60)
+    assert process.exitcode == 0
+
+
+def test_commits_bump_counters_and_rollbacks_do_not():
+    with temp_database() as Session:
+        table = generation_table(str(Session.kw["bind"].url))
+        with Session() as db:
+            repo = DatabaseUserRepository(db)
+            repo.add_user(Donor(uid="a", name="A", email="a@example.com"))
+            assert (table.table(), table.user("a")) == (1, 1)
+            repo.update_user("a", name="B")
+            assert table.user("a") == 2
+            try:
+                repo.add_user(Donor(uid="a", name="Dup", email="dup@example.com"))
+            except KeyError:
+                pass
+            assert (table.table(), table.user("a")) == (2, 2)
+        table.close()
+
+
+def test_writes_in_another_process_invalidate_this_cache():
+    with temp_database() as Session:
+        url = str(Session.kw["bind"].url)
+        with Session() as db:
+            DatabaseUserRepository(db).add_users(make_people(3, prefix="u"))
+            coherent = CachedUserRepository(DatabaseUserRepository(db), UserCache(generations=generation_table(url)))
+            local = CachedUserRepository(DatabaseUserRepository(db), UserCache())
+            for repo in (coherent, local):
+                assert repo.get_user("u0").name == "User 0" and repo.get_user("u1") is not None
+                assert repo.get_user("u9") is None
+                assert len(repo.list_users_keyset(limit=10)) == 3
+
+            _run(_write_in_child, url)
+
+            assert coherent.get_user("u0").name == "Changed elsewhere"
+            assert coherent.get_user("u1") is None
+            assert coherent.get_user("u9").name == "New"
+            assert {u.uid for u in coherent.list_users_keyset(limit=10)} == {"u0", "u2", "u9"}
+            assert coherent.get_users_many(["u0", "u1"]).by_uid["u1"] is None
+            assert coherent._cache.stale >= 4
+            # without the shared counters the old entries are still served
+            assert local.get_user("u0").name == "User 0"
+
+
+def test_concurrent_bumps_are_not_lost():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "test.db-gen")
+        processes = [multiprocessing.get_context("spawn").Process(target=_bump_in_child, args=(path, 200)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(60)
+            assert process.exitcode == 0
+        table = GenerationTable(path)
+        assert table.table() == 800 and table.user("same") == 800
+        assert table.user("other") == 0 or slot_of("other") == slot_of("same")
+        table.close()
@@ -0,0 +1,95 @@
+"""Tests for the synthetic data generator and the query plan check."""
+
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+from app.db.changes import ChangeLogRepository
+from app.db.models import PersonModel
+from app.db.plans import RepositoryQuery, explain_queries, full_scans
+from app.db.repository import DatabaseUserRepository
+from app.db.search import UserSearchRepository
+from app.db.stats import RoleStatsRepository
+from app.models.person import Donor
+from benchmarks.common import temp_database
+from init_db import generate_users, load_users, parse_roles
+
+
+def test_generated_users_follow_the_role_skew_with_unique_keys():
+    now = datetime(2026, 1, 1)
+    roles = parse_roles("donor=80,victim=20,vendor=0")
+    users = list(generate_users(5000, roles, seed=1, now=now))
+
+    drawn = Counter(user["role"] for user in users)
+    assert set(drawn) == {"donor", "victim"}
+    assert 0.77 < drawn["donor"] / 5000 < 0.83
+    assert len({user["uid"] for user in users}) == len({user["email"] for user in users}) == 5000
+    assert [user["created_at"] for user in users] == sorted(user["created_at"] for user in users)
+    assert all(user["created_at"] <= user["updated_at"] <= now for user in users)
+    assert users == list(generate_users(5000, roles, seed=1, now=now))
+
+
+def test_bulk_load_keeps_counters_search_and_change_log_in_step():
+    with temp_database() as Session:
+        load_users(Session, 2500, seed=3, batch_size=300, transaction_size=1000)
+
+        with Session() as db:
+            assert db.execute(select(func.count()).select_from(PersonModel)).scalar() == 2500
+            assert RoleStatsRepository(db).check() == {}
+            assert UserSearchRepository(db).check()
+            assert len(ChangeLogRepository(db).since(0, limit=5000)) == 2500
+            loaded = db.execute(select(PersonModel.uid, PersonModel.name).limit(1)).first()
+            assert loaded.uid in {row.uid for row in UserSearchRepository(db).search(loaded.name, limit=2500)}
+            # the insert trigger is back for ordinary writes
+            DatabaseUserRepository(db).add_user(Donor(uid="later", name="Zebulon Later", email="later@example.com"))
+            assert [row.uid for row in UserSearchRepository(db).search("zebulon")] == ["later"]
+
+
+def test_full_scans_are_told_apart_from_index_scans():
+    steps = [
+        "SCAN persons",
+        "SCAN TABLE persons AS p",
+        "SCAN persons USING INDEX ix_persons_created_at_uid",
+        "SCAN persons USING COVERING INDEX ix_persons_role",
+        "SCAN persons_fts VIRTUAL TABLE INDEX 0:M2",
+        "SEARCH persons USING INDEX sqlite_autoindex_persons_1 (uid=?)",
+        "SCAN role_counts",
+        "SCAN CONSTANT ROW",
+    ]
+    assert full_scans(steps) == ["persons", "persons"]
+
+
+def test_plan_check_passes_for_repository_queries_and_flags_a_full_scan():
+    with temp_database() as Session:
+        load_users(Session, 500, seed=5)
+
+        plans = explain_queries(Session)
+        assert {plan.query for plan in plans} >= {"get_user", "list_user_rows_keyset(role)", "changes.compact"}
+        assert [plan.query for plan in plans if plan.failed] == []
+        assert [plan.query for plan in plans if plan.full_scans] == ["search_like"]
+
+        by_name = RepositoryQuery(
+            "by_name", lambda db: db.execute(select(PersonModel.uid).where(PersonModel.name == "Nobody")).all()
+        )
+        (plan,) = explain_queries(Session, [by_name])
+        assert plan.failed and plan.full_scans == ["persons"]
+
+
+def test_plan_check_leaves_the_database_unchanged():
+    with temp_database() as Session:
+        load_users(Session, 50, seed=3)
+        with Session() as db:
+            repo = DatabaseUserRepository(db)
+            uid = db.scalars(select(PersonModel.uid).order_by(PersonModel.uid).limit(1)).one()
+            repo.update_user(uid, name="Renamed once")  # leaves a superseded entry for compaction
+            repo.update_user(uid, name="Renamed twice")
+            before = (ChangeLogRepository(db).since(0, limit=1000), ChangeLogRepository(db).state(), repo.get_user_rows([uid]))
+
+        explain_queries(Session)
+
+        with Session() as db:
+            repo = DatabaseUserRepository(db)
+            after = (ChangeLogRepository(db).since(0, limit=1000), ChangeLogRepository(db).state(), repo.get_user_rows([uid]))
+            assert after == before
+            assert repo.get_user("plan-check-new") is None
@@ -0,0 +1,98 @@
+"""Tests for batch user lookup by uid and email."""
+
+from contextlib import contextmanager
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.db.cache import UserCache
+from app.db.cached_repository import CachedUserRepository
+from app.db.config import get_db
+from app.db.repository import DatabaseUserRepository
+from app.services.user_service import UserService
+from benchmarks.common import make_people, temp_database
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", before)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", before)
+
+
+def test_lookup_uses_chunked_in_queries_and_marks_misses():
+    with temp_database() as Session:
+        with Session() as db:
+            repo = DatabaseUserRepository(db)
+            repo.add_users(make_people(5, prefix="u"))
+            with count_queries() as queries:
+                lookup = repo.get_users_many(
+                    ["u3", "missing", "u0", "u3", "u4"], emails=["u1@example.com", "nobody@example.com"], chunk_size=2
+                )
+            assert len(queries) == 3  # two chunks of uids, one of emails
+            assert list(lookup.by_uid) == ["u3", "missing", "u0", "u4"]
+            assert lookup.by_uid["missing"] is None and lookup.by_uid["u0"].role == "donor"
+            assert lookup.by_email["u1@example.com"].uid == "u1" and lookup.by_email["nobody@example.com"] is None
+
+            assert UserService(db).get_users_many(["u2", "x"]) == {
+                "users": {"u2": {"uid": "u2", "name": "User 2", "email": "u2@example.com", "role": "victim"}, "x": None},
+                "emails": {},
+            }
+
+
+def test_cached_lookup_loads_only_misses():
+    cache = UserCache()
+    with temp_database() as Session:
+        with Session() as db:
+            repo = CachedUserRepository(DatabaseUserRepository(db), cache)
+            repo.add_users(make_people(4, prefix="u"))
+            repo.get_user("u0")
+            with count_queries() as queries:
+                lookup = repo.get_users_many(["u0", "u1", "gone"])
+                assert repo.get_users_many(["gone", "u1"]).by_uid == {"gone": None, "u1": lookup.by_uid["u1"]}
+            assert len(queries) == 1
+            repo.update_user("u1", name="Renamed")
+            assert repo.get_users_many(["u1"]).by_uid["u1"].name == "Renamed"
+
+
+def test_lookup_route_on_lean_and_orm_paths():
+    import app.main as main_module
+
+    with temp_database() as Session:
+        with Session() as db:
+            DatabaseUserRepository(db).add_users(make_people(3, prefix="u"))
+
+        def override_db():
+            with Session() as db:
+                yield db
+
+        main_module.app.dependency_overrides[get_db] = override_db
+        lean = main_module.LEAN_READS
+        try:
+            client = TestClient(main_module.app)
+            bodies = []
+            for mode in (True, False):
+                main_module.LEAN_READS = mode
+                main_module.user_cache.clear()
+                response = client.post("/users/lookup", json={"uids": ["u1", "nope"], "emails": ["u2@example.com"]})
+                assert response.status_code == 200
+                bodies.append(response.json())
+            assert bodies[0] == bodies[1]
+            assert bodies[0]["users"]["nope"] is None and bodies[0]["users"]["u1"]["name"] == "User 1"
+            assert bodies[0]["emails"]["u2@example.com"]["uid"] == "u2"
+            assert client.post("/users/lookup", json={"uids": [str(i) for i in range(1000)]}).status_code == 200
+            assert client.post("/users/lookup", json={"uids": [str(i) for i in range(1001)]}).status_code == 422
+            assert client.post("/users/lookup", json={"emails": [f"{i}@example.com" for i in range(1001)]}).status_code == 422
+        finally:
+            main_module.LEAN_READS = lean
+            main_module.app.dependency_overrides.clear()
+            main_module.user_cache.clear()
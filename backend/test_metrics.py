@@ -0,0 +1,66 @@
+"""Tests for request metrics: route labels, query attribution and the query budget."""
+
+import logging
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.db.repository import DatabaseUserRepository
+from app.metrics import Histogram, MetricsMiddleware, MetricsRegistry
+from app.models.person import Donor
+from benchmarks.common import temp_database
+
+
+def _app(Session, registry):
+    app = FastAPI(dependencies=[Depends(registry.track_route)])
+    app.add_middleware(MetricsMiddleware, registry=registry)
+
+    @app.get("/users/{uid}")
+    def get_user(uid: str, repeat: int = 1):
+        with Session() as db:
+            repo = DatabaseUserRepository(db)
+            for _ in range(repeat):
+                user = repo.get_user(uid)
+            return {"uid": user.uid if user else None}
+
+    return app
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(value)
+    assert histogram.cumulative() == [("0.1", 2), ("1.0", 3), ("+Inf", 4)]
+    assert histogram.count == 4
+
+
+def test_queries_are_attributed_to_the_route_template():
+    with temp_database() as Session:
+        with Session() as db:
+            DatabaseUserRepository(db).add_user(Donor(uid="a", name="A", email="a@example.com"))
+        registry = MetricsRegistry()
+        client = TestClient(_app(Session, registry))
+
+        response = client.get("/users/a", params={"repeat": 3})
+
+        assert response.status_code == 200
+        assert 'desc="3 queries"' in response.headers["server-timing"]
+        text = registry.render()
+        assert 'http_requests_total{method="GET",route="/users/{uid}",status="200"} 1' in text
+        assert 'db_queries_per_request_sum{method="GET",route="/users/{uid}"} 3' in text
+        assert 'http_requests_in_flight{method="GET",route="/users/{uid}"} 0' in text
+        assert "http_requests_active 0" in text
+
+
+def test_repeated_statements_are_flagged(caplog):
+    with temp_database() as Session:
+        registry = MetricsRegistry(query_budget=100, repeat_budget=2)
+        client = TestClient(_app(Session, registry))
+
+        with caplog.at_level(logging.WARNING, logger="app.metrics"):
+            client.get("/users/a", params={"repeat": 2})
+            client.get("/users/a", params={"repeat": 3})
+
+        assert 'http_requests_over_query_budget_total{method="GET",route="/users/{uid}"} 1' in registry.render()
+        assert len(caplog.records) == 1
+        assert "3 repeats" in caplog.records[0].getMessage()
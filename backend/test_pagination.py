@@ -0,0 +1,88 @@
+"""Tests for keyset pagination of GET /users: cursor round trips, role filters and the skip fallback."""
+
+import base64
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from app.db.config import get_db
+from app.db.models import PersonModel
+from app.db.pagination import decode_cursor, encode_cursor
+from app.db.repository import DatabaseUserRepository
+from benchmarks.common import make_people, temp_database
+
+TIES = datetime(2024, 1, 1)
+
+
+def _seed_with_ties(Session) -> list:
+    """Ten users (roles cycling donor, vendor, victim); the first six share one created_at."""
+    with Session() as db:
+        repo = DatabaseUserRepository(db)
+        repo.add_users(make_people(10, prefix="u"))
+        db.execute(update(PersonModel).where(PersonModel.uid.in_([f"u{i}" for i in range(6)])).values(created_at=TIES))
+        db.commit()
+        return [(u.uid, u.role) for u in repo.list_users_keyset(limit=100)]
+
+
+def _walk(list_page, limit: int, role=None) -> list:
+    seen, after = [], None
+    while True:
+        page = list_page(limit=limit, role=role, after=after)
+        seen += [user.uid for user in page]
+        if len(page) < limit:
+            return seen
+        after = decode_cursor(encode_cursor(page[-1]))
+
+
+def test_cursor_round_trip_visits_every_user_once_across_equal_created_at():
+    with temp_database() as Session:
+        ordered = _seed_with_ties(Session)
+        assert ordered[:6] == sorted(ordered[:6])  # ties are broken by uid
+
+        with Session() as db:
+            repo = DatabaseUserRepository(db)
+            for list_page in (repo.list_users_keyset, repo.list_user_rows_keyset):
+                assert _walk(list_page, limit=4) == [uid for uid, _ in ordered]
+                assert _walk(list_page, limit=1, role="donor") == [uid for uid, role in ordered if role == "donor"]
+                assert _walk(list_page, limit=2, role="VENDOR") == [uid for uid, role in ordered if role == "vendor"]
+
+
+def test_list_endpoint_pages_with_next_cursor_and_falls_back_to_skip():
+    import app.main as main_module
+
+    with temp_database() as Session:
+        ordered = _seed_with_ties(Session)
+
+        def override_db():
+            with Session() as db:
+                yield db
+
+        main_module.app.dependency_overrides[get_db] = override_db
+        try:
+            client = TestClient(main_module.app)
+            for role in (None, "victim"):
+                expected = [uid for uid, r in ordered if role is None or r == role]
+                params = {"limit": 3, **({"role": role} if role else {})}
+                seen, pages = [], 0
+                while True:
+                    response = client.get("/users", params=params)
+                    assert response.status_code == 200
+                    seen += [user["uid"] for user in response.json()]
+                    pages += 1
+                    if "X-Next-Cursor" not in response.headers:
+                        break
+                    params["cursor"] = response.headers["X-Next-Cursor"]
+                assert seen == expected
+                assert pages == -(-len(expected) // 3)  # no empty page after the last one
+
+            skipped = client.get("/users", params={"skip": 2, "limit": 3})
+            assert [user["uid"] for user in skipped.json()] == [uid for uid, _ in ordered][2:5]
+            assert "X-Next-Cursor" not in skipped.headers
+
+            assert client.get("/users", params={"cursor": "not-a-cursor"}).status_code == 400
+            wrong_shape = base64.urlsafe_b64encode(b'["2024-01-01T00:00:00"]').decode()
+            assert client.get("/users", params={"cursor": wrong_shape}).status_code == 400
+        finally:
+            main_module.app.dependency_overrides.clear()
+            main_module.user_cache.clear()
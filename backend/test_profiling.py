@@ -0,0 +1,114 @@
+"""Tests for on-demand request profiling: triggers, inline sync endpoints, the ring and the admin endpoints."""
+
+import os
+import pstats
+import tempfile
+import threading
+
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from app.db.config import get_db
+from app.profiling import Profiler, ProfiledRoute, ProfilingMiddleware
+from benchmarks.common import temp_database
+
+
+def _profiled_app(profiler: Profiler, token: str = "secret"):
+    app = FastAPI()
+    router = APIRouter(route_class=ProfiledRoute)
+
+    @router.get("/items/{item_id}")
+    def read_item(item_id: int):
+        return {"id": item_id, "thread": threading.current_thread().name}
+
+    app.include_router(router)
+    return TestClient(ProfilingMiddleware(app, profiler, token=token))
+
+
+def _functions(path: str):
+    return {name for (_, _, name) in pstats.Stats(path).stats}
+
+
+def test_header_profiles_the_request_with_its_sync_endpoint_inline():
+    with tempfile.TemporaryDirectory() as out:
+        profiler = Profiler(out, sample_rate=0)
+        client = _profiled_app(profiler)
+
+        plain = client.get("/items/1")
+        wrong = client.get("/items/1", headers={"X-Profile": "guess"})
+        profiled = client.get("/items/1", headers={"X-Profile": "secret"})
+
+        assert "x-profile-id" not in plain.headers and "x-profile-id" not in wrong.headers
+        assert plain.json()["thread"] != profiled.json()["thread"]  # thread pool vs the event loop
+        (profile,) = profiler.profiles()
+        assert profile["id"] == profiled.headers["x-profile-id"]
+        assert (profile["method"], profile["route"]) == ("GET", "items-item_id")
+        assert "read_item" in _functions(profiler.path(profile["id"]))
+        assert profiler.path("../etc/passwd") is None
+
+
+def test_sampled_profiles_rotate_and_add_up_per_route():
+    with tempfile.TemporaryDirectory() as out:
+        profiler = Profiler(out, keep=3, sample_rate=1.0)
+        client = _profiled_app(profiler, token=None)
+
+        ids = [client.get(f"/items/{i}").headers["x-profile-id"] for i in range(5)]
+
+        assert [p["id"] for p in profiler.profiles()] == ids[:1:-1]
+        assert not [name for name in os.listdir(out) if name.endswith(".partial")]
+        (route,) = profiler.summary(top=10_000)["routes"]
+        assert (route["method"], route["route"], route["profiles"]) == ("GET", "/items/{item_id}", 5)
+        read_item = [f for f in route["top"] if f["function"].endswith("(read_item)")]
+        assert read_item and read_item[0]["calls"] == 5
+        assert profiler.stats()["captured"] == 5
+
+
+def test_a_wrong_header_token_still_leaves_the_request_to_sampling():
+    with tempfile.TemporaryDirectory() as out:
+        profiler = Profiler(out, sample_rate=1.0)
+        client = _profiled_app(profiler)
+
+        sampled = client.get("/items/1", headers={"X-Profile": "guess"})
+
+        assert "x-profile-id" in sampled.headers
+        assert [p["id"] for p in profiler.profiles()] == [sampled.headers["x-profile-id"]]
+
+
+def test_admin_profile_endpoints():
+    import app.main as main_module
+
+    with temp_database() as Session, tempfile.TemporaryDirectory() as out:
+
+        def override_db():
+            with Session() as db:
+                yield db
+
+        original = main_module.profiler, main_module.ADMIN_TOKEN
+        main_module.app.dependency_overrides[get_db] = override_db
+        main_module.profiler = profiler = Profiler(out, sample_rate=0)
+        main_module.ADMIN_TOKEN = "secret"
+        try:
+            client = TestClient(ProfilingMiddleware(main_module.app, profiler, token="secret"))
+            admin = {"Authorization": "Bearer secret"}
+            created = client.post(
+                "/users", json={"uid": "a", "name": "A", "email": "a@example.com"}, headers={"X-Profile": "secret"}
+            )
+            profile_id = created.headers["x-profile-id"]
+
+            listed = client.get("/admin/profiles", headers=admin).json()
+            summary = client.get("/admin/profiles/summary", params={"top": 5}, headers=admin).json()
+            download = client.get(f"/admin/profiles/{profile_id}", headers=admin)
+
+            assert client.get("/admin/profiles").status_code == 401
+            assert [p["id"] for p in listed["profiles"]] == [profile_id]
+            (route,) = summary["routes"]
+            assert (route["method"], route["route"], len(route["top"])) == ("POST", "/users", 5)
+            assert download.status_code == 200
+            with open(os.path.join(out, "downloaded.prof"), "wb") as f:
+                f.write(download.content)
+            assert pstats.Stats(f.name).total_calls > 0
+            assert client.get("/admin/profiles/20200101-000000-1-1", headers=admin).status_code == 404
+        finally:
+            main_module.profiler, main_module.ADMIN_TOKEN = original
+            main_module.app.dependency_overrides.clear()
+            main_module.user_cache.clear()
@@ -0,0 +1,83 @@
+"""Tests for RoutingSession: which engine each statement of a transaction runs on."""
+
+from contextlib import contextmanager
+
+from sqlalchemy import event, literal_column, select, text, update
+
+from app.db.models import PersonModel
+from app.db.repository import DatabaseUserRepository
+from benchmarks.common import make_people, temp_database
+
+
+@contextmanager
+def routed_session():
+    """Yield a session on a split writer/reader database and the engine name each statement ran on."""
+    with temp_database() as Session:
+        with Session() as db:
+            DatabaseUserRepository(db).add_users(make_people(3, prefix="u"))
+        writer, reader = Session.kw["bind"], Session.kw["info"]["reader"]
+        assert reader is not writer
+        routed = []
+
+        def recorder(name):
+            def record(conn, cursor, statement, *args):
+                if not statement.startswith("BEGIN"):  # the writer's own BEGIN IMMEDIATE
+                    routed.append(name)
+            return record
+
+        listeners = [(writer, recorder("writer")), (reader, recorder("reader"))]
+        for engine, listener in listeners:
+            event.listen(engine, "before_cursor_execute", listener)
+        try:
+            with Session() as db:
+                yield db, routed
+        finally:
+            for engine, listener in listeners:
+                event.remove(engine, "before_cursor_execute", listener)
+
+
+def test_reads_go_to_the_reader_until_the_first_write_then_stick_to_the_writer():
+    with routed_session() as (db, routed):
+        db.scalars(select(PersonModel.uid)).all()
+        db.get(PersonModel, "u1")
+        assert routed == ["reader", "reader"]
+
+        db.execute(update(PersonModel).where(PersonModel.uid == "u1").values(name="Renamed"))
+        assert db.scalar(select(PersonModel.name).where(PersonModel.uid == "u1")) == "Renamed"  # reads its own write
+        assert routed[2:] == ["writer", "writer"]
+
+        db.commit()
+        db.scalars(select(PersonModel.uid)).all()
+        assert routed[-1] == "reader"  # a new transaction starts on the reader again
+
+
+def test_flushes_route_later_reads_to_the_writer_until_rollback():
+    with routed_session() as (db, routed):
+        db.add(PersonModel(uid="new", name="New", email="new@example.com", role="donor"))
+        db.flush()
+        assert db.scalar(select(PersonModel.uid).where(PersonModel.uid == "new")) == "new"
+        assert set(routed) == {"writer"}
+
+        db.rollback()
+        assert db.scalar(select(PersonModel.uid).where(PersonModel.uid == "new")) is None
+        assert routed[-1] == "reader"
+
+
+def test_locking_reads_take_the_writer():
+    with routed_session() as (db, routed):
+        db.scalars(select(PersonModel).where(PersonModel.uid == "u0").with_for_update()).one()
+        db.scalars(select(PersonModel.uid)).all()
+        assert routed == ["writer", "writer"]  # the lock holds to the end of the transaction
+
+
+def test_textual_statements_route_by_shape():
+    with routed_session() as (db, routed):
+        # text() with declared columns is a TextualSelect, known to be a read
+        rows = db.execute(text("SELECT uid FROM persons ORDER BY uid").columns(literal_column("uid"))).all()
+        assert [row.uid for row in rows] == ["u0", "u1", "u2"]
+        assert routed == ["reader"]
+
+        # bare text() may write, so it goes to the writer and the session stays there
+        db.execute(text("UPDATE persons SET name = 'Text' WHERE uid = 'u2'"))
+        assert db.execute(text("SELECT name FROM persons WHERE uid = 'u2'").columns(literal_column("name"))).scalar() == "Text"
+        assert routed[1:] == ["writer", "writer"]
@@ -0,0 +1,77 @@
+"""Tests for the versioned startup schema check."""
+
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import insert, inspect
+
+from app.db.config import PROFILES, Base, create_engines, make_sessionmaker
+from app.db.models import PersonModel
+from app.db.schema import SCHEMA_VERSION, ensure_schema, schema_version
+from app.db.search import UserSearchRepository
+from app.db.stats import RoleStatsRepository
+
+
+@pytest.fixture
+def engines():
+    with tempfile.TemporaryDirectory() as tmp:
+        writer, reader = create_engines(f"sqlite:///{os.path.join(tmp, 'schema.db')}", PROFILES["production"])
+        yield writer, reader
+        writer.dispose()
+        reader.dispose()
+
+
+def test_new_database_is_created_once(engines):
+    writer, _ = engines
+    assert ensure_schema(writer) is True
+    assert ensure_schema(writer) is False
+    with writer.connect() as conn:
+        assert schema_version(conn) == SCHEMA_VERSION
+
+
+def test_unversioned_database_is_upgraded(engines):
+    writer, reader = engines
+    # a database from before versioning: tables only, no search index or counters
+    Base.metadata.create_all(bind=writer)
+    with writer.begin() as conn:
+        conn.execute(insert(PersonModel), [
+            {"uid": "d1", "name": "Alice", "email": "alice@example.com", "role": "donor"},
+            {"uid": "v1", "name": "Bob", "email": "bob@example.com", "role": "vendor"},
+        ])
+
+    assert ensure_schema(writer) is True
+    with make_sessionmaker(writer, reader)() as db:
+        assert RoleStatsRepository(db).counter_counts() == {"donor": 1, "vendor": 1}
+        assert [row.uid for row in UserSearchRepository(db).search("ali")] == ["d1"]
+
+
+def test_upgrade_adds_indexes_to_existing_tables(engines):
+    writer, _ = engines
+    ensure_schema(writer)
+    with writer.begin() as conn:
+        conn.exec_driver_sql("DROP INDEX ix_user_changes_tombstones")
+        conn.exec_driver_sql("PRAGMA user_version = 2")
+
+    assert ensure_schema(writer) is True
+    assert "ix_user_changes_tombstones" in {ix["name"] for ix in inspect(writer).get_indexes("user_changes")}
+
+
+def test_upgrade_adds_columns_to_existing_tables(engines):
+    writer, _ = engines
+    ensure_schema(writer)
+    with writer.begin() as conn:
+        conn.exec_driver_sql("ALTER TABLE user_changes_state DROP COLUMN compacted_at")
+        conn.exec_driver_sql("PRAGMA user_version = 3")
+
+    assert ensure_schema(writer) is True
+    assert "compacted_at" in {column["name"] for column in inspect(writer).get_columns("user_changes_state")}
+
+
+def test_newer_database_is_refused(engines):
+    writer, _ = engines
+    ensure_schema(writer)
+    with writer.begin() as conn:
+        conn.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION + 1}")
+    with pytest.raises(RuntimeError):
+        ensure_schema(writer)
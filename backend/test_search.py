@@ -0,0 +1,68 @@
+"""Tests for FTS5 user search: query building, trigger sync, ranking and rebuild."""
+
+from sqlalchemy import text
+
+from app.db.repository import DatabaseUserRepository
+from app.db.search import UserSearchRepository, ensure_search_index, to_match_query
+from app.models.person import Donor, Vendor, Victim
+from benchmarks.common import temp_database
+
+
+def test_match_query_quotes_words_as_prefixes():
+    assert to_match_query("Ali  john@exa") == '"Ali"* "john"* "exa"*'
+    assert to_match_query('x" OR NEAR(') == '"x"* "OR"* "NEAR"*'
+    assert to_match_query("%%") is None
+
+
+def _uids(rows):
+    return [r.uid for r in rows]
+
+
+def test_index_follows_inserts_updates_and_deletes():
+    with temp_database() as Session:
+        with Session() as db:
+            repo = DatabaseUserRepository(db)
+            repo.add_user(Donor(uid="d1", name="Alice Johnson", email="alice@example.com"))
+            repo.add_users([
+                Vendor(uid="v1", name="Alina Supplies", email="sales@alina.com"),
+                Victim(uid="x1", name="Bob Stone", email="bob@example.com"),
+            ])
+        assert ensure_search_index(Session.kw["bind"]) is False  # created with the tables
+
+        with Session() as db:
+            search = UserSearchRepository(db)
+            assert sorted(_uids(search.search("ali"))) == ["d1", "v1"]
+            assert _uids(search.search("ali", role="vendor")) == ["v1"]
+            assert _uids(search.search("example bob")) == ["x1"]
+
+            repo = DatabaseUserRepository(db)
+            repo.update_user("d1", name="Carol White")
+            repo.delete_user("v1")
+            assert _uids(search.search("ali")) == ["d1"]  # still matches alice@example.com
+            assert _uids(search.search("carol")) == ["d1"]
+            assert search.search("supplies") == []
+            assert search.check()
+
+
+def test_rank_prefers_rarer_terms_and_paginates():
+    with temp_database() as Session:
+        with Session() as db:
+            repo = DatabaseUserRepository(db)
+            repo.add_users([Donor(uid=f"u{i}", name=f"Common Name{i}", email=f"u{i}@example.com") for i in range(5)])
+            repo.add_user(Donor(uid="rare", name="Common Zanzibar", email="rare@example.com"))
+            search = UserSearchRepository(db)
+            assert _uids(search.search("zanz common")) == ["rare"]
+            pages = [_uids(search.search("common", limit=4, skip=skip)) for skip in (0, 4)]
+            assert len(pages[0]) == 4 and len(pages[1]) == 2
+            assert set(pages[0]) | set(pages[1]) == {"u0", "u1", "u2", "u3", "u4", "rare"}
+
+
+def test_rebuild_indexes_rows_written_without_triggers():
+    with temp_database() as Session:
+        with Session() as db:
+            db.execute(text("DROP TRIGGER persons_fts_ai"))
+            DatabaseUserRepository(db).add_user(Donor(uid="d1", name="Alice", email="alice@example.com"))
+            search = UserSearchRepository(db)
+            assert search.search("alice") == []
+            search.rebuild()
+            assert _uids(search.search("alice")) == ["d1"]
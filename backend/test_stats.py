@@ -0,0 +1,94 @@
+"""Tests for the role counters: upkeep on every write, and check/rebuild racing concurrent writes."""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.db.repository import DatabaseUserRepository
+from app.db.stats import RoleStatsRepository
+from app.models.person import Donor, Vendor, Victim
+from benchmarks.common import temp_database
+
+
+def test_counters_follow_inserts_role_changes_deletes_and_bulk_imports():
+    with temp_database() as Session:
+        with Session() as db:
+            repo = DatabaseUserRepository(db)
+            stats = RoleStatsRepository(db)
+
+            repo.add_user(Donor(uid="a", name="A", email="a@example.com"))
+            repo.add_user(Vendor(uid="b", name="B", email="b@example.com"))
+            assert stats.counter_counts() == {"donor": 1, "vendor": 1}
+
+            repo.update_user("a", role="victim")
+            repo.update_user("b", name="B renamed")  # no role change, no delta
+            assert stats.counter_counts() == {"donor": 0, "vendor": 1, "victim": 1}
+
+            repo.delete_user("b")
+            assert stats.counter_counts() == {"donor": 0, "vendor": 0, "victim": 1}
+
+            repo.add_users([
+                Donor(uid="c", name="C", email="c@example.com"),
+                Victim(uid="d", name="D", email="d@example.com"),
+                Victim(uid="a", name="taken", email="taken@example.com"),  # conflict, not counted
+            ])
+            assert stats.counts() == {"donor": 1, "vendor": 0, "victim": 2}
+            assert stats.check() == {}
+
+
+@contextmanager
+def write_during(statement_fragment: str, Session, when: str = "before_cursor_execute"):
+    """Commit a new donor from another thread ``when`` a statement containing ``statement_fragment`` runs.
+
+    The writer gets a moment to commit before the statement goes on; yields the thread to join.
+    """
+    writes = []
+
+    def write():
+        with Session() as other:
+            DatabaseUserRepository(other).add_user(Donor(uid="late", name="Late", email="late@example.com"))
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        if statement_fragment in statement and not writes:
+            writes.append(threading.Thread(target=write))
+            writes[0].start()
+            time.sleep(0.3)
+
+    event.listen(Engine, when, before)
+    try:
+        yield writes
+    finally:
+        event.remove(Engine, when, before)
+        for thread in writes:
+            thread.join()
+
+
+def test_rebuild_does_not_lose_a_write_committed_while_it_counts():
+    with temp_database() as Session:
+        with Session() as db:
+            DatabaseUserRepository(db).add_users([Donor(uid=f"u{i}", name="U", email=f"u{i}@example.com") for i in range(3)])
+
+        with write_during("GROUP BY", Session, when="after_cursor_execute") as writes, Session() as db:
+            RoleStatsRepository(db).rebuild()
+        assert writes  # the concurrent write did run
+
+        with Session() as db:
+            stats = RoleStatsRepository(db)
+            assert stats.counter_counts() == {"donor": 4}
+            assert stats.check() == {}
+
+
+def test_check_reads_counters_and_rows_from_one_state():
+    with temp_database() as Session:
+        with Session() as db:
+            DatabaseUserRepository(db).add_user(Donor(uid="a", name="A", email="a@example.com"))
+
+        with write_during("GROUP BY", Session) as writes, Session() as db:
+            assert RoleStatsRepository(db).check() == {}
+        assert writes
+
+        with Session() as db:
+            assert RoleStatsRepository(db).counter_counts() == {"donor": 2}
@@ -0,0 +1,129 @@
+"""Tests for the single-statement write path: upserts and conflicts reported by constraint."""
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.db.changes import ChangeLogRepository
+from app.db.config import get_db
+from app.db.repository import DatabaseUserRepository, UserConflict
+from app.db.stats import RoleStatsRepository
+from app.models.person import Donor, Vendor
+from benchmarks.common import make_people, temp_database
+
+
+def test_conflicts_name_the_constraint():
+    with temp_database() as Session:
+        with Session() as db:
+            repo = DatabaseUserRepository(db)
+            repo.add_user(Donor(uid="a", name="A", email="a@example.com"))
+            repo.add_user(Donor(uid="b", name="B", email="b@example.com"))
+
+            with pytest.raises(UserConflict) as uid_taken:
+                repo.add_user(Donor(uid="a", name="Other", email="other@example.com"))
+            with pytest.raises(UserConflict) as email_taken:
+                repo.add_user(Donor(uid="c", name="C", email="a@example.com"))
+            with pytest.raises(UserConflict) as update_taken:
+                repo.update_user("b", email="a@example.com")
+
+            assert uid_taken.value.constraint == "uid"
+            assert (email_taken.value.constraint, update_taken.value.constraint) == ("email", "email")
+            assert str(email_taken.value) == "User with this email already exists"
+            assert repo.get_user("b").email == "b@example.com"
+            assert RoleStatsRepository(db).check() == {}
+
+
+def test_bulk_insert_reports_conflicts_by_constraint():
+    with temp_database() as Session:
+        with Session() as db:
+            repo = DatabaseUserRepository(db)
+            repo.add_user(Donor(uid="u0", name="Taken", email="taken@example.com"))
+            people = make_people(3, prefix="u") + [Donor(uid="new", name="New", email="taken@example.com")]
+
+            results = repo.add_users(people)
+
+            assert [(r["uid"], r["status"]) for r in results] == [
+                ("u0", "conflict"), ("u1", "created"), ("u2", "created"), ("new", "conflict"),
+            ]
+            assert results[0]["detail"] == UserConflict.MESSAGES["uid"]
+            assert results[3]["detail"] == UserConflict.MESSAGES["email"]
+            assert RoleStatsRepository(db).check() == {}
+
+
+def test_upsert_creates_updates_and_skips_unchanged_writes():
+    with temp_database() as Session:
+        with Session() as db:
+            repo = DatabaseUserRepository(db)
+            created = repo.upsert_user(Vendor(uid="a", name="A", email="a@example.com"))
+            updated = repo.upsert_user(Donor(uid="a", name="A2", email="a@example.com"))
+            retried = repo.upsert_user(Donor(uid="a", name="A2", email="a@example.com"))
+
+            assert created.created and created.user.role == "vendor"
+            assert not updated.created and updated.user.name == "A2"
+            assert updated.user.role == "vendor"  # the role is only set on creation
+            assert updated.user.created_at == created.user.created_at
+            assert not retried.created and retried.user.updated_at == updated.user.updated_at
+            assert [c.op for c in ChangeLogRepository(db).since(0)] == ["insert", "update"]
+            assert RoleStatsRepository(db).counts()["vendor"] == 1
+
+            repo.add_user(Donor(uid="b", name="B", email="b@example.com"))
+            with pytest.raises(UserConflict) as taken:
+                repo.upsert_user(Donor(uid="a", name="A", email="b@example.com"))
+            assert taken.value.constraint == "email"
+
+
+def test_writes_skip_the_read_before_write():
+    with temp_database() as Session:
+        with Session() as db:
+            repo = DatabaseUserRepository(db)
+            repo.add_user(Donor(uid="a", name="A", email="a@example.com"))
+            statements = []
+            engine = db.get_bind()
+
+            def listener(conn, cursor, statement, *args):
+                if not statement.startswith("BEGIN"):
+                    statements.append(statement.split()[0])
+
+            event.listen(engine, "before_cursor_execute", listener)
+            try:
+                repo.update_user("a", name="B")
+                update = statements[:]
+                statements.clear()
+                repo.delete_user("a")
+            finally:
+                event.remove(engine, "before_cursor_execute", listener)
+
+            # the person write itself, then the change log entry (and the role counter for deletes)
+            assert update == ["UPDATE", "INSERT"]
+            assert statements == ["DELETE", "UPDATE", "INSERT"]
+
+
+def test_put_creates_then_updates_through_the_api():
+    import app.main as main_module
+
+    with temp_database() as Session:
+
+        def override_db():
+            with Session() as db:
+                yield db
+
+        main_module.app.dependency_overrides[get_db] = override_db
+        main_module.user_cache.clear()
+        try:
+            client = TestClient(main_module.app)
+            payload = {"uid": "a", "name": "A", "email": "a@example.com", "role": "vendor"}
+
+            created = client.put("/users/a", json=payload)
+            updated = client.put("/users/a", json={**payload, "name": "A2", "role": "donor"})
+            client.put("/users/b", json={"uid": "b", "name": "B", "email": "b@example.com"})
+            taken = client.put("/users/b", json={"uid": "b", "name": "B", "email": "a@example.com"})
+            missing = client.put("/users/c", json={"uid": "c", "name": "C", "email": "c@example.com"}, headers={"If-Match": "*"})
+
+            assert created.status_code == 201 and "etag" in created.headers
+            assert updated.status_code == 200 and updated.json() == {**payload, "name": "A2"}
+            assert taken.status_code == 409 and taken.json()["detail"] == "User with this email already exists"
+            assert missing.status_code == 412
+            assert client.get("/users/a").json()["name"] == "A2"
+        finally:
+            main_module.app.dependency_overrides.clear()
+            main_module.user_cache.clear()
@@ -0,0 +1,69 @@
+"""Tests for the read-through user cache and its invalidation."""
+
+import threading
+import time
+
+from app.db.cache import UserCache, UserRecord
+from app.db.cached_repository import CachedUserRepository
+from app.db.repository import DatabaseUserRepository
+from app.models.person import Donor
+from benchmarks.common import temp_database
+
+
+def test_reads_are_cached_and_writes_invalidate():
+    cache = UserCache()
+    with temp_database() as Session:
+        db = Session()
+        repo = CachedUserRepository(DatabaseUserRepository(db), cache)
+        assert repo.get_user("u1") is None
+        repo.add_user(Donor(uid="u1", name="Ann", email="ann@example.com"))
+        assert repo.get_user("u1").name == "Ann"
+        assert [u.uid for u in repo.list_users_keyset(limit=10)] == ["u1"]
+
+        repo.get_user("u1")
+        repo.list_users_keyset(limit=10)
+        assert cache.users.hits == 1 and cache.lists.hits == 1
+
+        repo.update_user("u1", name="Anna")
+        assert repo.get_user("u1").name == "Anna"
+        repo.delete_user("u1")
+        assert repo.get_user("u1") is None
+        assert repo.list_users_keyset(limit=10) == []
+        db.close()
+
+
+def test_concurrent_misses_share_one_load():
+    cache = UserCache()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        time.sleep(0.05)
+        return UserRecord("hot", "Hot", "hot@example.com", "vendor", None, None)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load(("user", "hot"), loader))) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(loads) == 1
+    assert all(r.uid == "hot" for r in results)
+
+
+def test_load_racing_a_write_is_not_cached():
+    cache = UserCache()
+
+    def loader():
+        cache.invalidate_user("u1")  # a write lands while the query is in flight
+        return UserRecord("u1", "Old", "old@example.com", "donor", None, None)
+
+    cache.get_or_load(("user", "u1"), loader)
+    assert cache.users.stats()["size"] == 0
+
+
+def test_lru_evicts_least_recently_used():
+    cache = UserCache(maxsize=2)
+    for uid in ("a", "b", "c"):
+        cache.get_or_load(("user", uid), lambda uid=uid: uid)
+    assert cache.users.stats()["evictions"] == 1
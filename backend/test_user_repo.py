@@ -0,0 +1,111 @@
+"""Tests for the indexed in-memory user store and the hot tier in front of SQLite."""
+
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.db.changes import ChangeLogRepository
+from app.db.generations import generation_table
+from app.db.hot_repository import HotStoreTracker, HotTierUserRepository, load_hot_store
+from app.db.repository import DatabaseUserRepository
+from app.models.person import Donor, Vendor
+from app.models.user_repo import StoredUser, UserRepository
+from benchmarks.common import make_people, temp_database
+
+T0 = datetime(2024, 1, 1)
+
+
+def _row(i, role="donor"):
+    return (f"u{i}", f"User {i}", f"u{i}@example.com", role, T0 + timedelta(seconds=i), T0 + timedelta(seconds=i))
+
+
+def test_indexes_and_ordered_pages():
+    store = UserRepository()
+    store.load([_row(i, "vendor" if i % 2 else "donor") for i in reversed(range(10))])
+
+    assert store.get_user_by_email("u3@example.com").uid == "u3"
+    assert [u.uid for u in store.list_users_keyset(limit=3)] == ["u0", "u1", "u2"]
+    after = (T0 + timedelta(seconds=2), "u2")
+    assert [u.uid for u in store.list_users_keyset(limit=2, after=after)] == ["u3", "u4"]
+    assert [u.uid for u in store.list_users_keyset(limit=10, role="Vendor", after=after)] == ["u3", "u5", "u7", "u9"]
+    assert [u.uid for u in store.list_users_paginated(skip=8, limit=5)] == ["u8", "u9"]
+
+    store.update_user("u1", role="donor", email="new@example.com")
+    assert store.get_user_by_email("u1@example.com") is None
+    assert "u1" in [u.uid for u in store.list_users(role="donor")]
+    assert "u1" not in [u.uid for u in store.list_users(role="vendor")]
+    with pytest.raises(KeyError):
+        store.add_user(Donor(uid="x", name="X", email="new@example.com"))
+
+    assert store.delete_user("u4") and not store.delete_user("u4")
+    assert len(store) == 9 and len(store.snapshot()) == 9
+    assert [u.uid for u in store.list_users_keyset(limit=2, after=after)] == ["u3", "u5"]
+
+
+def test_records_have_no_instance_dict():
+    assert not hasattr(StoredUser(*_row(1)), "__dict__")
+
+
+def test_hot_tier_follows_database_writes():
+    with temp_database() as Session:
+        with Session() as db:
+            DatabaseUserRepository(db).add_users(make_people(5, prefix="seed"))
+        store = UserRepository()
+        assert load_hot_store(Session, store) == 5
+
+        lock = threading.Lock()
+        with Session() as db:
+            repo = HotTierUserRepository(DatabaseUserRepository(db), store, lock)
+            repo.add_user(Vendor(uid="v", name="V", email="v@example.com"))
+            repo.update_user("seed0", name="Renamed", role="victim")
+            repo.delete_user("seed1")
+            with pytest.raises(KeyError):
+                repo.add_user(Donor(uid="v", name="Dup", email="dup@example.com"))
+
+            assert repo.get_user("v").role == "vendor"
+            assert repo.get_user("seed0").name == "Renamed"
+            assert repo.get_user("seed1") is None
+            lookup = repo.get_users_many(["v", "seed1"], emails=["seed2@example.com"])
+            assert lookup.by_uid["v"].name == "V" and lookup.by_uid["seed1"] is None
+            assert lookup.by_email["seed2@example.com"].uid == "seed2"
+
+        reloaded = UserRepository()
+        load_hot_store(Session, reloaded)
+        assert reloaded.snapshot() == store.snapshot()
+
+
+def test_hot_tier_catches_up_with_writes_from_other_processes():
+    with temp_database() as Session:
+        with Session() as db:
+            DatabaseUserRepository(db).add_users(make_people(4, prefix="seed"))
+        url = str(Session.kw["bind"].url)
+        # two workers, each with its own store, tracker and counter mapping
+        workers = []
+        for _ in range(2):
+            store, tracker = UserRepository(), HotStoreTracker(Session, generation_table(url), chunk_size=2)
+            tracker.load(store)
+            workers.append((store, tracker))
+        (store_a, tracker_a), (store_b, tracker_b) = workers
+        lock = threading.Lock()
+
+        with Session() as db:
+            a = HotTierUserRepository(DatabaseUserRepository(db), store_a, lock, tracker_a)
+            a.add_user(Vendor(uid="v", name="V", email="v@example.com"))
+            a.update_user("seed0", name="Renamed")
+            a.delete_user("seed1")
+            a.add_users(make_people(3, prefix="bulk"))
+
+        with Session() as db:
+            b = HotTierUserRepository(DatabaseUserRepository(db), store_b, threading.Lock(), tracker_b)
+            assert tracker_b.stale()
+            assert b.get_user("v").name == "V"
+            assert not tracker_b.stale()
+            assert b.get_user("seed0").name == "Renamed" and b.get_user("seed1") is None
+            assert store_b.snapshot() == store_a.snapshot()
+
+            # compaction dropped the delete b has not seen: it reloads the table
+            DatabaseUserRepository(db).delete_user("seed2")
+            ChangeLogRepository(db).compact(tombstone_ttl=timedelta(0), now=datetime.utcnow() + timedelta(seconds=1))
+            assert [u.uid for u in b.list_users()] == [u.uid for u in DatabaseUserRepository(db).list_users()]
+            assert b.get_user("seed2") is None and tracker_b.seq >= ChangeLogRepository(db).horizon()
@@ -0,0 +1,53 @@
+"""Tests for group commit: per-operation results inside a shared transaction."""
+
+import threading
+
+import pytest
+
+from app.db.repository import DatabaseUserRepository
+from app.db.stats import RoleStatsRepository
+from app.db.write_coalescer import WriteCoalescer
+from app.models.person import Donor, Vendor
+from benchmarks.common import temp_database
+
+
+def test_conflict_fails_only_its_own_operation():
+    with temp_database() as Session:
+        coalescer = WriteCoalescer(Session, max_wait=0.05)
+        results = {}
+
+        def add(i, person):
+            try:
+                results[i] = coalescer.submit(lambda repo: repo.add_user(person)).uid
+            except KeyError:
+                results[i] = "conflict"
+
+        people = [
+            Donor(uid="a", name="A", email="a@example.com"),
+            Vendor(uid="a", name="Dup", email="dup@example.com"),
+            Vendor(uid="b", name="B", email="b@example.com"),
+        ]
+        threads = [threading.Thread(target=add, args=(i, p)) for i, p in enumerate(people)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        coalescer.close()
+
+        assert sorted(results.values()) == ["a", "b", "conflict"]
+        with Session() as db:
+            assert {u.uid for u in DatabaseUserRepository(db).list_users()} == {"a", "b"}
+            assert RoleStatsRepository(db).check() == {}
+
+
+def test_updates_and_deletes_return_their_results():
+    with temp_database() as Session:
+        coalescer = WriteCoalescer(Session)
+        coalescer.submit(lambda repo: repo.add_user(Donor(uid="a", name="A", email="a@example.com")))
+        assert coalescer.submit(lambda repo: repo.update_user("a", name="Ann")).name == "Ann"
+        assert coalescer.submit(lambda repo: repo.update_user("missing", name="X")) is None
+        assert coalescer.submit(lambda repo: repo.delete_user("a")) is True
+        with pytest.raises(ZeroDivisionError):
+            coalescer.submit(lambda repo: 1 / 0)
+        assert coalescer.submit(lambda repo: repo.delete_user("a")) is False
+        coalescer.close()